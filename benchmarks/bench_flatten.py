@@ -0,0 +1,60 @@
+"""Compare flatten_records against pd.json_normalize on a full market of listings.
+
+Uses the listings fixture in test/mock_api_response, repeated up to the total count
+reported by the fixture (10,648 listings), or synthetic listings if the fixture is
+missing.
+
+    pipenv run python3 -m benchmarks.bench_flatten
+"""
+
+import argparse
+import copy
+import json
+import timeit
+from os.path import dirname, exists, join
+from typing import Dict, List
+
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticMarket
+from src.util.flatten import flatten_records
+from src.util.schemas import LISTINGS_FIELDS
+
+LISTINGS_FIXTURE = join(
+    dirname(dirname(__file__)),
+    "test/mock_api_response/example_listings_latest_res.json",
+)
+DEFAULT_LISTING_COUNT = 10648
+
+
+def load_listings(count: int) -> List[Dict]:
+    """Listings from the fixture repeated up to the count, or synthetic listings"""
+    if exists(LISTINGS_FIXTURE):
+        with open(LISTINGS_FIXTURE, "r") as file:
+            page = json.load(file)["data"]
+        return [copy.deepcopy(page[i % len(page)]) for i in range(count)]
+    return SyntheticMarket(count).listings()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=DEFAULT_LISTING_COUNT)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    listings = load_listings(args.count)
+    candidates = {
+        "json_normalize": lambda: pd.json_normalize(listings),
+        "flatten_records": lambda: flatten_records(listings, LISTINGS_FIELDS),
+    }
+    print(f"Flattening {len(listings)} listings, best of {args.repeat} runs")
+    results = {}
+    for name, run in candidates.items():
+        results[name] = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"{name:>16}: {results[name] * 1000:8.1f} ms")
+    speedup = results["json_normalize"] / results["flatten_records"]
+    print(f"{'speedup':>16}: {speedup:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
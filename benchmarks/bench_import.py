@@ -0,0 +1,100 @@
+"""Time the startup of each CLI command, from process start to exit.
+
+Each command is run in a fresh interpreter, the same way a cron job or a dashboard
+shelling out to the CLI runs it. The modules with the largest cumulative import time
+are listed from `python -X importtime`.
+
+    pipenv run python3 -m benchmarks.bench_import
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from os.path import dirname, join
+from typing import Dict, List, Tuple
+
+CLI = join(dirname(dirname(__file__)), "crypto_tracker_workflow.py")
+
+# Commands timed by default, none of them run the workflow
+COMMANDS = {
+    "help": ["--help"],
+    "run --help": ["run", "--help"],
+    "show": ["show"],
+    "status": ["status"],
+}
+# Heavy modules reported when a command imports them
+HEAVY_MODULES = ["pandas", "pyarrow", "requests", "numpy"]
+
+
+def time_process(args: List[str], repeat: int) -> List[float]:
+    """Wall time of each run of the interpreter with the arguments, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + args,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(args: List[str]) -> Dict[str, Tuple[int, bool]]:
+    """Cumulative import time of every module imported by the command in
+    microseconds, and whether it was imported at the top level
+    """
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", CLI] + args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    modules = {}
+    for line in res.stderr.splitlines():
+        # 'import time: self [us] | cumulative | imported package'
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # nested imports are indented below the module importing them
+        modules[name.strip()] = (int(cumulative), not name.startswith("  "))
+    return modules
+
+
+def top_imports(
+    modules: Dict[str, Tuple[int, bool]], count: int
+) -> List[Tuple[str, int]]:
+    top_level = [(name, us) for name, (us, top) in modules.items() if top]
+    return sorted(top_level, key=lambda item: item[1], reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="+", choices=list(COMMANDS), default=list(COMMANDS)
+    )
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_process(["-c", "pass"], args.repeat))
+    print(
+        f"Median startup of {args.repeat} runs, bare interpreter {baseline * 1000:.0f} ms"
+    )
+    for name in args.only:
+        command = COMMANDS[name]
+        median = statistics.median(time_process([CLI] + command, args.repeat))
+        modules = import_times(command)
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        print(
+            f"\n{name:>12}: {median * 1000:6.0f} ms, "
+            f"heavy imports: {', '.join(heavy) or 'none'}"
+        )
+        for module, cumulative in top_imports(modules, args.top):
+            print(f"{'':>14}{module:<40} {cumulative / 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
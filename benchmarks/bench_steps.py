@@ -0,0 +1,494 @@
+"""Time every workflow step and the dataset I/O against a synthetic data lake.
+
+For every scale, a synthetic data lake is generated with the given number of coins
+and historical executions. The API steps fetch from a stand-in CMC server serving
+the same synthetic market from a separate process. Each benchmark records its wall
+time, peak memory and bytes read and written, and the results are saved as JSON so
+they can be compared between versions.
+
+    pipenv run python3 -m benchmarks.bench_steps --coins 10000 100000 --runs 1 1000
+    pipenv run python3 -m benchmarks.bench_steps --compare benchmarks/results/<baseline>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from os.path import dirname, exists, join
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.synthetic import SyntheticData, SyntheticLake, SyntheticMarket
+from src.api.coin_market_cap_api import CoinMarketCapApi
+from src.api.credit_budget import CreditBudget
+from src.api.rate_limiter import TokenBucket
+from src.api.stand_in_server import StandInServer
+from src.steps import (
+    AverageDifferenceStep,
+    BitcoinComparisonStep,
+    DisplayAveragesStep,
+    ListingsStep,
+    PricingStep,
+    QuotesStep,
+    UniverseStep,
+)
+from src.util.config import (
+    AVG_BITCOIN_DIFF_DATASET,
+    BITCOIN_COMPARISON_DATASET,
+    LISTINGS_DATASET,
+    PRICING_DATASET,
+    QUOTES_DATASET,
+    UNIVERSE_DATASET,
+)
+from src.util.dataframe_ops import read_dataset, write_dataset
+from src.util.dataset_registry import DatasetRegistry
+from src.util.schemas import LISTINGS_DTYPES, UNIVERSE_DTYPES
+
+RESULTS_LOCATION = join(dirname(__file__), "results")
+# Timestamp of the benchmarked execution, historical executions are hourly before it
+TIMESTAMP = "20250116000000"
+
+
+class Benchmark:
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], object],
+        setup: Callable[[], None] = None,
+        produces_input: bool = False,
+    ):
+        """A single benchmarked operation.
+
+        Args:
+            name (str): Name of the benchmark, e.g. 'step.pricing'
+            run (Callable[[], object]): Operation to time
+            setup (Callable[[], None], optional): Called before every run, untimed,
+                e.g. to remove the output of the previous run. Defaults to None.
+            produces_input (bool, optional): Whether later benchmarks read its output,
+                so it still runs untimed when it is not selected. Defaults to False.
+        """
+        self.name = name
+        self.run = run
+        self.setup = setup if setup is not None else lambda: None
+        self.produces_input = produces_input
+
+
+class StandInClient(CoinMarketCapApi):
+
+    # url of the stand-in CMC server, set once it is serving
+    url: Optional[str] = None
+
+    def __init__(self, **kwargs):
+        """API client pointed at the stand-in CMC server. The rate limit of the plan
+        is left out so the fetch paths themselves are measured, and credits are not
+        counted against the real credit budget.
+        """
+        kwargs.setdefault("rate_limiter", TokenBucket(1e9, capacity=1e6))
+        kwargs.setdefault("credit_budget", CreditBudget(None, None))
+        super().__init__(**kwargs)
+        self.host = self.url
+
+
+def serve_synthetic_market(coins: int, urls: multiprocessing.Queue) -> None:
+    server = StandInServer(SyntheticData(SyntheticMarket(coins)))
+    urls.put(server.url)
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def stand_in_api(coins: int) -> Iterator[str]:
+    """Serve a synthetic market from a stand-in CMC server in a separate process, so
+    the server does not compete with the benchmarked steps for the GIL, and point
+    the API steps at it.
+
+    Args:
+        coins (int): Number of coins in the market
+
+    Yields:
+        Iterator[str]: url of the server
+    """
+    context = multiprocessing.get_context("spawn")
+    urls = context.Queue()
+    process = context.Process(
+        target=serve_synthetic_market, args=(coins, urls), daemon=True
+    )
+    process.start()
+    try:
+        StandInClient.url = urls.get(timeout=60)
+        with (
+            patch("src.steps.listings.CoinMarketCapApi", StandInClient),
+            patch("src.steps.quotes.CoinMarketCapApi", StandInClient),
+            patch("src.steps.universe.CoinMarketCapApi", StandInClient),
+        ):
+            yield StandInClient.url
+    finally:
+        process.terminate()
+        process.join()
+
+
+def io_counters() -> Optional[Tuple[int, int]]:
+    """Bytes read and written by this process so far through read and write calls,
+    e.g. datasets and configuration. Socket traffic with the stand-in server is not
+    counted. None on platforms without /proc.
+    """
+    try:
+        with open("/proc/self/io", "r") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+    except OSError:
+        return None
+    return int(counters["rchar"]), int(counters["wchar"])
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Dict:
+    """Time a benchmark, then run it once more with memory tracing to find its peak
+    memory. Tracing slows down the run, so the traced run is not timed.
+
+    Args:
+        benchmark (Benchmark): Benchmark to measure
+        repeat (int): Number of timed runs
+
+    Returns:
+        Dict: Wall time of every run in seconds, peak traced memory and bytes read
+            and written by the first run
+    """
+    wall_seconds = []
+    bytes_read = bytes_written = None
+    for attempt in range(repeat):
+        benchmark.setup()
+        before = io_counters()
+        start = time.perf_counter()
+        benchmark.run()
+        wall_seconds.append(time.perf_counter() - start)
+        after = io_counters()
+        if attempt == 0 and before is not None:
+            bytes_read, bytes_written = after[0] - before[0], after[1] - before[1]
+
+    benchmark.setup()
+    tracemalloc.start()
+    try:
+        benchmark.run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": benchmark.name,
+        "wall_seconds": wall_seconds,
+        "median_seconds": statistics.median(wall_seconds),
+        "min_seconds": min(wall_seconds),
+        "peak_memory_bytes": peak_memory,
+        "bytes_read": bytes_read,
+        "bytes_written": bytes_written,
+    }
+
+
+def remove(*file_paths: str) -> None:
+    for file_path in file_paths:
+        if exists(file_path):
+            os.remove(file_path)
+
+
+def point_at_lake(step: object, lake: SyntheticLake) -> object:
+    """Point the input and output locations of a step at the synthetic data lake"""
+    locations = {
+        "configuration_file_directory": "configuration",
+        "listings_base_path": LISTINGS_DATASET,
+        "listings_file_directory": LISTINGS_DATASET,
+        "quotes_base_path": QUOTES_DATASET,
+        "quotes_file_directory": QUOTES_DATASET,
+        "universe_base_path": UNIVERSE_DATASET,
+        "universe_checkpoint_base_path": "universe_checkpoints",
+        "metadata_cache_directory": "metadata_cache",
+        "pricing_file_directory": PRICING_DATASET,
+        "bitcoin_comparison_directory": BITCOIN_COMPARISON_DATASET,
+        "avg_bitcoin_diff_directory": AVG_BITCOIN_DIFF_DATASET,
+        "avg_bitcoin_diff_state_directory": f"{AVG_BITCOIN_DIFF_DATASET}_state",
+    }
+    for attribute, name in locations.items():
+        if hasattr(step, attribute):
+            setattr(step, attribute, lake.directory(name))
+    return step
+
+
+def step_benchmarks(lake: SyntheticLake) -> List[Benchmark]:
+    """Benchmarks of every step, in workflow order so each step reads the output of
+    the step before it. Every run gets an empty registry, so steps read their
+    inputs from the data lake.
+    """
+
+    def step(cls, *args):
+        return point_at_lake(cls(lake.timestamp, DatasetRegistry(), *args), lake)
+
+    listings_columns = (
+        PricingStep.LISTINGS_COLUMNS
+        + BitcoinComparisonStep.LISTINGS_COLUMNS
+        + UniverseStep.LISTINGS_COLUMNS
+    )
+    listings = step(ListingsStep, listings_columns)
+    quotes = step(QuotesStep)
+    universe = step(UniverseStep)
+    pricing = step(PricingStep)
+    comparison = step(BitcoinComparisonStep)
+    average = step(AverageDifferenceStep)
+    history_state_file = f"{average.avg_bitcoin_diff_state_file}.history"
+
+    def rebuild_history_state():
+        average.rebuild_average_state()
+        shutil.copyfile(average.avg_bitcoin_diff_state_file, history_state_file)
+
+    def restore_history_state():
+        # running totals of every historical execution, without this execution
+        remove(average.avg_bitcoin_diff_file)
+        shutil.copyfile(history_state_file, average.avg_bitcoin_diff_state_file)
+
+    def display_averages():
+        with contextlib.redirect_stdout(io.StringIO()):
+            step(DisplayAveragesStep).display_averages()
+
+    def clear_universe():
+        remove(universe.universe_file, universe.metadata_cache_file)
+        shutil.rmtree(universe.universe_checkpoint_directory, ignore_errors=True)
+
+    return [
+        Benchmark(
+            "step.listings",
+            lambda: step(ListingsStep, listings_columns).generate_listings(),
+            lambda: remove(listings.listings_file),
+        ),
+        Benchmark(
+            "step.quotes",
+            lambda: step(QuotesStep).generate_quotes(),
+            lambda: remove(quotes.quotes_file),
+        ),
+        Benchmark(
+            "step.universe",
+            lambda: step(UniverseStep).generate_universe(),
+            clear_universe,
+        ),
+        Benchmark(
+            "step.pricing",
+            lambda: step(PricingStep).generate_pricing(),
+            lambda: remove(pricing.pricing_file),
+            produces_input=True,
+        ),
+        # before this execution's comparison exists, so only the history is rebuilt
+        Benchmark(
+            "step.average_difference_rebuild",
+            rebuild_history_state,
+            produces_input=True,
+        ),
+        Benchmark(
+            "step.bitcoin_comparison",
+            lambda: step(BitcoinComparisonStep).generate_bitcoin_comparison(),
+            lambda: remove(comparison.bitcoin_comparison_file),
+            produces_input=True,
+        ),
+        Benchmark(
+            "step.average_difference",
+            lambda: step(AverageDifferenceStep).generate_average_difference(),
+            restore_history_state,
+            produces_input=True,
+        ),
+        Benchmark("step.display_averages", display_averages),
+    ]
+
+
+def io_benchmarks(lake: SyntheticLake) -> List[Benchmark]:
+    """Benchmarks of reading and writing the largest datasets through dataframe_ops"""
+    output_directory = lake.directory("io")
+    symbols = lake.market.symbols
+    listings_df = read_dataset(lake.listings_file, dtypes=LISTINGS_DTYPES)
+    universe_df = read_dataset(lake.universe_file, dtypes=UNIVERSE_DTYPES)
+
+    def write(file_name: str, df: pd.DataFrame) -> Benchmark:
+        file_path = join(output_directory, file_name)
+        name = f"io.write_{file_name.replace('.', '_')}"
+        return Benchmark(
+            name, lambda: write_dataset(file_path, df), lambda: remove(file_path)
+        )
+
+    return [
+        Benchmark(
+            "io.read_listings",
+            lambda: read_dataset(lake.listings_file, dtypes=LISTINGS_DTYPES),
+        ),
+        Benchmark(
+            "io.read_listings_projected",
+            lambda: read_dataset(
+                lake.listings_file,
+                columns=PricingStep.LISTINGS_COLUMNS,
+                dtypes=LISTINGS_DTYPES,
+            ),
+        ),
+        Benchmark(
+            "io.read_listings_filtered",
+            lambda: read_dataset(
+                lake.listings_file,
+                columns=PricingStep.LISTINGS_COLUMNS,
+                filters=[("symbol", "in", symbols)],
+                dtypes=LISTINGS_DTYPES,
+            ),
+        ),
+        write("listings.parquet", listings_df),
+        write("listings.csv", listings_df),
+        Benchmark(
+            "io.read_universe",
+            lambda: read_dataset(lake.universe_file, dtypes=UNIVERSE_DTYPES),
+        ),
+        write("universe.parquet", universe_df),
+    ]
+
+
+def run_scale(
+    coins: int, runs: int, repeat: int, lake_root: str, only: List[str]
+) -> List[Dict]:
+    """Generate a synthetic data lake at the given scale and measure every benchmark
+    against it.
+
+    Returns:
+        List[Dict]: Measurements of every benchmark, tagged with the scale
+    """
+    lake = SyntheticLake(lake_root, SyntheticMarket(coins), TIMESTAMP)
+    start = time.perf_counter()
+    lake.generate(runs)
+    print(
+        f"Generated data lake with {coins} coins and {runs} runs in {time.perf_counter() - start:.1f}s"
+    )
+
+    results = []
+    with stand_in_api(coins):
+        benchmarks = step_benchmarks(lake) + io_benchmarks(lake)
+        for benchmark in benchmarks:
+            if only and not any(benchmark.name.startswith(name) for name in only):
+                if benchmark.produces_input:
+                    benchmark.setup()
+                    benchmark.run()
+                continue
+            result = {"coins": coins, "runs": runs, **measure(benchmark, repeat)}
+            results.append(result)
+            print(
+                f"{benchmark.name:>36}: {result['median_seconds'] * 1000:10.1f} ms"
+                f" {result['peak_memory_bytes'] / 2**20:10.1f} MiB peak"
+            )
+    return results
+
+
+def environment() -> Dict:
+    """Versions the results were measured with"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict], baseline_file: str, threshold: float) -> int:
+    """Print the change in median wall time of every benchmark against a baseline.
+
+    Returns:
+        int: Number of benchmarks slower than the baseline by more than the threshold
+    """
+    with open(baseline_file, "r") as file:
+        baseline = {
+            (result["name"], result["coins"], result["runs"]): result
+            for result in json.load(file)["results"]
+        }
+    regressions = 0
+    print(f"\nCompared to '{baseline_file}'")
+    for result in results:
+        key = (result["name"], result["coins"], result["runs"])
+        if key not in baseline:
+            continue
+        ratio = result["median_seconds"] / baseline[key]["median_seconds"]
+        regressed = ratio > 1 + threshold
+        regressions += regressed
+        print(
+            f"{result['name']:>36} ({result['coins']} coins, {result['runs']} runs):"
+            f" {ratio:6.2f}x{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--coins", type=int, nargs="+", default=[10000])
+    parser.add_argument("--runs", type=int, nargs="+", default=[100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        default=[],
+        help="Only run benchmarks whose name starts with one of these, e.g. 'io.'",
+    )
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare", help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Slowdown against the baseline reported as a regression",
+    )
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    results = []
+    for coins in args.coins:
+        for runs in args.runs:
+            lake_root = tempfile.mkdtemp(prefix="crypto_tracker_bench_")
+            try:
+                results.extend(
+                    run_scale(coins, runs, args.repeat, lake_root, args.only)
+                )
+            finally:
+                shutil.rmtree(lake_root, ignore_errors=True)
+
+    output = args.output or join(
+        RESULTS_LOCATION, f"bench_steps_{started_at.strftime('%Y%m%d%H%M%S')}.json"
+    )
+    os.makedirs(dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(
+            {
+                "started_at": started_at.isoformat(),
+                "repeat": args.repeat,
+                "environment": environment(),
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"\nSaved results to '{output}'")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
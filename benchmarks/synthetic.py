@@ -0,0 +1,330 @@
+"""Synthetic CMC data and data lakes for benchmarks, at any scale.
+
+Listings and metadata are generated from the CMC ID alone, so the same coin is
+identical wherever it is generated, e.g. in the data lake and in the stand-in API
+server, without holding the whole market in memory.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+from os.path import dirname, join
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from src.util.config import (
+    AVG_BITCOIN_DIFF_DATASET,
+    BITCOIN_COMPARISON_DATASET,
+    BITCOIN_COMPARISON_FILE_FORMAT,
+    COINS_TO_TRACK_CSV_NAME,
+    LISTINGS_DATASET,
+    LISTINGS_FILE_FORMAT,
+    PRICING_DATASET,
+    QUOTES_DATASET,
+    TIMESTAMP_FORMAT,
+    UNIVERSE_DATASET,
+    UNIVERSE_FILE_FORMAT,
+)
+from src.util.dataframe_ops import open_dataset_writer, write_dataset
+from src.util.flatten import flatten_records
+from src.util.schemas import (
+    LISTINGS_DTYPES,
+    LISTINGS_FIELDS,
+    UNIVERSE_DTYPES,
+    UNIVERSE_FIELDS,
+)
+from src.util.storage import dataset_file
+
+COINS_TO_TRACK_CSV = join(
+    dirname(dirname(__file__)), "data_lake/configuration", COINS_TO_TRACK_CSV_NAME
+)
+# Rows generated and written to the data lake at a time
+CHUNK_SIZE = 50000
+
+
+def tracked_symbols() -> List[str]:
+    """Symbols of the coins to track configuration, Bitcoin first"""
+    symbols = list(pd.read_csv(COINS_TO_TRACK_CSV)["Symbol"])
+    return ["BTC"] + [symbol for symbol in symbols if symbol != "BTC"]
+
+
+class SyntheticMarket:
+
+    def __init__(self, coins: int, symbols: Optional[List[str]] = None):
+        """Market of synthetic coins ranked by CMC ID. The first coins take the tracked
+        symbols, so every step of the workflow finds the coins it tracks, and the
+        rest get a unique symbol from their ID.
+
+        Args:
+            coins (int): Number of active coins
+            symbols (Optional[List[str]], optional): Symbols of the first coins.
+                Defaults to the coins to track configuration.
+        """
+        self.coins = coins
+        self.symbols = symbols if symbols is not None else tracked_symbols()
+        self.ids_by_symbol = {symbol: i + 1 for i, symbol in enumerate(self.symbols)}
+
+    def symbol(self, id: int) -> str:
+        return self.symbols[id - 1] if id <= len(self.symbols) else f"C{id}"
+
+    def name(self, id: int) -> str:
+        return "Bitcoin" if id == 1 else f"Coin {id}"
+
+    def id_for_symbol(self, symbol: str) -> Optional[int]:
+        if symbol in self.ids_by_symbol:
+            return self.ids_by_symbol[symbol]
+        if symbol.startswith("C") and symbol[1:].isdigit():
+            id = int(symbol[1:])
+            if len(self.symbols) < id <= self.coins:
+                return id
+        return None
+
+    def listing(self, id: int) -> Dict:
+        """Listing of a coin, in the layout of the listings API"""
+        rng = random.Random(id)
+        return {
+            "id": id,
+            "name": self.name(id),
+            "symbol": self.symbol(id),
+            "slug": f"coin-{id}",
+            "num_market_pairs": rng.randint(1, 1000),
+            "date_added": "2020-01-01T00:00:00.000Z",
+            "tags": ["mineable", "pow"][: id % 3],
+            "max_supply": None,
+            "circulating_supply": rng.random() * 1e9,
+            "total_supply": rng.random() * 1e9,
+            "infinite_supply": False,
+            "platform": (
+                None
+                if id % 2
+                else {
+                    "id": 1027,
+                    "name": "Ethereum",
+                    "symbol": "ETH",
+                    "slug": "ethereum",
+                    "token_address": f"0x{id:040x}",
+                }
+            ),
+            "cmc_rank": id,
+            "self_reported_circulating_supply": None,
+            "self_reported_market_cap": None,
+            "tvl_ratio": None,
+            "last_updated": "2025-01-16T00:00:00.000Z",
+            "quote": {
+                "USD": {
+                    "price": rng.random(),
+                    "volume_24h": rng.random() * 1e6,
+                    "volume_change_24h": rng.uniform(-50, 50),
+                    "percent_change_1h": rng.uniform(-5, 5),
+                    "percent_change_24h": rng.uniform(-5, 5),
+                    "percent_change_7d": rng.uniform(-5, 5),
+                    "percent_change_30d": rng.uniform(-5, 5),
+                    "percent_change_60d": rng.uniform(-5, 5),
+                    "percent_change_90d": rng.uniform(-5, 5),
+                    "market_cap": rng.random() * 1e9,
+                    "market_cap_dominance": rng.random(),
+                    "fully_diluted_market_cap": rng.random() * 1e9,
+                    "tvl": None,
+                    "last_updated": "2025-01-16T00:00:00.000Z",
+                }
+            },
+        }
+
+    def metadata(self, id: int) -> Dict:
+        """Metadata of a coin, in the layout of the info API"""
+        return {
+            "id": id,
+            "name": self.name(id),
+            "symbol": self.symbol(id),
+            "category": "token" if id % 2 == 0 else "coin",
+            "description": f"Coin {id} is a synthetic coin generated for benchmarks.",
+            "slug": f"coin-{id}",
+            "logo": f"https://s2.coinmarketcap.com/static/img/coins/64x64/{id}.png",
+            "subreddit": "",
+            "notice": "",
+            "tags": ["mineable", "pow"][: id % 3],
+            "tag-names": ["Mineable", "PoW"][: id % 3],
+            "tag-groups": ["OTHERS", "ALGORITHM"][: id % 3],
+            "urls": {
+                "website": [f"https://coin-{id}.org/"],
+                "twitter": [],
+                "message_board": [],
+                "chat": [],
+                "facebook": [],
+                "explorer": [f"https://explorer.coin-{id}.org/"],
+                "reddit": [],
+                "technical_doc": [],
+                "source_code": [],
+                "announcement": [],
+            },
+            "platform": None,
+            "date_added": "2020-01-01T00:00:00.000Z",
+            "twitter_username": "",
+            "is_hidden": 0,
+            "date_launched": None,
+            "contract_address": [],
+            "self_reported_circulating_supply": None,
+            "self_reported_tags": None,
+            "self_reported_market_cap": None,
+            "infinite_supply": False,
+        }
+
+    def listings(self, start: int = 1, stop: Optional[int] = None) -> List[Dict]:
+        stop = self.coins + 1 if stop is None else min(stop, self.coins + 1)
+        return [self.listing(id) for id in range(start, stop)]
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+        for start in range(1, self.coins + 1, chunk_size):
+            yield self.listings(start, start + chunk_size)
+
+
+class SyntheticListings(Sequence):
+
+    def __init__(self, market: SyntheticMarket):
+        """Listings of a synthetic market sorted by rank, generated as they are sliced"""
+        self.market = market
+
+    def __len__(self) -> int:
+        return self.market.coins
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            return self.market.listings(start + 1, stop + 1)
+        return self.market.listing(index + 1)
+
+
+class SyntheticData:
+
+    def __init__(self, market: SyntheticMarket):
+        """Data of a synthetic market served by the stand-in CMC server, in place of
+        src.api.stand_in_server.RecordedData.
+
+        Args:
+            market (SyntheticMarket): Market to serve
+        """
+        self.market = market
+        self.listings = SyntheticListings(market)
+        self.latencies: List[float] = []
+
+    def quotes_for_symbol(self, symbol: str) -> List[Dict]:
+        id = self.market.id_for_symbol(symbol.upper())
+        return [] if id is None else [self.market.listing(id)]
+
+    def metadata_for_id(self, id: int) -> Optional[Dict]:
+        return self.market.metadata(id) if 1 <= id <= self.market.coins else None
+
+
+class SyntheticLake:
+
+    def __init__(self, root: str, market: SyntheticMarket, timestamp: str):
+        """Data lake of a synthetic market, laid out like data_lake/ with one directory
+        per dataset.
+
+        Args:
+            root (str): Root directory of the data lake
+            market (SyntheticMarket): Market the datasets are generated from
+            timestamp (str): UTC Timestamp of the benchmarked execution in YYYYMMDDHHMMSS
+        """
+        self.root = root
+        self.market = market
+        self.timestamp = timestamp
+
+    def directory(self, name: str) -> str:
+        path = join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @property
+    def listings_file(self) -> str:
+        return dataset_file(
+            self.directory(LISTINGS_DATASET),
+            LISTINGS_FILE_FORMAT,
+            self.timestamp,
+            LISTINGS_DATASET,
+        )
+
+    @property
+    def universe_file(self) -> str:
+        return dataset_file(
+            self.directory(UNIVERSE_DATASET),
+            UNIVERSE_FILE_FORMAT,
+            self.timestamp,
+            UNIVERSE_DATASET,
+        )
+
+    def generate(self, runs: int) -> None:
+        """Generate every dataset the workflow reads.
+
+        Args:
+            runs (int): Number of historical executions with a Bitcoin comparison
+        """
+        for name in [
+            AVG_BITCOIN_DIFF_DATASET,
+            f"{AVG_BITCOIN_DIFF_DATASET}_state",
+            PRICING_DATASET,
+            QUOTES_DATASET,
+            "metadata_cache",
+            "universe_checkpoints",
+        ]:
+            self.directory(name)
+        self.generate_coins_to_track()
+        self.generate_listings()
+        self.generate_universe()
+        self.generate_comparison_history(runs)
+
+    def generate_coins_to_track(self) -> None:
+        symbols = self.market.symbols[: self.market.coins]
+        pd.DataFrame({"Symbol": symbols}).to_csv(
+            join(self.directory("configuration"), COINS_TO_TRACK_CSV_NAME), index=False
+        )
+
+    def generate_listings(self) -> None:
+        with open_dataset_writer(self.listings_file, LISTINGS_DTYPES) as writer:
+            for chunk in self.market.chunks():
+                writer.write(flatten_records(chunk, LISTINGS_FIELDS))
+
+    def generate_universe(self) -> None:
+        with open_dataset_writer(self.universe_file, UNIVERSE_DTYPES) as writer:
+            for start in range(1, self.market.coins + 1, CHUNK_SIZE):
+                stop = min(start + CHUNK_SIZE, self.market.coins + 1)
+                metadata = [self.market.metadata(id) for id in range(start, stop)]
+                writer.write(flatten_records(metadata, UNIVERSE_FIELDS))
+
+    def generate_comparison_history(self, runs: int) -> None:
+        """Bitcoin comparisons of the tracked coins, one per hour before the
+        benchmarked execution.
+        """
+        directory = self.directory(BITCOIN_COMPARISON_DATASET)
+        symbols = self.market.symbols[1 : self.market.coins]
+        executed_at = datetime.strptime(self.timestamp, TIMESTAMP_FORMAT)
+        rng = random.Random(runs)
+        ids = [self.market.ids_by_symbol[symbol] for symbol in symbols]
+        for run in range(runs, 0, -1):
+            executed_before = executed_at - timedelta(hours=run)
+            bitcoin_change = rng.uniform(-5, 5)
+            changes = [rng.uniform(-10, 10) for _ in symbols]
+            comparison_df = pd.DataFrame(
+                {
+                    "ID": ids,
+                    "Symbol": symbols,
+                    "Name": [self.market.name(id) for id in ids],
+                    "BitcoinVsCurrency24hPercentChangeDiff": [
+                        change - bitcoin_change for change in changes
+                    ],
+                    "PercentChange24h": changes,
+                    "BitcoinPercentChange24h": bitcoin_change,
+                    "LoadedWhen": executed_before.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                }
+            ).sort_values("BitcoinVsCurrency24hPercentChangeDiff")
+            timestamp = executed_before.strftime(TIMESTAMP_FORMAT)
+            write_dataset(
+                dataset_file(
+                    directory,
+                    BITCOIN_COMPARISON_FILE_FORMAT,
+                    timestamp,
+                    BITCOIN_COMPARISON_DATASET,
+                ),
+                comparison_df,
+            )
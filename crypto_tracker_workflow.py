@@ -1,20 +1,46 @@
 import argparse
 import logging
+import signal
 import sys
 from datetime import datetime, timezone
+from os.path import join
+from typing import TYPE_CHECKING, List, Optional
 
-import pandas as pd
-
-from src.steps import (
-    AverageDifferenceStep,
-    BitcoinComparisonStep,
-    DisplayAveragesStep,
-    ListingsStep,
-    PricingStep,
-    UniverseStep,
+# Only light modules are imported up front, so commands that do not run the workflow
+# start fast. pandas, requests and the steps are imported when the workflow runs.
+from src.util.catalog import get_catalog
+from src.util.config import (
+    AVG_BITCOIN_DIFF_DATA_LOCATION,
+    AVG_BITCOIN_DIFF_FILE_FORMAT,
+    DAEMON_INTERVAL_SECONDS,
+    DATA_LAKE_CATALOG,
+    DATA_LAKE_LOCATION,
+    DATASET_LOCATIONS,
+    LISTINGS_SELECT_FIELDS,
+    LOGGER_NAME,
+    METRICS_TEXTFILE,
+    PRICING_MODE,
+    PRICING_MODE_QUOTES,
+    PRICING_MODES,
+    PROFILE_LOCATION,
+    RUN_REPORT_FILE_FORMAT,
+    RUN_REPORT_LOCATION,
+    TIMESTAMP_FORMAT,
+    UNIVERSE_DATA_LOCATION,
+)
+from src.util.exceptions import InvalidPricingModeException, InvalidTimestampException
+from src.util.quick_view import (
+    format_run_report,
+    latest_dataset,
+    latest_run_report,
+    print_averages_table,
+    read_table,
 )
-from src.util.config import LOGGER_NAME, TIMESTAMP_FORMAT
-from src.util.exceptions import InvalidTimestampException
+from src.util.schemas import AVG_BITCOIN_DIFF_DTYPES
+
+if TYPE_CHECKING:
+    from src.util.metrics import RunReport
+    from src.workflow import WarmState
 
 # Creating Logger
 logger = logging.getLogger(LOGGER_NAME)
@@ -31,19 +57,146 @@ stdout_handler.setFormatter(formatter)
 # Add the handler to the logger
 logger.addHandler(stdout_handler)
 
+COMMANDS = [
+    "run",
+    "show",
+    "status",
+    "rebuild-catalog",
+    "compact",
+    "export-universe",
+]
 
-def main() -> None:
-    """Configure timestamp for the execution and call the main driver.
 
-    The timestamp is either generated from current time in UTC, or from end user input.
+def main(argv: Optional[List[str]] = None) -> int:
+    """Parse the command and its flags and run it.
+
+    Running without a command runs the workflow, so existing schedules keep working.
+
+    Args:
+        argv (Optional[List[str]], optional): Command line arguments. Defaults to
+            sys.argv.
+
+    Returns:
+        int: Exit code of the command
     """
-    # Optionally can add '--timestamp' arg
-    parser = argparse.ArgumentParser(description="Processing any optional flags")
-    parser.add_argument(
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS + ["-h", "--help"]:
+        argv = ["run"] + argv
+
+    parser = argparse.ArgumentParser(
+        description="Track the 24 hour price change of crypto currencies against Bitcoin"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser(
+        "run", help="Run the workflow, the default command"
+    )
+    run_parser.set_defaults(handler=run_command)
+    run_parser.add_argument(
         "--timestamp",
         help="Optional flag for setting timestamp in YYYYMMDDHHMMSS format for execution. Helpful for re-running partially complete workflows.",
     )
-    args = parser.parse_args()
+    run_parser.add_argument(
+        "--rebuild-averages",
+        action="store_true",
+        help="Rebuild the running averages from every Bitcoin comparison dataset in the data lake and exit. Use to repair the averages.",
+    )
+    run_parser.add_argument(
+        "--pricing-mode",
+        choices=PRICING_MODES,
+        default=PRICING_MODE,
+        help="'listings' prices coins from the full listings of every active coin. 'quotes' only requests quotes for the tracked coins and Bitcoin, skipping the listings and universe datasets.",
+    )
+    run_parser.add_argument(
+        "--profile",
+        nargs="*",
+        metavar="STEP",
+        help="Profile the CPU time, memory allocations and call stacks of the given steps, or of every step if none are given. Steps run one at a time while profiling. Profiles are written to 'data_lake/profiles/{timestamp}/'.",
+    )
+    run_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and execute the workflow on a schedule, reusing API connections, cached metadata and running averages between executions. Executions still running when the next one is due cause it to be skipped.",
+    )
+    run_parser.add_argument(
+        "--interval",
+        type=float,
+        default=DAEMON_INTERVAL_SECONDS,
+        help="Seconds between executions in daemon mode. Executions start on multiples of the interval in UTC.",
+    )
+
+    show_parser = commands.add_parser(
+        "show",
+        help="Print the average differences of the latest execution, without running the workflow",
+    )
+    show_parser.set_defaults(handler=show_command)
+    show_parser.add_argument(
+        "--timestamp",
+        help="Print the average differences of the execution with this timestamp in YYYYMMDDHHMMSS format instead.",
+    )
+
+    status_parser = commands.add_parser(
+        "status",
+        help="Print the run report of the latest execution. Exits with 1 if it failed.",
+    )
+    status_parser.set_defaults(handler=status_command)
+
+    rebuild_catalog_parser = commands.add_parser(
+        "rebuild-catalog",
+        help="Rebuild the data lake catalog from the dataset files in 'data_lake/', e.g. after it was deleted or files were restored from a backup.",
+    )
+    rebuild_catalog_parser.set_defaults(handler=rebuild_catalog_command)
+
+    compact_parser = commands.add_parser(
+        "compact",
+        help="Merge the files of every execution of a day into a single parquet file per dataset, in the partition of the day. Executions are still read by their timestamp.",
+    )
+    compact_parser.set_defaults(handler=compact_command)
+    compact_parser.add_argument(
+        "--dataset",
+        action="append",
+        choices=list(DATASET_LOCATIONS),
+        help="Only compact this dataset, can be given more than once. Defaults to every dataset.",
+    )
+    compact_parser.add_argument(
+        "--before",
+        help="Only compact days before this day in YYYY-MM-DD format. Defaults to the current UTC day, which executions are still written to.",
+    )
+
+    export_universe_parser = commands.add_parser(
+        "export-universe",
+        help="Write the full universe of an execution to a .csv or .parquet file, rebuilt from the last universe snapshot before it and the changes since.",
+    )
+    export_universe_parser.set_defaults(handler=export_universe_command)
+    export_universe_parser.add_argument(
+        "output", help="File to write the universe to, ending in .csv or .parquet."
+    )
+    export_universe_parser.add_argument(
+        "--timestamp",
+        help="Export the universe of the execution with this timestamp in YYYYMMDDHHMMSS format. Defaults to the latest execution.",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.daemon and args.timestamp:
+        parser.error("--timestamp cannot be used with --daemon")
+    return args.handler(args)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """Configure timestamp for the execution and call the main driver.
+
+    The timestamp is either generated from current time in UTC, or from end user input.
+    """
+    if args.rebuild_averages:
+        from src.steps import AverageDifferenceStep
+
+        logger.info("Rebuilding running averages from all Bitcoin comparison datasets")
+        AverageDifferenceStep(None).rebuild_average_state()
+        return 0
+
+    if args.daemon:
+        run_daemon(args.interval, args.pricing_mode, args.profile)
+        return 0
 
     if args.timestamp:
         logger.info(
@@ -56,7 +209,126 @@ def main() -> None:
         # Used so we can track all files generated through a singular execution.
         analysis_timestamp = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
 
-    run_workflow(analysis_timestamp)
+    run_workflow(analysis_timestamp, args.pricing_mode, args.profile)
+    return 0
+
+
+def show_command(args: argparse.Namespace) -> int:
+    """Print the average difference dataset of the latest execution, or of the given
+    execution, the same way the workflow displays it. Does not import pandas.
+    """
+    if args.timestamp:
+        validate_timestamp_format(args.timestamp)
+    latest = latest_dataset(
+        AVG_BITCOIN_DIFF_DATA_LOCATION, AVG_BITCOIN_DIFF_FILE_FORMAT, args.timestamp
+    )
+    if latest is None:
+        logger.error(
+            f"No average difference dataset in '{AVG_BITCOIN_DIFF_DATA_LOCATION}'"
+            + (f" for execution {args.timestamp}" if args.timestamp else "")
+            + ". Run the workflow first."
+        )
+        return 1
+    timestamp, avg_diff_file = latest
+    print_averages_table(*read_table(avg_diff_file, timestamp, AVG_BITCOIN_DIFF_DTYPES))
+    return 0
+
+
+def status_command(args: argparse.Namespace) -> int:
+    """Print the run report of the latest execution. Does not import pandas."""
+    report = latest_run_report(RUN_REPORT_LOCATION, RUN_REPORT_FILE_FORMAT)
+    if report is None:
+        logger.error(f"No run reports in '{RUN_REPORT_LOCATION}'")
+        return 1
+    print(format_run_report(report))
+    return 0 if report["status"] == "succeeded" else 1
+
+
+def rebuild_catalog_command(args: argparse.Namespace) -> int:
+    """Rebuild the data lake catalog, printing the files found per dataset"""
+    if not DATA_LAKE_CATALOG:
+        logger.error("The data lake catalog is disabled with DATA_LAKE_CATALOG")
+        return 1
+    catalog = get_catalog()
+    if catalog is None:
+        logger.error("Unable to open the data lake catalog")
+        return 1
+    logger.info(f"Rebuilding the data lake catalog at '{catalog.db_file}'")
+    for dataset, count in catalog.rebuild(DATA_LAKE_LOCATION).items():
+        print(f"{dataset:<24} {count:>8} files")
+    return 0
+
+
+def compact_command(args: argparse.Namespace) -> int:
+    """Compact the datasets of the data lake, printing the files merged per day"""
+    from src.util.compaction import compact_dataset
+
+    if args.before:
+        validate_date_format(args.before)
+    for dataset in args.dataset or list(DATASET_LOCATIONS):
+        logger.info(f"Compacting dataset '{dataset}'")
+        for date, count in compact_dataset(dataset, args.before).items():
+            print(f"{dataset:<24} {date} {count:>8} files merged")
+    return 0
+
+
+def export_universe_command(args: argparse.Namespace) -> int:
+    """Write the full universe of the latest execution, or of the given execution"""
+    from src.util.storage import storage_format_for_path
+    from src.util.universe_snapshots import UniverseSnapshots
+
+    timestamp = args.timestamp
+    if timestamp:
+        validate_timestamp_format(timestamp)
+    snapshots = UniverseSnapshots()
+    if not timestamp:
+        executions = snapshots.executions()
+        timestamp = executions[-1][0] if executions else None
+    universe = None if timestamp is None else snapshots.materialize(timestamp)
+    if universe is None:
+        logger.error(
+            f"No universe dataset in '{UNIVERSE_DATA_LOCATION}'"
+            + (f" for execution {args.timestamp}" if args.timestamp else "")
+            + ". Run the workflow first."
+        )
+        return 1
+    storage_format_for_path(args.output).write(args.output, universe)
+    logger.info(
+        f"Universe of execution {timestamp} with {len(universe)} coins written to"
+        f" '{args.output}'"
+    )
+    return 0
+
+
+def run_daemon(
+    interval_seconds: float,
+    pricing_mode: str = PRICING_MODE,
+    profile_steps: Optional[List[str]] = None,
+) -> None:
+    """Run the workflow on a schedule until stopped with Ctrl+C or SIGTERM.
+
+    Args:
+        interval_seconds (float): Seconds between executions
+        pricing_mode (str, optional): "listings" or "quotes". Defaults to PRICING_MODE.
+        profile_steps (Optional[List[str]], optional): Steps to profile in every
+            execution, see run_workflow. Defaults to None.
+    """
+    from src.workflow import WarmState, WorkflowDaemon
+
+    validate_pricing_mode(pricing_mode)
+    warm_state = WarmState()
+    daemon = WorkflowDaemon(
+        lambda timestamp: run_workflow(
+            timestamp, pricing_mode, profile_steps, warm_state
+        ),
+        interval_seconds,
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    try:
+        daemon.serve()
+    finally:
+        warm_state.close()
 
 
 def validate_timestamp_format(timestamp: str) -> None:
@@ -76,54 +348,221 @@ def validate_timestamp_format(timestamp: str) -> None:
         raise InvalidTimestampException(msg)
 
 
-def run_workflow(timestamp: str) -> None:
+def validate_date_format(date: str) -> None:
+    """Validate a day given by the user
+
+    Args:
+        date (str): Day that should be in YYYY-MM-DD format
+
+    Raises:
+        InvalidTimestampException: Raise exception if the day is invalid
+    """
+    try:
+        _ = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        msg = f"Invalid date input: {date}. Should be in YYYY-MM-DD format."
+        logger.error(msg)
+        raise InvalidTimestampException(msg)
+
+
+def validate_pricing_mode(pricing_mode: str) -> None:
+    """Validate the pricing mode, which may come from the PRICING_MODE env variable
+
+    Args:
+        pricing_mode (str): Pricing mode, one of PRICING_MODES
+
+    Raises:
+        InvalidPricingModeException: Raise exception if pricing mode is invalid
+    """
+    if pricing_mode not in PRICING_MODES:
+        msg = (
+            f"Invalid pricing mode: '{pricing_mode}'. Should be one of {PRICING_MODES}."
+        )
+        logger.error(msg)
+        raise InvalidPricingModeException(msg)
+
+
+def run_workflow(
+    timestamp: str,
+    pricing_mode: str = PRICING_MODE,
+    profile_steps: Optional[List[str]] = None,
+    warm_state: Optional["WarmState"] = None,
+) -> None:
     """Main Driver for running the data workflow
 
+    Steps are declared as a dependency graph and each step starts as soon as the
+    datasets it reads are ready. Pricing and everything after it only depends on the
+    listings, so the slow Universe step runs alongside the silver and gold steps.
+
+    In the "quotes" pricing mode the listings and universe are skipped, and pricing
+    only depends on the quotes of the tracked coins.
+
+    Datasets are shared between steps through a run scoped DatasetRegistry.
+
+    The metrics of every step are written to a run report once the workflow
+    finishes or fails.
+
     Args:
         timestamp (str): Timestamp in YYYYMMDDHHMMSS format
+        pricing_mode (str, optional): "listings" or "quotes". Defaults to PRICING_MODE.
+        profile_steps (Optional[List[str]], optional): Names of the steps to profile,
+            an empty list to profile every step, or None to not profile.
+            Defaults to None.
+        warm_state (Optional[WarmState], optional): API client, metadata cache and
+            running averages kept between the executions of a daemon. Steps build
+            and read their own if not provided. Defaults to None.
     """
+    from src.steps import (
+        AverageDifferenceStep,
+        BitcoinComparisonStep,
+        DisplayAveragesStep,
+        ListingsStep,
+        PricingStep,
+        QuotesStep,
+        UniverseStep,
+    )
+    from src.util.dataset_registry import DatasetRegistry
+    from src.util.metrics import RunReport
+    from src.util.profiling import StepProfiler
+    from src.workflow import WorkflowDag
+
+    validate_pricing_mode(pricing_mode)
     logger.info(f"Starting crypto workflow with following datetime stamp: {timestamp}")
+    report = RunReport(timestamp, pricing_mode)
+    profiler = None
+    if profile_steps is not None:
+        profile_directory = join(PROFILE_LOCATION, timestamp)
+        profiler = StepProfiler(profile_directory, profile_steps or None)
+        logger.info(f"Profiling steps one at a time into '{profile_directory}'")
+    dag = WorkflowDag(report=report, profiler=profiler)
+    # Datasets produced by a step are handed to later steps in memory, the data lake
+    # is only read for datasets produced by a previous execution
+    registry = DatasetRegistry()
+    api = warm_state.api if warm_state is not None else None
 
     ######## BRONZE TIER DATASETS ########
 
-    # 1. Generate list of all active Crypto Currencies and save output dataset
-    logger.info("Generating list of all active crypto currency listings")
-    ListingsStep(timestamp).generate_listings()
+    if pricing_mode == PRICING_MODE_QUOTES:
+        # 1. Generate quotes of only the coins to track and Bitcoin
+        source_task = "quotes"
+        dag.add_task(
+            source_task,
+            QuotesStep(timestamp, registry, api).generate_quotes,
+            description="Generating latest quotes for coins to track and Bitcoin",
+        )
+    else:
+        # 1. Generate list of all active Crypto Currencies and save output dataset
+        source_task = "listings"
+        listings_columns = None
+        if LISTINGS_SELECT_FIELDS:
+            # only request the listing fields read by later steps
+            listings_columns = (
+                PricingStep.LISTINGS_COLUMNS
+                + BitcoinComparisonStep.LISTINGS_COLUMNS
+                + UniverseStep.LISTINGS_COLUMNS
+            )
+        dag.add_task(
+            source_task,
+            ListingsStep(timestamp, registry, listings_columns, api).generate_listings,
+            description="Generating list of all active crypto currency listings",
+        )
 
-    # 2. Use Crypto Currency list to generate universe of metadata
-    logger.info(
-        "Generating universe of coin metadata for all active crypto currency listings "
-        "(this may take a few minutes due to API throttling limitations)"
-    )
-    UniverseStep(timestamp).generate_universe()
+        # 2. Use Crypto Currency list to generate universe of metadata
+        dag.add_task(
+            "universe",
+            UniverseStep(
+                timestamp,
+                registry,
+                api,
+                warm_state.metadata_cache if warm_state is not None else None,
+            ).generate_universe,
+            depends_on=["listings"],
+            description=(
+                "Generating universe of coin metadata for all active crypto currency listings "
+                "(this may take a few minutes due to API throttling limitations)"
+            ),
+        )
 
     ######## SILVER TIER DATASET ########
 
     # 3. Generate pricing dataset for the coins specified in the coins_to_track.csv input
-    logger.info(
-        "Generating pricing dataset for coins specified in 'data_lake/configuration/coins_to_track.csv'"
+    dag.add_task(
+        "pricing",
+        PricingStep(timestamp, registry, pricing_mode).generate_pricing,
+        depends_on=[source_task],
+        description=(
+            "Generating pricing dataset for coins specified in "
+            "'data_lake/configuration/coins_to_track.csv'"
+        ),
     )
-    PricingStep(timestamp).generate_pricing()
 
     ######## GOLD TIER DATASETS ########
     # 4. Generate bitcoin comparison dataset using pricing dataset and bitcoin values in
     #    coins list
-    logger.info(
-        "Generating dataset comparing price changes between specified coins and Bitcoin"
+    dag.add_task(
+        "bitcoin_comparison",
+        BitcoinComparisonStep(
+            timestamp, registry, pricing_mode
+        ).generate_bitcoin_comparison,
+        depends_on=["pricing", source_task],
+        description="Generating dataset comparing price changes between specified coins and Bitcoin",
     )
-    BitcoinComparisonStep(timestamp).generate_bitcoin_comparison()
 
     # 5. Generate file with average price change difference for each coin across all executions
-    logger.info(
-        "Generating dataset with average difference in 24h percent change vs Bitcoin across all executions"
+    dag.add_task(
+        "average_difference",
+        AverageDifferenceStep(
+            timestamp,
+            registry,
+            warm_state.average_state if warm_state is not None else None,
+        ).generate_average_difference,
+        depends_on=["bitcoin_comparison"],
+        description=(
+            "Generating dataset with average difference in 24h percent change vs "
+            "Bitcoin across all executions"
+        ),
     )
-    AverageDifferenceStep(timestamp).generate_average_difference()
 
     ######## END USER DISPLAY ########
     # 6. Fetch final dataset for display
-    logger.info("Gathering average difference dataset for display to end user")
-    DisplayAveragesStep(timestamp).display_averages()
+    dag.add_task(
+        "display_averages",
+        DisplayAveragesStep(timestamp, registry).display_averages,
+        depends_on=["average_difference"],
+        description="Gathering average difference dataset for display to end user",
+    )
+
+    try:
+        dag.run()
+        report.finish(succeeded=True)
+    except Exception:
+        report.finish(succeeded=False)
+        raise
+    finally:
+        write_run_report(report)
+
+
+def write_run_report(report: "RunReport") -> None:
+    """Write the run report to the data lake, and to the Prometheus textfile if
+    METRICS_TEXTFILE is set.
+
+    Args:
+        report (RunReport): Report of the execution
+    """
+    report_file = join(
+        RUN_REPORT_LOCATION, RUN_REPORT_FILE_FORMAT.format(report.timestamp)
+    )
+    report.write_json(report_file)
+    for step in report.to_dict()["steps"]:
+        logger.info(
+            f"Step '{step['step']}' {'skipped' if step['skipped'] else step['status']}"
+            f" in {step['duration_seconds']:.2f}s: {step['rows_in']} rows in,"
+            f" {step['rows_out']} rows out, {step['api_calls']} API calls"
+        )
+    logger.info(f"Run report written to '{report_file}'")
+    if METRICS_TEXTFILE:
+        report.write_prometheus(METRICS_TEXTFILE)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
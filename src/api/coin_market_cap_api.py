@@ -1,11 +1,52 @@
+import logging
 import os
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Union
 from urllib.parse import quote_plus, urljoin
 
 import requests
-from retry import retry
+from requests.adapters import HTTPAdapter
 
-from src.util.config import COIN_MARKET_CAP_ACCESS_KEY, COIN_MARKET_CAP_HOST
+from src.api.credit_budget import CreditBudget
+from src.api.rate_limiter import (
+    SharedTokenBucket,
+    TokenBucket,
+    build_rate_limiter,
+    parse_retry_after,
+)
+from src.api.response_recorder import ResponseRecorder
+from src.api.retry_policy import RetryPolicy
+from src.util.batch_checkpoint import BatchCheckpoint
+from src.util.config import (
+    CMC_MAX_WORKERS,
+    CMC_POOL_SIZE,
+    CMC_RECORD_RESPONSES,
+    CMC_REQUEST_TIMEOUT,
+    COIN_MARKET_CAP_ACCESS_KEY,
+    COIN_MARKET_CAP_HOST,
+    LOGGER_NAME,
+)
+from src.util.exceptions import RateLimitedException
+from src.util.metrics import propagate_context, record
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Signature of a per-request timing hook: (response, seconds elapsed)
+TimingHook = Callable[[requests.Response, float], None]
+
+
+def log_request_timing(res: requests.Response, seconds: float) -> None:
+    """Default timing hook. Logs the wall time of each request at debug level.
+
+    Args:
+        res (requests.Response): Response of the completed request
+        seconds (float): Wall time of the request, including reading the body
+    """
+    logger.debug(
+        f"{res.request.method} {res.url} -> {res.status_code} in {seconds:.3f}s "
+        f"({len(res.content)} bytes, encoding={res.headers.get('Content-Encoding')})"
+    )
 
 
 class CoinMarketCapApi:
@@ -14,9 +55,144 @@ class CoinMarketCapApi:
     Docs: https://coinmarketcap.com/api/documentation/v1/#section/Introduction
     """
 
-    def __init__(self):
+    # Max number of listings the API returns in a single page
+    LISTINGS_PAGE_LIMIT = 5000
+
+    # Optional listing fields selected with the 'aux' parameter, in the default set the
+    # API returns when 'aux' is not given. id, name, symbol, slug, last_updated and the
+    # quote are always returned.
+    LISTINGS_AUX_FIELDS = [
+        "num_market_pairs",
+        "cmc_rank",
+        "date_added",
+        "tags",
+        "platform",
+        "max_supply",
+        "circulating_supply",
+        "total_supply",
+    ]
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        pool_size: int = CMC_POOL_SIZE,
+        rate_limiter: Optional[Union[TokenBucket, SharedTokenBucket]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        credit_budget: Optional[CreditBudget] = None,
+    ):
+        """API client that owns a pooled, keep-alive HTTP session so that repeat calls
+        against the CMC host reuse connections instead of paying for a new TCP + TLS
+        handshake on every request.
+
+        Args:
+            session (Optional[requests.Session], optional): Pre-existing session to reuse.
+                A new pooled session is built if not provided. Defaults to None.
+            pool_size (int, optional): Max number of pooled connections to the host.
+                Defaults to CMC_POOL_SIZE.
+            rate_limiter (Optional[Union[TokenBucket, SharedTokenBucket]], optional):
+                Token bucket every request draws from. A bucket sized to
+                CMC_REQUESTS_PER_MINUTE is built if not provided, shared with every
+                process on the host if CMC_SHARED_RATE_LIMIT is set. Defaults to None.
+            retry_policy (Optional[RetryPolicy], optional): Policy requests are retried
+                with, holding the circuit breaker of the client. Defaults to None.
+            credit_budget (Optional[CreditBudget], optional): Monthly budget of API
+                credits requests draw from. Defaults to None.
+        """
         self.host = COIN_MARKET_CAP_HOST
         self.access_token = COIN_MARKET_CAP_ACCESS_KEY
+        self.timeout = CMC_REQUEST_TIMEOUT
+        self.session = session if session is not None else self.build_session(pool_size)
+        self.rate_limiter = (
+            rate_limiter if rate_limiter is not None else build_rate_limiter()
+        )
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.credit_budget = (
+            credit_budget if credit_budget is not None else CreditBudget()
+        )
+        # Called after every request with the response and wall time in seconds
+        self.timing_hooks: List[TimingHook] = [log_request_timing]
+        if CMC_RECORD_RESPONSES:
+            # record mode, responses are saved to be replayed by the stand-in server
+            self.timing_hooks.append(ResponseRecorder())
+
+    @staticmethod
+    def build_session(pool_size: int = CMC_POOL_SIZE) -> requests.Session:
+        """Build a session with a connection pool sized for concurrent requests and
+        compressed responses negotiated.
+
+        Args:
+            pool_size (int, optional): Max number of pooled connections per host.
+                Defaults to CMC_POOL_SIZE.
+
+        Returns:
+            requests.Session: Session ready to be used against the CMC API
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+        return session
+
+    def close(self) -> None:
+        """Release the pooled connections held by the session"""
+        self.session.close()
+
+    def get(self, url: str, params: Dict) -> requests.Response:
+        """Make a GET request through the pooled session and report timing to the
+        registered timing hooks. Waits on the rate limiter before sending the request.
+
+        If the API responds with 429 the rate limiter is paused for as long as the
+        'Retry-After' header asks, so all requests sharing it back off together.
+
+        Args:
+            url (str): Full URL to request
+            params (Dict): Query parameters of the request
+
+        Raises:
+            CreditBudgetExceededException: Raised when the monthly credit budget is
+                used up
+            RateLimitedException: Raised when the API responds with 429
+
+        Returns:
+            requests.Response: Response of the request, other statuses have not been checked
+        """
+        self.credit_budget.check()
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        res = self.session.get(
+            url, headers=self.headers, params=params, timeout=self.timeout
+        )
+        # accessing content forces the full body to be read before stopping the clock
+        _ = res.content
+        elapsed = time.perf_counter() - start
+        for hook in self.timing_hooks:
+            hook(res, elapsed)
+        record(api_calls=1)
+
+        if res.status_code == 429:
+            record(rate_limited=1)
+            retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            self.rate_limiter.pause(retry_after)
+            raise RateLimitedException(
+                f"Rate limited by CMC API on '{url}', retry after {retry_after}s",
+                retry_after,
+            )
+        return res
+
+    def record_credits(self, body: Dict) -> None:
+        """Count the credits used by a request against the credit budget.
+
+        Args:
+            body (Dict): Parsed JSON body of the response
+        """
+        status = body.get("status") if isinstance(body, dict) else None
+        credits = status.get("credit_count") if isinstance(status, dict) else None
+        if isinstance(credits, int) and credits > 0:
+            self.credit_budget.record(credits)
+            record(credits_used=credits)
 
     @property
     def headers(self) -> Dict:
@@ -30,8 +206,23 @@ class CoinMarketCapApi:
             "X-CMC_PRO_API_KEY": self.access_token,
         }
 
-    @retry(tries=3, delay=2, backoff=2)
-    def get_latest_listings(self, start: int, limit: int) -> Dict:
+    @classmethod
+    def listings_aux_for_columns(cls, columns: List[str]) -> List[str]:
+        """Smallest set of optional listing fields that covers the given columns.
+
+        Args:
+            columns (List[str]): Flattened listing columns, e.g. 'cmc_rank' or
+                'platform.id'
+
+        Returns:
+            List[str]: Optional fields to request with the 'aux' parameter
+        """
+        top_level_fields = {column.split(".")[0] for column in columns}
+        return [field for field in cls.LISTINGS_AUX_FIELDS if field in top_level_fields]
+
+    def get_latest_listings(
+        self, start: int, limit: int, aux: Optional[List[str]] = None
+    ) -> Dict:
         """
         Call to get the latest Listings. This includes all the data for a singular page.
 
@@ -40,11 +231,29 @@ class CoinMarketCapApi:
         Args:
             start (int): 1-indexed start index to retrieve from the list
             limit (int): Number of listings to return (1-5000)
+            aux (Optional[List[str]], optional): Optional fields to return, from
+                LISTINGS_AUX_FIELDS. None for the default fields. Defaults to None.
 
         Returns:
             Dict: Dictionary with "data" and "status" objects
 
         """
+        return self.retry_policy.call(self.request_latest_listings, start, limit, aux)
+
+    def request_latest_listings(
+        self, start: int, limit: int, aux: Optional[List[str]] = None
+    ) -> Dict:
+        """Single request for a page of the latest Listings, without retries.
+
+        Args:
+            start (int): 1-indexed start index to retrieve from the list
+            limit (int): Number of listings to return (1-5000)
+            aux (Optional[List[str]], optional): Optional fields to return. None for
+                the default fields. Defaults to None.
+
+        Returns:
+            Dict: Dictionary with "data" and "status" objects
+        """
         url = urljoin(self.host, "/v1/cryptocurrency/listings/latest")
         parameters = {
             "start": str(start),
@@ -52,41 +261,179 @@ class CoinMarketCapApi:
             "convert": "USD",
             "sort": "market_cap",
         }
-        res = requests.get(url, headers=self.headers, params=parameters)
+        if aux is not None:
+            parameters["aux"] = ",".join(aux)
+        res = self.get(url, params=parameters)
+        # use requests library to raise exceptions based on status
+        res.raise_for_status()
+        body = res.json()
+        self.record_credits(body)
+        return body
+
+    def get_latest_quotes(self, symbols: List[str]) -> List[Dict]:
+        """Call to get the latest quotes for a collection of symbols in a single
+        request. Every coin sharing a symbol is returned, including inactive coins.
+
+        Reference: https://coinmarketcap.com/api/documentation/v1/#operation/getV2CryptocurrencyQuotesLatest
+
+        Args:
+            symbols (List[str]): Symbols of the coins to quote
+
+        Returns:
+            List[Dict]: Quote objects of every coin matching the symbols. Symbols that
+                do not match any coin are left out.
+        """
+        return self.retry_policy.call(self.request_latest_quotes, symbols)
+
+    def request_latest_quotes(self, symbols: List[str]) -> List[Dict]:
+        """Single request for the latest quotes of a collection of symbols, without
+        retries.
+
+        Args:
+            symbols (List[str]): Symbols of the coins to quote
+
+        Returns:
+            List[Dict]: Quote objects of every coin matching the symbols
+        """
+        url = urljoin(self.host, "/v2/cryptocurrency/quotes/latest")
+        params = {
+            "symbol": ",".join(symbols),
+            "convert": "USD",
+            # leave out invalid symbols instead of failing the whole request
+            "skip_invalid": "true",
+        }
+        res = self.get(url, params=params)
         # use requests library to raise exceptions based on status
         res.raise_for_status()
-        return res.json()
+        body = res.json()
+        self.record_credits(body)
+        quotes_obj = body["data"]
+        return [quote for quotes in quotes_obj.values() for quote in quotes]
 
-    def get_all_latest_listings(self) -> List[Dict]:
+    def get_all_latest_listings(
+        self,
+        concurrent: bool = False,
+        max_workers: int = CMC_MAX_WORKERS,
+        aux: Optional[List[str]] = None,
+    ) -> List[Dict]:
         """Paginate through all the latest listings and return a list of the
         available CryptoCurrency listings
 
+        Args:
+            concurrent (bool, optional): Once the first page gives the total count,
+                fetch the remaining pages concurrently. Defaults to False.
+            max_workers (int, optional): Number of workers used when fetching
+                concurrently. Defaults to CMC_MAX_WORKERS.
+            aux (Optional[List[str]], optional): Optional fields to return. None for
+                the default fields. Defaults to None.
+
         Returns:
             List[Dict]: Returns Dict information on all the available listings
         """
-        listings = []
+        if concurrent:
+            return self.get_all_latest_listings_concurrent(max_workers, aux)
+
+        return [
+            listing for page in self.iter_latest_listings_pages(aux) for listing in page
+        ]
+
+    def iter_latest_listings_pages(
+        self, aux: Optional[List[str]] = None
+    ) -> Iterator[List[Dict]]:
+        """Paginate through all the latest listings one page at a time. Each page is
+        only requested once the previous page has been consumed, so only a single
+        page needs to be held in memory.
+
+        Args:
+            aux (Optional[List[str]], optional): Optional fields to return. None for
+                the default fields. Defaults to None.
+
+        Yields:
+            Iterator[List[Dict]]: Listings of each page, in order
+        """
+        fetched = 0
         start = 1
-        limit = 5000
+        limit = self.LISTINGS_PAGE_LIMIT
         total_count = None
 
-        while total_count is None or len(listings) < total_count:
-            res = self.get_latest_listings(start, limit)
+        while total_count is None or fetched < total_count:
+            res = self.get_latest_listings(start, limit, aux=aux)
             if not total_count:
                 # To avoid an infinite loop, based off of sandbox this may not
                 # return if there are only a few listings
                 total_count = res["status"].get("total_count", 0)
-            listings.extend(res["data"])
+            page = res["data"]
+            if not page:
+                break
+            fetched += len(page)
             # reset the start for the next loop
-            start = len(listings) + 1
+            start = fetched + 1
+            yield page
+
+    def get_all_latest_listings_concurrent(
+        self, max_workers: int = CMC_MAX_WORKERS, aux: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """Fetch the first page of listings to learn the total count, then fetch the
+        remaining pages concurrently and merge them back together in page order.
+
+        The market can shift between requests, so a coin may show up on two pages.
+        Only the first occurrence of each CMC ID is kept.
+
+        Args:
+            max_workers (int, optional): Number of workers used to fetch the remaining
+                pages. Defaults to CMC_MAX_WORKERS.
+            aux (Optional[List[str]], optional): Optional fields to return. None for
+                the default fields. Defaults to None.
+
+        Returns:
+            List[Dict]: Returns Dict information on all the available listings
+        """
+        limit = self.LISTINGS_PAGE_LIMIT
+        first_page = self.get_latest_listings(1, limit, aux=aux)
+        total_count = first_page["status"].get("total_count", 0)
+        starts = range(limit + 1, total_count + 1, limit)
+
+        def get_page(start: int) -> Dict:
+            return self.get_latest_listings(start, limit, aux=aux)
+
+        # map() hands pages back in the order of their start offsets
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = list(executor.map(propagate_context(get_page), starts))
+
+        listings = []
+        seen_ids = set()
+        for page in [first_page, *pages]:
+            for listing in page["data"]:
+                if listing["id"] not in seen_ids:
+                    seen_ids.add(listing["id"])
+                    listings.append(listing)
 
         return listings
 
-    def get_metadata_safe(self, ids: List[str]) -> List[Dict]:
+    def get_metadata_safe(
+        self,
+        ids: List[str],
+        concurrent: bool = False,
+        max_workers: int = CMC_MAX_WORKERS,
+        checkpoint: Optional[BatchCheckpoint] = None,
+    ) -> List[Dict]:
         """Due to the constraints of URI length, requests for metadata may
         need to be broken up into multiple requests.
 
         Break up the ids into batches before making requests for metadata.
 
+        If a checkpoint is given, batches that already completed are loaded from it
+        instead of being requested, and every newly completed batch is saved to it.
+
+        Args:
+            ids (List[str]): CMC IDs to gather metadata on
+            concurrent (bool, optional): Fetch batches in a pool of workers that share
+                the rate limiter, instead of one at a time. Defaults to False.
+            max_workers (int, optional): Number of workers used when fetching
+                concurrently. Defaults to CMC_MAX_WORKERS.
+            checkpoint (Optional[BatchCheckpoint], optional): Checkpoint of completed
+                batches to resume from. Defaults to None.
+
         Returns:
             List[Dict]: Metadata "data" objects from the API response
         """
@@ -104,34 +451,68 @@ class CoinMarketCapApi:
         # Breaking up the entire list of symbols into batches no greater than 100 symbols long
         id_batches = [ids[i : i + batch_size] for i in range(0, len(ids), batch_size)]
 
+        def fetch_batch_with_checkpoint(index: int, id_batch: List[str]) -> List[Dict]:
+            if checkpoint is not None:
+                batch_metadata = checkpoint.load(index, id_batch)
+                if batch_metadata is not None:
+                    return batch_metadata
+            batch_metadata = self.get_metadata(id_batch)
+            if checkpoint is not None:
+                checkpoint.save(index, id_batch, batch_metadata)
+            return batch_metadata
+
         # Create a list of the metadata objects from separate API calls
         metadata_objs = []
-        for id_batch in id_batches:
-            metadata_objs.extend(self.get_metadata(id_batch))
+        if concurrent:
+            # map() hands results back in the order of the batches, regardless of
+            # which worker finishes first
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for batch_metadata in executor.map(
+                    propagate_context(fetch_batch_with_checkpoint),
+                    range(len(id_batches)),
+                    id_batches,
+                ):
+                    metadata_objs.extend(batch_metadata)
+        else:
+            for index, id_batch in enumerate(id_batches):
+                metadata_objs.extend(fetch_batch_with_checkpoint(index, id_batch))
 
         return metadata_objs
 
-    @retry(tries=7, delay=3, backoff=5)
     def get_metadata(self, ids: List[str]) -> List[Dict]:
         """Get Metadata on a singular or collection of CryptoCurrencies using CMC IDs.
 
-        NOTE: Using a large number of retries, delay, and backoff since this API has caused
-            multiple 429 Client errors. Potential room for optimization.
+        Retried with the retry policy of the client. When rate limited, retries wait
+        exactly as long as the API asks, and the shared rate limiter is paused for
+        every other worker too.
 
         Reference: https://coinmarketcap.com/api/documentation/v1/#operation/getV1CryptocurrencyInfo
 
         Args:
-            symbols (str): Comma separated value of crypto CMC IDs to gather data on
+            ids (List[str]): CMC IDs to gather data on
+
+        Returns:
+            List[Dict]: Metadata "data" objects from the API response
+        """
+        return self.retry_policy.call(self.request_metadata, ids)
+
+    def request_metadata(self, ids: List[str]) -> List[Dict]:
+        """Single request for Metadata on a collection of CMC IDs, without retries.
+
+        Args:
+            ids (List[str]): CMC IDs to gather data on
 
         Returns:
-            Dict: Metadata "data" object from the API response
+            List[Dict]: Metadata "data" objects from the API response
         """
         url = urljoin(self.host, "/v1/cryptocurrency/info")
         # convert to a list of strings and join as comma separated values
         ids_str = ",".join(map(str, ids))
         params = {"id": ids_str}
-        res = requests.get(url=url, params=params, headers=self.headers)
+        res = self.get(url, params=params)
         # use requests library to raise exceptions based on status
         res.raise_for_status()
-        metadata_obj = res.json()["data"]
+        body = res.json()
+        self.record_credits(body)
+        metadata_obj = body["data"]
         return list(metadata_obj.values())
@@ -0,0 +1,153 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from os.path import exists, join
+from typing import Optional
+
+from src.util.config import (
+    CMC_CREDIT_LEDGER_FILE_NAME,
+    CMC_CREDIT_LEDGER_LOCATION,
+    CMC_MONTHLY_CREDIT_BUDGET,
+    LOGGER_NAME,
+)
+from src.util.exceptions import CreditBudgetExceededException
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Share of the budget used before a warning is logged
+CREDIT_BUDGET_WARNING_RATIO = 0.8
+
+
+class CreditBudget:
+
+    def __init__(
+        self,
+        monthly_budget: Optional[int] = CMC_MONTHLY_CREDIT_BUDGET,
+        ledger_file: Optional[str] = join(
+            CMC_CREDIT_LEDGER_LOCATION, CMC_CREDIT_LEDGER_FILE_NAME
+        ),
+    ):
+        """Thread safe count of the API credits used this month, from the
+        'credit_count' CMC returns with every response. Requests are refused once
+        the budget is used up, protecting the monthly quota of the plan.
+
+        The ledger is a SQLite database shared by every process on the host, and the
+        credits of every response are added inside a write transaction, so workflows
+        running at the same time count against the same budget.
+
+        Months are calendar months in UTC, which may not line up exactly with the
+        billing cycle of the plan.
+
+        Args:
+            monthly_budget (Optional[int], optional): Credits allowed per month, None
+                for no budget. Defaults to CMC_MONTHLY_CREDIT_BUDGET.
+            ledger_file (Optional[str], optional): SQLite database the credits used
+                are persisted to between executions, None to only count in memory.
+                Defaults to the ledger file in CMC_CREDIT_LEDGER_LOCATION.
+        """
+        self.monthly_budget = monthly_budget
+        self.ledger_file = ledger_file
+        self.month: Optional[str] = None
+        # credits used this month, only counted in memory without a ledger file
+        self.used = 0
+        self.connection: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def current_month() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def _start_month(self) -> str:
+        month = self.current_month()
+        if self.month != month:
+            # the count in memory restarts when the month rolls over
+            self.month = month
+            self.used = 0
+        return month
+
+    def _connect(self) -> sqlite3.Connection:
+        # connected on first use, so clients that never record any credits leave
+        # no ledger behind
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                self.ledger_file,
+                timeout=30,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS credits_used ("
+                "month TEXT PRIMARY KEY, used INTEGER NOT NULL)"
+            )
+        return self.connection
+
+    def _used(self, month: str) -> int:
+        if self.connection is None and not exists(self.ledger_file):
+            return 0
+        row = (
+            self._connect()
+            .execute("SELECT used FROM credits_used WHERE month = ?", (month,))
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def _add(self, month: str, credits: int) -> int:
+        # BEGIN IMMEDIATE takes the write lock up front, so no other process can add
+        # credits between this process adding and reading them back
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO credits_used VALUES (?, ?) ON CONFLICT(month) "
+                "DO UPDATE SET used = used + excluded.used",
+                (month, credits),
+            )
+            used = self._used(month)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return used
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """Credits left this month, None if there is no budget"""
+        with self.lock:
+            month = self._start_month()
+            if self.ledger_file is not None:
+                self.used = self._used(month)
+            if self.monthly_budget is None:
+                return None
+            return max(0, self.monthly_budget - self.used)
+
+    def check(self) -> None:
+        """Check there are credits left before making a request.
+
+        Raises:
+            CreditBudgetExceededException: Raised if the budget is used up
+        """
+        if self.remaining == 0:
+            raise CreditBudgetExceededException(
+                f"Monthly CMC API credit budget of {self.monthly_budget} is used up for"
+                f" {self.month}. Raise CMC_MONTHLY_CREDIT_BUDGET or wait for next month."
+            )
+
+    def record(self, credits: int) -> None:
+        """Add the credits used by a request.
+
+        Args:
+            credits (int): 'credit_count' of the response
+        """
+        with self.lock:
+            month = self._start_month()
+            if self.ledger_file is not None:
+                self.used = self._add(month, credits)
+            else:
+                self.used += credits
+            used, budget = self.used, self.monthly_budget
+        if (
+            budget is not None
+            and (used - credits) < budget * CREDIT_BUDGET_WARNING_RATIO <= used
+        ):
+            logger.warning(f"Used {used} of the {budget} monthly CMC API credit budget")
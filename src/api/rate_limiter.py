@@ -0,0 +1,244 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple, Union
+
+from src.util.config import (
+    CMC_RATE_LIMIT_BURST,
+    CMC_RATE_LIMIT_DB,
+    CMC_REQUESTS_PER_MINUTE,
+    CMC_SHARED_RATE_LIMIT,
+)
+
+# CMC rate limits are enforced per minute. When a 429 does not say how long to
+# back off, wait out a full window.
+DEFAULT_RETRY_AFTER_SECONDS = 60.0
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """Parse the value of a 'Retry-After' header into seconds to wait.
+
+    The header may either be a number of seconds or an HTTP date.
+
+    Args:
+        value (Optional[str]): Raw header value, None if header was not present
+
+    Returns:
+        float: Seconds to wait before making another request
+    """
+    if not value:
+        return DEFAULT_RETRY_AFTER_SECONDS
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+class TokenBucket:
+
+    def __init__(self, requests_per_minute: float, capacity: float = 1):
+        """Thread safe token bucket used to keep requests against the API within
+        the rate limit of the CMC plan. Each request takes one token, tokens refill
+        continuously at the plan rate.
+
+        Args:
+            requests_per_minute (float): Refill rate of the bucket, should match the plan
+            capacity (float, optional): Max number of tokens that can be held, i.e. the
+                largest burst of requests allowed. Defaults to 1.
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = max(self.updated_at, now)
+
+    def acquire(self) -> None:
+        """Take a token from the bucket, blocking until one is available and any
+        pause requested by the server has passed.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds. Used to honor
+        'Retry-After' so every worker sharing the bucket backs off together.
+
+        Args:
+            seconds (float): Seconds to stop handing out tokens for
+        """
+        with self.lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self.paused_until:
+                self.paused_until = resume_at
+                # Don't let tokens build up while paused, that would trigger a burst
+                # of requests the moment the pause ends.
+                self.tokens = 0
+                self.updated_at = resume_at
+
+
+class SharedTokenBucket:
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        capacity: float = 1,
+        db_file: str = CMC_RATE_LIMIT_DB,
+        name: str = "coin_market_cap",
+    ):
+        """Token bucket shared by every process on the host. The state of the bucket
+        is kept in a SQLite database, and every token is taken inside a write
+        transaction, so workflows running at the same time draw from the same bucket
+        and together stay within the rate limit of the CMC plan.
+
+        Drop-in replacement for TokenBucket. Every process should be configured with
+        the same rate and capacity. Time is measured with the wall clock, as monotonic
+        clocks are not comparable between processes.
+
+        Args:
+            requests_per_minute (float): Refill rate of the bucket, should match the plan
+            capacity (float, optional): Max number of tokens that can be held, i.e. the
+                largest burst of requests allowed. Defaults to 1.
+            db_file (str, optional): SQLite database holding the bucket. Defaults to
+                CMC_RATE_LIMIT_DB.
+            name (str, optional): Name of the bucket in the database. Defaults to
+                "coin_market_cap".
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity
+        self.db_file = db_file
+        self.name = name
+        # a single connection per bucket, guarded so threads take turns using it
+        self.connection = sqlite3.connect(
+            db_file, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL, paused_until REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO token_buckets VALUES (?, ?, ?, 0)",
+                (name, capacity, time.time()),
+            )
+
+    def _read(self) -> Tuple[float, float, float]:
+        return self.connection.execute(
+            "SELECT tokens, updated_at, paused_until FROM token_buckets WHERE name = ?",
+            (self.name,),
+        ).fetchone()
+
+    def _write(self, tokens: float, updated_at: float, paused_until: float) -> None:
+        self.connection.execute(
+            "UPDATE token_buckets SET tokens = ?, updated_at = ?, paused_until = ? "
+            "WHERE name = ?",
+            (tokens, updated_at, paused_until, self.name),
+        )
+
+    def _take(self) -> float:
+        # BEGIN IMMEDIATE takes the write lock up front, so no other process can
+        # read the bucket between this process reading and updating it
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated_at, paused_until = self._read()
+                now = time.time()
+                elapsed = max(0.0, now - updated_at)
+                tokens = min(self.capacity, tokens + elapsed * self.rate)
+                updated_at = max(updated_at, now)
+                wait = paused_until - now
+                if wait <= 0:
+                    if tokens >= 1:
+                        tokens -= 1
+                        wait = 0.0
+                    else:
+                        wait = (1 - tokens) / self.rate
+                self._write(tokens, updated_at, paused_until)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self) -> None:
+        """Take a token from the shared bucket, blocking until one is available and
+        any pause requested by the server has passed.
+        """
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens to every process for the given number of seconds.
+        Used to honor 'Retry-After' so all workflows sharing the bucket back off
+        together.
+
+        Args:
+            seconds (float): Seconds to stop handing out tokens for
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                _, _, paused_until = self._read()
+                resume_at = time.time() + seconds
+                if resume_at > paused_until:
+                    # Don't let tokens build up while paused, that would trigger a
+                    # burst of requests the moment the pause ends.
+                    self._write(0, resume_at, resume_at)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """Close the connection to the database"""
+        with self.lock:
+            self.connection.close()
+
+
+def build_rate_limiter(
+    requests_per_minute: float = CMC_REQUESTS_PER_MINUTE,
+    capacity: float = CMC_RATE_LIMIT_BURST,
+    shared: bool = CMC_SHARED_RATE_LIMIT,
+) -> Union[TokenBucket, SharedTokenBucket]:
+    """Build the rate limiter used by API clients that are not given one.
+
+    Args:
+        requests_per_minute (float, optional): Refill rate of the bucket. Defaults to
+            CMC_REQUESTS_PER_MINUTE.
+        capacity (float, optional): Largest burst of requests allowed. Defaults to
+            CMC_RATE_LIMIT_BURST.
+        shared (bool, optional): Share the bucket with every process on the host
+            instead of only this client. Defaults to CMC_SHARED_RATE_LIMIT.
+
+    Returns:
+        Union[TokenBucket, SharedTokenBucket]: Rate limiter of the client
+    """
+    if shared:
+        return SharedTokenBucket(requests_per_minute, capacity)
+    return TokenBucket(requests_per_minute, capacity)
@@ -0,0 +1,85 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from os.path import join
+from typing import Dict, Iterator
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+
+from src.util.config import CMC_RECORDINGS_LOCATION, LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def save_recording(
+    directory: str, path: str, params: Dict[str, str], body: Dict, seconds: float
+) -> str:
+    """Save a single API response as a recording.
+
+    Args:
+        directory (str): Directory recordings are saved to
+        path (str): Path of the endpoint, e.g. '/v1/cryptocurrency/info'
+        params (Dict[str, str]): Query parameters of the request
+        body (Dict): Parsed JSON body of the response
+        seconds (float): Wall time of the request
+
+    Returns:
+        str: File the recording was saved to
+    """
+    endpoint = path.strip("/").replace("/", "_")
+    file_path = join(directory, f"{endpoint}_{time.time_ns()}.json")
+    recording = {"path": path, "params": params, "seconds": seconds, "body": body}
+    # written to a temp file first so a replay never reads a half written recording
+    temp_file = f"{file_path}.tmp"
+    with open(temp_file, "w") as file:
+        json.dump(recording, file)
+    os.replace(temp_file, file_path)
+    return file_path
+
+
+def load_recordings(directory: str) -> Iterator[Dict]:
+    """Load every recording saved to a directory, in the order they were saved.
+
+    Args:
+        directory (str): Directory recordings were saved to
+
+    Yields:
+        Iterator[Dict]: Recordings with "path", "params", "seconds" and "body"
+    """
+    for file_path in sorted(glob.glob(join(directory, "*.json"))):
+        with open(file_path, "r") as file:
+            yield json.load(file)
+
+
+class ResponseRecorder:
+
+    def __init__(self, directory: str = CMC_RECORDINGS_LOCATION):
+        """Timing hook of CoinMarketCapApi that records every successful response,
+        along with its request and wall time, so it can be replayed by the stand-in
+        CMC server.
+
+        Args:
+            directory (str, optional): Directory recordings are saved to. Defaults to
+                CMC_RECORDINGS_LOCATION.
+        """
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def __call__(self, res: requests.Response, seconds: float) -> None:
+        if res.status_code != 200:
+            return
+        try:
+            body = res.json()
+        except ValueError:
+            logger.warning(f"Not recording response of '{res.url}', body is not JSON")
+            return
+        url = urlparse(res.url)
+        with self.lock:
+            file_path = save_recording(
+                self.directory, url.path, dict(parse_qsl(url.query)), body, seconds
+            )
+        logger.debug(f"Recorded response of '{res.url}' to '{file_path}'")
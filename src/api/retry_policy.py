@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import requests
+
+from src.util.config import (
+    CMC_CIRCUIT_FAILURE_THRESHOLD,
+    CMC_CIRCUIT_RESET_SECONDS,
+    CMC_RETRY_BASE_DELAY,
+    CMC_RETRY_MAX_ATTEMPTS,
+    CMC_RETRY_MAX_DELAY,
+    LOGGER_NAME,
+)
+from src.util.exceptions import CircuitOpenException, RateLimitedException
+from src.util.metrics import record
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Statuses worth retrying. Every other 4xx (bad request, authentication, plan limits)
+# fails the same way however many times it is retried.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitBreaker:
+
+    def __init__(
+        self,
+        failure_threshold: int = CMC_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CMC_CIRCUIT_RESET_SECONDS,
+    ):
+        """Thread safe circuit breaker. After repeated failures the circuit opens and
+        requests fail fast instead of waiting on an API that is down. Once the reset
+        period has passed a single trial request is let through, closing the circuit
+        again if it succeeds.
+
+        Args:
+            failure_threshold (int, optional): Consecutive failures before the circuit
+                opens. Defaults to CMC_CIRCUIT_FAILURE_THRESHOLD.
+            reset_seconds (float, optional): Seconds the circuit stays open before a
+                trial request. Defaults to CMC_CIRCUIT_RESET_SECONDS.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_call(self) -> None:
+        """Check the circuit before making a request.
+
+        Raises:
+            CircuitOpenException: Raised if the circuit is open
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0 or self.trial_in_flight:
+                raise CircuitOpenException(
+                    f"Circuit open after {self.failures} consecutive failed requests,"
+                    f" retry in {max(remaining, 0):.0f}s",
+                    max(remaining, 0),
+                )
+            # half open, let a single trial request through
+            self.trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_in_flight:
+                    logger.error(
+                        f"Opening circuit to the CMC API after {self.failures} consecutive failed requests"
+                    )
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+
+
+class RetryPolicy:
+
+    def __init__(
+        self,
+        max_attempts: int = CMC_RETRY_MAX_ATTEMPTS,
+        base_delay: float = CMC_RETRY_BASE_DELAY,
+        max_delay: float = CMC_RETRY_MAX_DELAY,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Retries requests that fail with a retryable error. Fatal errors are raised
+        straight away.
+
+        Rate limited requests wait exactly as long as the 'Retry-After' header asks.
+        Other retryable errors back off exponentially, and count towards opening the
+        circuit breaker.
+
+        Args:
+            max_attempts (int, optional): Max attempts of a request. Defaults to
+                CMC_RETRY_MAX_ATTEMPTS.
+            base_delay (float, optional): Seconds before the first retry, doubled on
+                every retry. Defaults to CMC_RETRY_BASE_DELAY.
+            max_delay (float, optional): Longest wait between retries. Defaults to
+                CMC_RETRY_MAX_DELAY.
+            circuit_breaker (Optional[CircuitBreaker], optional): Circuit breaker
+                checked before every attempt. Defaults to a new CircuitBreaker.
+            sleep (Callable[[float], None], optional): Function used to wait between
+                attempts. Defaults to time.sleep.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_breaker = (
+            circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        )
+        self.sleep = sleep
+
+    @staticmethod
+    def is_retryable(e: Exception) -> bool:
+        """Whether a request that failed with the exception may succeed if retried.
+
+        Args:
+            e (Exception): Exception raised by the request
+
+        Returns:
+            bool: True for rate limits, server errors, connection errors and timeouts
+        """
+        if isinstance(e, RateLimitedException):
+            return True
+        if isinstance(e, requests.HTTPError):
+            return (
+                e.response is not None
+                and e.response.status_code in RETRYABLE_STATUS_CODES
+            )
+        return isinstance(
+            e,
+            (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ),
+        )
+
+    def delay(self, attempt: int, e: Exception) -> float:
+        """Seconds to wait before retrying after a failed attempt.
+
+        Args:
+            attempt (int): 1-indexed number of the attempt that failed
+            e (Exception): Exception raised by the attempt
+
+        Returns:
+            float: Seconds to wait
+        """
+        if isinstance(e, RateLimitedException):
+            return e.retry_after
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def call(self, request: Callable[..., Any], *args, **kwargs) -> Any:
+        """Make a request, retrying it while it fails with a retryable error.
+
+        Args:
+            request (Callable[..., Any]): Function making a single request
+            *args, **kwargs: Arguments of the request
+
+        Raises:
+            CircuitOpenException: Raised if the circuit is open
+            Exception: The fatal error, or the last retryable error once out of attempts
+
+        Returns:
+            Any: Return value of the request
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self.circuit_breaker.before_call()
+            try:
+                result = request(*args, **kwargs)
+            except Exception as e:
+                retryable = self.is_retryable(e)
+                if retryable and not isinstance(e, RateLimitedException):
+                    self.circuit_breaker.record_failure()
+                else:
+                    # the API answered, being rate limited or a bad request says
+                    # nothing about its health
+                    self.circuit_breaker.record_success()
+                if not retryable:
+                    raise e
+                if attempt == self.max_attempts:
+                    raise e
+                wait = self.delay(attempt, e)
+                logger.warning(
+                    f"Request failed with {e!r} (attempt {attempt} of {self.max_attempts}), retrying in {wait:.1f}s"
+                )
+                record(retries=1)
+                self.sleep(wait)
+                continue
+            self.circuit_breaker.record_success()
+            return result
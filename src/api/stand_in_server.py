@@ -0,0 +1,447 @@
+"""Local stand-in for the CMC API, replaying recorded responses.
+
+Serves the listings, quotes and info endpoints used by CoinMarketCapApi from
+recordings made with CMC_RECORD_RESPONSES, and simulates the behaviour of the real
+API that the fetch paths depend on: pagination and total_count, response latency,
+URI length limits and 429 throttling. Point the client at it by setting
+COIN_MARKET_CAP_HOST to the url of the server.
+
+Usage:
+    python -m src.api.stand_in_server --port 8765 --requests-per-minute 30
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from src.api.response_recorder import load_recordings
+from src.util.config import CMC_RECORDINGS_LOCATION, LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+LISTINGS_PATH = "/v1/cryptocurrency/listings/latest"
+QUOTES_PATH = "/v2/cryptocurrency/quotes/latest"
+INFO_PATH = "/v1/cryptocurrency/info"
+
+# Max number of listings the API returns in a single page
+MAX_LISTINGS_LIMIT = 5000
+# Longest request URI accepted before responding 414
+DEFAULT_MAX_URI_LENGTH = 2000
+# Optional listing fields only returned when selected with 'aux', if it is given
+LISTINGS_AUX_FIELDS = {
+    "num_market_pairs",
+    "cmc_rank",
+    "date_added",
+    "tags",
+    "platform",
+    "max_supply",
+    "circulating_supply",
+    "total_supply",
+    "market_cap_by_total_supply",
+    "volume_24h_reported",
+    "volume_7d",
+    "volume_7d_reported",
+    "volume_30d",
+    "volume_30d_reported",
+    "is_market_cap_included_in_calc",
+}
+
+
+class RecordedData:
+
+    def __init__(self, directory: str = CMC_RECORDINGS_LOCATION):
+        """Coins, quotes, metadata and latencies gathered from every recording in a
+        directory. Later recordings of a coin replace earlier ones.
+
+        Args:
+            directory (str, optional): Directory recordings were saved to. Defaults
+                to CMC_RECORDINGS_LOCATION.
+        """
+        listings: Dict[int, Dict] = {}
+        self.quotes: Dict[int, Dict] = {}
+        self.metadata: Dict[int, Dict] = {}
+        self.latencies: List[float] = []
+
+        for recording in load_recordings(directory):
+            data = recording["body"].get("data")
+            path = recording["path"]
+            if path == LISTINGS_PATH:
+                listings.update({listing["id"]: listing for listing in data})
+            elif path == QUOTES_PATH:
+                self.quotes.update(
+                    {quote["id"]: quote for quotes in data.values() for quote in quotes}
+                )
+            elif path == INFO_PATH:
+                self.metadata.update({coin["id"]: coin for coin in data.values()})
+            else:
+                continue
+            self.latencies.append(recording["seconds"])
+
+        # listings are served sorted by market cap, the same order as recorded ranks
+        self.listings = sorted(
+            listings.values(),
+            key=lambda listing: (
+                listing.get("cmc_rank") is None,
+                listing.get("cmc_rank"),
+            ),
+        )
+        # listings are the latest quotes of active coins
+        self.quotes.update({listing["id"]: listing for listing in self.listings})
+
+        logger.info(
+            f"Loaded {len(self.listings)} listings, {len(self.quotes)} quotes and {len(self.metadata)} metadata objects from '{directory}'"
+        )
+
+    def quotes_for_symbol(self, symbol: str) -> List[Dict]:
+        return [
+            quote for quote in self.quotes.values() if quote["symbol"] == symbol.upper()
+        ]
+
+    def metadata_for_id(self, id: int) -> Optional[Dict]:
+        if id in self.metadata:
+            return self.metadata[id]
+        # coins only seen in listings get the metadata the listing holds
+        coin = self.quotes.get(id)
+        if coin is None:
+            return None
+        fields = ["id", "name", "symbol", "slug", "date_added", "tags", "platform"]
+        return {field: coin.get(field) for field in fields}
+
+
+class LatencyModel:
+
+    def __init__(
+        self,
+        samples: Optional[List[float]] = None,
+        median: float = 0.0,
+        sigma: float = 0.5,
+        seed: Optional[int] = None,
+    ):
+        """Latency added to every response. Replays recorded latencies if there are
+        any, otherwise draws from a log-normal distribution around the median.
+
+        Args:
+            samples (Optional[List[float]], optional): Recorded latencies in seconds.
+                Defaults to None.
+            median (float, optional): Median latency in seconds when there are no
+                samples, 0 for no latency. Defaults to 0.0.
+            sigma (float, optional): Spread of the log-normal distribution. Defaults
+                to 0.5.
+            seed (Optional[int], optional): Seed of the random draws. Defaults to None.
+        """
+        self.samples = samples or []
+        self.median = median
+        self.sigma = sigma
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self.lock:
+            if self.samples:
+                return self.random.choice(self.samples)
+            if self.median <= 0:
+                return 0.0
+            return self.random.lognormvariate(math.log(self.median), self.sigma)
+
+
+class RateLimitWindow:
+
+    def __init__(self, requests_per_minute: Optional[int]):
+        """Per minute request limit, as enforced by the CMC API.
+
+        Args:
+            requests_per_minute (Optional[int]): Requests allowed in any 60 second
+                window, None for no limit
+        """
+        self.requests_per_minute = requests_per_minute
+        self.requests: deque = deque()
+        self.lock = threading.Lock()
+
+    def admit(self) -> Optional[int]:
+        """Admit a request if there is room in the window.
+
+        Returns:
+            Optional[int]: None if admitted, otherwise seconds until there is room
+        """
+        if self.requests_per_minute is None:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            while self.requests and self.requests[0] <= now - 60:
+                self.requests.popleft()
+            if len(self.requests) >= self.requests_per_minute:
+                return max(1, math.ceil(self.requests[0] + 60 - now))
+            self.requests.append(now)
+            return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    server: "StandInServer"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"Stand-in CMC API: {format % args}")
+
+    def do_GET(self) -> None:
+        stand_in = self.server
+        start = time.perf_counter()
+
+        if len(self.path) > stand_in.max_uri_length:
+            return self.send_error_body(414, "URI Too Long", start)
+
+        retry_after = stand_in.rate_limit.admit()
+        if retry_after is not None:
+            return self.send_error_body(
+                429,
+                "You've exceeded your API Key's HTTP request rate limit.",
+                start,
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        time.sleep(stand_in.latency.sample())
+
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+        routes = {
+            LISTINGS_PATH: self.listings,
+            QUOTES_PATH: self.quotes,
+            INFO_PATH: self.info,
+        }
+        if url.path not in routes:
+            return self.send_error_body(404, f"Unknown endpoint '{url.path}'", start)
+        try:
+            data, credit_count, extra_status = routes[url.path](params)
+        except ValueError as e:
+            return self.send_error_body(400, str(e), start)
+        self.send_body(200, data, start, credit_count, extra_status)
+
+    def listings(self, params: Dict[str, str]) -> Tuple[List[Dict], int, Dict]:
+        start = int(params.get("start", "1"))
+        limit = int(params.get("limit", "100"))
+        if start < 1:
+            raise ValueError('"start" must be greater than or equal to 1')
+        if not 1 <= limit <= MAX_LISTINGS_LIMIT:
+            raise ValueError(f'"limit" must be between 1 and {MAX_LISTINGS_LIMIT}')
+
+        listings = self.server.data.listings
+        page = listings[start - 1 : start - 1 + limit]
+        if "aux" in params:
+            # optional fields that were not selected are left out
+            aux = set(params["aux"].split(","))
+            excluded = LISTINGS_AUX_FIELDS - aux
+            page = [
+                {key: value for key, value in listing.items() if key not in excluded}
+                for listing in page
+            ]
+        # 1 credit per 200 listings returned
+        credit_count = max(1, math.ceil(len(page) / 200))
+        return page, credit_count, {"total_count": len(listings)}
+
+    def quotes(self, params: Dict[str, str]) -> Tuple[Dict, int, Dict]:
+        symbols = [symbol for symbol in params.get("symbol", "").split(",") if symbol]
+        if not symbols:
+            raise ValueError('"symbol" is required')
+        data = {}
+        for symbol in symbols:
+            quotes = self.server.data.quotes_for_symbol(symbol)
+            if not quotes and params.get("skip_invalid") != "true":
+                raise ValueError(f'Invalid value for "symbol": "{symbol}"')
+            if quotes:
+                data[symbol.upper()] = quotes
+        # 1 credit per 100 coins returned
+        credit_count = max(1, math.ceil(len(symbols) / 100))
+        return data, credit_count, {}
+
+    def info(self, params: Dict[str, str]) -> Tuple[Dict, int, Dict]:
+        ids = [id for id in params.get("id", "").split(",") if id]
+        if not ids:
+            raise ValueError('"id" is required')
+        data = {}
+        for id in ids:
+            metadata = self.server.data.metadata_for_id(int(id))
+            if metadata is None:
+                raise ValueError(f'Invalid value for "id": "{id}"')
+            data[id] = metadata
+        # 1 credit per 100 coins returned
+        credit_count = max(1, math.ceil(len(ids) / 100))
+        return data, credit_count, {}
+
+    def status(
+        self, start: float, error_code: int, error_message: Optional[str], **extra
+    ) -> Dict:
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "error_code": error_code,
+            "error_message": error_message,
+            "elapsed": int((time.perf_counter() - start) * 1000),
+            "credit_count": extra.pop("credit_count", 0),
+            "notice": None,
+            **extra,
+        }
+
+    def send_body(
+        self,
+        status_code: int,
+        data,
+        start: float,
+        credit_count: int,
+        extra_status: Dict,
+    ) -> None:
+        body = {
+            "status": self.status(
+                start, 0, None, credit_count=credit_count, **extra_status
+            ),
+            "data": data,
+        }
+        self.send_json(status_code, body)
+
+    def send_error_body(
+        self,
+        status_code: int,
+        error_message: str,
+        start: float,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        body = {"status": self.status(start, status_code, error_message)}
+        self.send_json(status_code, body, headers)
+
+    def send_json(
+        self, status_code: int, body: Dict, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class StandInServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        data: RecordedData,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        requests_per_minute: Optional[int] = None,
+        latency: Optional[LatencyModel] = None,
+        max_uri_length: int = DEFAULT_MAX_URI_LENGTH,
+    ):
+        """HTTP server standing in for the CMC API.
+
+        Args:
+            data (RecordedData): Recorded data to serve
+            host (str, optional): Host to bind to. Defaults to "127.0.0.1".
+            port (int, optional): Port to bind to, 0 for any free port. Defaults to 0.
+            requests_per_minute (Optional[int], optional): Requests allowed per minute
+                before responding 429, None for no limit. Defaults to None.
+            latency (Optional[LatencyModel], optional): Latency added to every
+                response. Defaults to no latency.
+            max_uri_length (int, optional): Longest request URI accepted before
+                responding 414. Defaults to DEFAULT_MAX_URI_LENGTH.
+        """
+        super().__init__((host, port), StandInHandler)
+        self.data = data
+        self.rate_limit = RateLimitWindow(requests_per_minute)
+        self.latency = latency if latency is not None else LatencyModel()
+        self.max_uri_length = max_uri_length
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Url to set COIN_MARKET_CAP_HOST to"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "StandInServer":
+        """Serve requests from a background thread"""
+        self.thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving requests and release the port"""
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve recorded CMC API responses from a local stand-in server"
+    )
+    parser.add_argument("--recordings", default=CMC_RECORDINGS_LOCATION)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--requests-per-minute",
+        type=int,
+        default=None,
+        help="Respond 429 above this rate. No limit if not given.",
+    )
+    parser.add_argument(
+        "--latency",
+        choices=["recorded", "lognormal", "none"],
+        default="recorded",
+        help="Replay the recorded latencies, draw from a log-normal distribution, or add none",
+    )
+    parser.add_argument("--latency-median-ms", type=float, default=250)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--max-uri-length", type=int, default=DEFAULT_MAX_URI_LENGTH)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    data = RecordedData(args.recordings)
+    if args.latency == "recorded":
+        latency = LatencyModel(samples=data.latencies, seed=args.seed)
+    elif args.latency == "lognormal":
+        latency = LatencyModel(
+            median=args.latency_median_ms / 1000,
+            sigma=args.latency_sigma,
+            seed=args.seed,
+        )
+    else:
+        latency = LatencyModel()
+
+    server = StandInServer(
+        data,
+        host=args.host,
+        port=args.port,
+        requests_per_minute=args.requests_per_minute,
+        latency=latency,
+        max_uri_length=args.max_uri_length,
+    )
+    logger.info(f"Stand-in CMC API serving on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,5 @@ from .bitcoin_comparison import BitcoinComparisonStep
 from .display_averages import DisplayAveragesStep
 from .listings import ListingsStep
 from .pricing import PricingStep
+from .quotes import QuotesStep
 from .universe import UniverseStep
@@ -1,48 +1,98 @@
 import logging
-import os
-from os.path import exists, join
-from typing import Optional
+from os.path import join
+from typing import Iterator, Optional, Tuple
 
 import pandas as pd
 
+from src.util.catalog import dataset_exists, list_dataset_files
 from src.util.config import (
-    AVG_BITCOIN_DIFF_CSV_FORMAT,
     AVG_BITCOIN_DIFF_DATA_LOCATION,
+    AVG_BITCOIN_DIFF_DATASET,
+    AVG_BITCOIN_DIFF_FILE_FORMAT,
+    AVG_BITCOIN_DIFF_STATE_FILE_NAME,
+    AVG_BITCOIN_DIFF_STATE_LOCATION,
     BITCOIN_COMPARISON_DATA_LOCATION,
+    BITCOIN_COMPARISON_DATASET,
+    BITCOIN_COMPARISON_FILE_FORMAT,
     LOGGER_NAME,
 )
-from src.util.dataframe_ops import read_csv, write_csv
+from src.util.dataframe_ops import read_compacted_dataset, read_dataset
+from src.util.dataset_registry import DatasetRegistry
+from src.util.metrics import mark_skipped
+from src.util.partitions import is_compacted_file
+from src.util.running_average import RunningAverageState
+from src.util.storage import dataset_file
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
 class AverageDifferenceStep:
 
-    def __init__(self, timestamp: str):
+    def __init__(
+        self,
+        timestamp: str,
+        registry: Optional[DatasetRegistry] = None,
+        average_state: Optional[RunningAverageState] = None,
+    ):
         """Step object that calculates the average difference of 24 hour percent change of the
         a currency vs. Bitcoin. Writes output to data lake as .csv.
 
+        Averages are kept up to date with a persisted running sum and count per symbol,
+        so each execution only reads its own Bitcoin comparison dataset.
+
         Args:
             timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
+            average_state (Optional[RunningAverageState], optional): Running totals
+                kept in memory between executions, only re-read when the state file
+                changes. Read from the state file if not provided. Defaults to None.
         """
         self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
+        self.average_state = average_state
         # input dataset details
         self.bitcoin_comparison_directory = BITCOIN_COMPARISON_DATA_LOCATION
+        self.bitcoin_comparison_file_format = BITCOIN_COMPARISON_FILE_FORMAT
         # output dataset details
         self.avg_bitcoin_diff_directory = AVG_BITCOIN_DIFF_DATA_LOCATION
-        self.avg_bitcoin_diff_file_format = AVG_BITCOIN_DIFF_CSV_FORMAT
+        self.avg_bitcoin_diff_file_format = AVG_BITCOIN_DIFF_FILE_FORMAT
+        # running average state details
+        self.avg_bitcoin_diff_state_directory = AVG_BITCOIN_DIFF_STATE_LOCATION
+        self.avg_bitcoin_diff_state_file_name = AVG_BITCOIN_DIFF_STATE_FILE_NAME
 
     @property
-    def avg_bitcoin_diff_csv(self) -> str:
-        return join(
+    def bitcoin_comparison_file(self) -> str:
+        return dataset_file(
+            self.bitcoin_comparison_directory,
+            self.bitcoin_comparison_file_format,
+            self.timestamp,
+            BITCOIN_COMPARISON_DATASET,
+        )
+
+    @property
+    def avg_bitcoin_diff_file(self) -> str:
+        return dataset_file(
             self.avg_bitcoin_diff_directory,
-            self.avg_bitcoin_diff_file_format.format(self.timestamp),
+            self.avg_bitcoin_diff_file_format,
+            self.timestamp,
+            AVG_BITCOIN_DIFF_DATASET,
+        )
+
+    @property
+    def avg_bitcoin_diff_state_file(self) -> str:
+        return join(
+            self.avg_bitcoin_diff_state_directory,
+            self.avg_bitcoin_diff_state_file_name,
         )
 
     def generate_average_difference(self) -> Optional[pd.DataFrame]:
-        """Reads all Bitcoin comparison files that pre-exist and calculates the average
-        difference for each symbol for the collected data. Sorts in ascending order based
-        on average. Writes output to data lake.
+        """Applies the Bitcoin comparison for this execution to the running totals of
+        every previous execution and calculates the average difference for each symbol.
+        Sorts in ascending order based on average. Writes output to data lake.
+
+        If the running totals have never been saved, they are rebuilt from every
+        Bitcoin comparison file that pre-exists.
 
         If there already exists a file for the given execution timestamp, skips step to
         avoid repeat work.
@@ -51,33 +101,109 @@ class AverageDifferenceStep:
             Optional[pd.DataFrame]: DataFrame with averages per symbol if calculated. None if
                 file already existed.
         """
-        if exists(self.avg_bitcoin_diff_csv):
+        if dataset_exists(self.avg_bitcoin_diff_file):
+            mark_skipped()
             logger.info(
-                f"Dataset already exists at '{self.avg_bitcoin_diff_csv}'. Using pre-existing"
+                f"Dataset already exists at '{self.avg_bitcoin_diff_file}'. Using pre-existing"
                 " dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
             )
         else:
-            comparisons_df = self.read_all_bitcoin_comparisons()
-
-            # Group by symbol across all datasets and get average difference
-            # in 24h percent change against bitcoin
-            avg_comparisons_df = (
-                comparisons_df.groupby("Symbol")[
-                    "BitcoinVsCurrency24hPercentChangeDiff"
-                ]
-                .mean()
-                .reset_index()
+            state = self.load_average_state()
+            # other executions may be applying their own comparisons at the same
+            # time, the totals are re-read and saved while holding the lock
+            with state.locked():
+                if not state.exists:
+                    self.rebuild_average_state(state)
+                else:
+                    comparison_df = self.registry.read(self.bitcoin_comparison_file)
+                    if state.apply(
+                        self.timestamp,
+                        comparison_df,
+                        "Symbol",
+                        "BitcoinVsCurrency24hPercentChangeDiff",
+                    ):
+                        state.save()
+                averages = state.averages()
+
+            # Average difference in 24h percent change against bitcoin for each
+            # symbol across all datasets
+            avg_comparisons_df = pd.DataFrame(
+                list(averages.items()),
+                columns=["Symbol", "AvgBitcoinVsCurrency24hPercentChangeDiff"],
             )
 
-            bitcoin_diff_df = avg_comparisons_df.rename(
-                columns={
-                    "BitcoinVsCurrency24hPercentChangeDiff": "AvgBitcoinVsCurrency24hPercentChangeDiff"
-                }
-            ).sort_values("AvgBitcoinVsCurrency24hPercentChangeDiff", ascending=True)
+            bitcoin_diff_df = avg_comparisons_df.sort_values(
+                "AvgBitcoinVsCurrency24hPercentChangeDiff", ascending=True
+            )
 
-            write_csv(self.avg_bitcoin_diff_csv, bitcoin_diff_df)
+            self.registry.write(self.avg_bitcoin_diff_file, bitcoin_diff_df)
             return bitcoin_diff_df
 
+    def load_average_state(self) -> RunningAverageState:
+        if self.average_state is not None:
+            return self.average_state.refresh()
+        return RunningAverageState(self.avg_bitcoin_diff_state_file).load()
+
+    def rebuild_average_state(
+        self, state: Optional[RunningAverageState] = None
+    ) -> RunningAverageState:
+        """Rebuild the running totals from every Bitcoin comparison file in the data
+        lake and save them. Used the first time the step runs, and to repair the
+        running totals if they are ever lost or out of sync with the data lake.
+
+        Args:
+            state (Optional[RunningAverageState], optional): Running totals to
+                rebuild, e.g. already locked by the caller. Defaults to the totals
+                kept between executions, or the totals of the state file.
+
+        Returns:
+            RunningAverageState: Running totals of every Bitcoin comparison
+        """
+        logger.info(
+            f"Rebuilding running averages from all datasets in '{self.bitcoin_comparison_directory}'"
+        )
+        if state is None:
+            state = self.average_state
+        if state is None:
+            state = RunningAverageState(self.avg_bitcoin_diff_state_file)
+        with state.locked():
+            state.reset()
+            for timestamp, comparison_df in self.iter_bitcoin_comparisons():
+                state.apply(
+                    timestamp,
+                    comparison_df,
+                    "Symbol",
+                    "BitcoinVsCurrency24hPercentChangeDiff",
+                )
+            state.save()
+        return state
+
+    def iter_bitcoin_comparisons(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Read the individual datasets from the Bitcoin comparison dataset
+        directory one at a time, along with their execution timestamp.
+
+        Executions merged into a compacted file are all read with a single read of
+        the compacted file.
+
+        Yields:
+            Iterator[Tuple[str, pd.DataFrame]]: Execution timestamp and comparison data
+        """
+        compacted_path, compacted_dfs = None, {}
+        for timestamp, file_path in list_dataset_files(
+            self.bitcoin_comparison_directory, self.bitcoin_comparison_file_format
+        ):
+            if is_compacted_file(file_path):
+                # executions of a compacted file are listed one after another
+                if file_path != compacted_path:
+                    compacted_path = file_path
+                    compacted_dfs = read_compacted_dataset(file_path)
+                yield timestamp, compacted_dfs[timestamp]
+                continue
+            # only the comparison produced during this run is held in memory,
+            # historic comparisons are read without being added to the registry
+            df = self.registry.get(file_path)
+            yield timestamp, df if df is not None else read_dataset(file_path)
+
     def read_all_bitcoin_comparisons(self) -> pd.DataFrame:
         """Read the individual datasets from the Bitcoin comparison dataset
         directory and return all values as a singular dataframe.
@@ -85,12 +211,7 @@ class AverageDifferenceStep:
         Returns:
             pd.DataFrame: dataframe with all collected comparison data
         """
-        comparison_dfs = []
-
-        for file_name in os.listdir(self.bitcoin_comparison_directory):
-            if file_name.endswith(".csv"):
-                df = read_csv(join(self.bitcoin_comparison_directory, file_name))
-                comparison_dfs.append(df)
+        comparison_dfs = [df for _, df in self.iter_bitcoin_comparisons()]
 
         all_dfs = pd.concat(comparison_dfs, ignore_index=True)
         return all_dfs
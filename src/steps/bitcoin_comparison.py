@@ -1,64 +1,117 @@
 import ast
 import logging
-from os.path import exists, join
 from typing import Optional
 
 import pandas as pd
 
+from src.util.catalog import dataset_exists
 from src.util.config import (
-    BITCOIN_COMPARISON_CSV_FORMAT,
     BITCOIN_COMPARISON_DATA_LOCATION,
-    LISTINGS_CSV_FORMAT,
+    BITCOIN_COMPARISON_DATASET,
+    BITCOIN_COMPARISON_FILE_FORMAT,
     LISTINGS_DATA_LOCATION,
+    LISTINGS_DATASET,
+    LISTINGS_FILE_FORMAT,
     LOGGER_NAME,
-    PRICING_CSV_FORMAT,
     PRICING_DATA_LOCATION,
+    PRICING_DATASET,
+    PRICING_FILE_FORMAT,
+    PRICING_MODE,
+    PRICING_MODE_QUOTES,
+    QUOTES_DATA_LOCATION,
+    QUOTES_DATASET,
+    QUOTES_FILE_FORMAT,
 )
-from src.util.dataframe_ops import read_csv, write_csv
+from src.util.dataset_registry import DatasetRegistry
+from src.util.metrics import mark_skipped
+from src.util.schemas import LISTINGS_DTYPES
+from src.util.storage import dataset_file
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
 class BitcoinComparisonStep:
 
-    def __init__(self, timestamp: str):
+    # Listing columns read by the step
+    LISTINGS_COLUMNS = ["name", "cmc_rank", "quote.USD.percent_change_24h"]
+
+    def __init__(
+        self,
+        timestamp: str,
+        registry: Optional[DatasetRegistry] = None,
+        pricing_mode: str = PRICING_MODE,
+    ):
         """Step object that takes in pricing data and calculates the difference of
         24 hour percent change of a currency vs. Bitcoin. Writes output to data lake
         as .csv.
 
         Args:
             timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
+            pricing_mode (str, optional): "listings" to read the Bitcoin quote from the
+                full listings, "quotes" to read it from the quotes of only the tracked
+                coins. Defaults to PRICING_MODE.
         """
         self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
         # input dataset details
         self.pricing_file_directory = PRICING_DATA_LOCATION
-        self.pricing_file_format = PRICING_CSV_FORMAT
+        self.pricing_file_format = PRICING_FILE_FORMAT
 
         self.listings_file_directory = LISTINGS_DATA_LOCATION
-        self.listings_file_format = LISTINGS_CSV_FORMAT
+        self.listings_file_format = LISTINGS_FILE_FORMAT
+
+        self.quotes_file_directory = QUOTES_DATA_LOCATION
+        self.quotes_file_format = QUOTES_FILE_FORMAT
+        self.pricing_mode = pricing_mode
         # output dataset details
         self.bitcoin_comparison_directory = BITCOIN_COMPARISON_DATA_LOCATION
-        self.bitcoin_comparison_file_format = BITCOIN_COMPARISON_CSV_FORMAT
+        self.bitcoin_comparison_file_format = BITCOIN_COMPARISON_FILE_FORMAT
 
     @property
-    def pricing_csv(self) -> str:
-        return join(
+    def pricing_file(self) -> str:
+        return dataset_file(
             self.pricing_file_directory,
-            self.pricing_file_format.format(self.timestamp),
+            self.pricing_file_format,
+            self.timestamp,
+            PRICING_DATASET,
         )
 
     @property
-    def listings_csv(self) -> str:
-        return join(
+    def listings_file(self) -> str:
+        return dataset_file(
             self.listings_file_directory,
-            self.listings_file_format.format(self.timestamp),
+            self.listings_file_format,
+            self.timestamp,
+            LISTINGS_DATASET,
+        )
+
+    @property
+    def quotes_file(self) -> str:
+        return dataset_file(
+            self.quotes_file_directory,
+            self.quotes_file_format,
+            self.timestamp,
+            QUOTES_DATASET,
         )
 
     @property
-    def bitcoin_comparison_csv(self) -> str:
-        return join(
+    def source_file(self) -> str:
+        """Listings or quotes dataset the Bitcoin quote is read from, based on the
+        pricing mode. Both datasets share the same columns.
+        """
+        if self.pricing_mode == PRICING_MODE_QUOTES:
+            return self.quotes_file
+        return self.listings_file
+
+    @property
+    def bitcoin_comparison_file(self) -> str:
+        return dataset_file(
             self.bitcoin_comparison_directory,
-            self.bitcoin_comparison_file_format.format(self.timestamp),
+            self.bitcoin_comparison_file_format,
+            self.timestamp,
+            BITCOIN_COMPARISON_DATASET,
         )
 
     def generate_bitcoin_comparison(self) -> Optional[pd.DataFrame]:
@@ -74,12 +127,13 @@ class BitcoinComparisonStep:
                 symbols. None if the file already exists.
         """
 
-        if exists(self.bitcoin_comparison_csv):
+        if dataset_exists(self.bitcoin_comparison_file):
+            mark_skipped()
             logger.info(
-                f"Dataset already exists at '{self.bitcoin_comparison_csv}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
+                f"Dataset already exists at '{self.bitcoin_comparison_file}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
             )
         else:
-            pricing_df = read_csv(self.pricing_csv)
+            pricing_df = self.registry.read(self.pricing_file)
             pricing_df["BitcoinPercentChange24h"] = self.bitcoin_percent_change_24h()
 
             # Finding difference between coin percentage change and Bitcoin percentage change
@@ -90,7 +144,7 @@ class BitcoinComparisonStep:
             comparison_df = self.trim_df_values(pricing_df)
             sorted_df = self.sort_df(comparison_df)
 
-            write_csv(self.bitcoin_comparison_csv, sorted_df)
+            self.registry.write(self.bitcoin_comparison_file, sorted_df)
             return sorted_df
 
     def trim_df_values(self, comparison_df: pd.DataFrame) -> pd.DataFrame:
@@ -132,15 +186,21 @@ class BitcoinComparisonStep:
 
     def bitcoin_percent_change_24h(self) -> float:
         """Pull the bitcoin percent change from the raw listings data in the
-        data lake.
+        data lake, or the quotes data in the "quotes" pricing mode.
 
         Returns:
             float: Bitcoin percent change in last 24 hours
         """
-        # Get the bitcoin percent change from the listings dataset
-        listing_df = read_csv(self.listings_csv)
-        # get the bitcoin quote from the listing df
-        bitcoin_change: pd.Series = listing_df.loc[listing_df["name"] == "Bitcoin"][
+        # Get the bitcoin quote from the listings dataset, reading only the columns
+        # needed of the Bitcoin rows
+        bitcoin_df = self.registry.read(
+            self.source_file,
+            columns=self.LISTINGS_COLUMNS,
+            filters=[("name", "==", "Bitcoin")],
+            dtypes=LISTINGS_DTYPES,
+        )
+        # quotes are not sorted by rank, use the top ranked coin named Bitcoin
+        bitcoin_change = bitcoin_df.sort_values("cmc_rank")[
             "quote.USD.percent_change_24h"
         ]
         return float(bitcoin_change.values[0])
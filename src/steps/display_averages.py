@@ -1,43 +1,43 @@
-from os.path import join
+from typing import Optional
 
-from tabulate import tabulate
-
-from src.util.config import AVG_BITCOIN_DIFF_CSV_FORMAT, AVG_BITCOIN_DIFF_DATA_LOCATION
-from src.util.dataframe_ops import read_csv
+from src.util.config import (
+    AVG_BITCOIN_DIFF_DATA_LOCATION,
+    AVG_BITCOIN_DIFF_DATASET,
+    AVG_BITCOIN_DIFF_FILE_FORMAT,
+)
+from src.util.dataset_registry import DatasetRegistry
+from src.util.quick_view import print_averages_table
+from src.util.storage import dataset_file
 
 
 class DisplayAveragesStep:
 
-    def __init__(self, timestamp: str):
+    def __init__(self, timestamp: str, registry: Optional[DatasetRegistry] = None):
         """Step object that reads in average difference of 24 hour percent change of the
         a currency vs. Bitcoin from data lake and pretty prints output to the end user.
 
         Args:
             timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
         """
         self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
         # input dataset details
         self.avg_bitcoin_diff_directory = AVG_BITCOIN_DIFF_DATA_LOCATION
-        self.avg_bitcoin_diff_file_format = AVG_BITCOIN_DIFF_CSV_FORMAT
+        self.avg_bitcoin_diff_file_format = AVG_BITCOIN_DIFF_FILE_FORMAT
 
     @property
-    def avg_bitcoin_diff_csv(self) -> str:
-        return join(
+    def avg_bitcoin_diff_file(self) -> str:
+        return dataset_file(
             self.avg_bitcoin_diff_directory,
-            self.avg_bitcoin_diff_file_format.format(self.timestamp),
+            self.avg_bitcoin_diff_file_format,
+            self.timestamp,
+            AVG_BITCOIN_DIFF_DATASET,
         )
 
     def display_averages(self) -> None:
         """Simple Function to read in the workflow output and display to the end user"""
-        avg_diff_df = read_csv(self.avg_bitcoin_diff_csv)
-        # pretty printing the data frame using tabulate
-        print(
-            "\nDisplaying average difference between the 24 hour percent change of each "
-            "coin \nand the 24 hour percent change of Bitcoin, across all executions."
-        )
-        print(
-            "\n\n"
-            + tabulate(
-                avg_diff_df, headers="keys", tablefmt="rounded_grid", showindex=False
-            )
-        )
+        avg_diff_df = self.registry.read(self.avg_bitcoin_diff_file)
+        # the same table the 'show' command prints without loading pandas
+        print_averages_table(list(avg_diff_df.columns), avg_diff_df.values.tolist())
@@ -1,36 +1,91 @@
 import logging
-from os.path import exists, join
 from typing import Dict, List, Optional
 
 import pandas as pd
 
 from src.api.coin_market_cap_api import CoinMarketCapApi
-from src.util.config import LISTINGS_CSV_FORMAT, LISTINGS_DATA_LOCATION, LOGGER_NAME
-from src.util.dataframe_ops import write_csv
+from src.util.catalog import dataset_exists
+from src.util.config import (
+    CMC_CONCURRENT_FETCH,
+    LISTINGS_DATA_LOCATION,
+    LISTINGS_DATASET,
+    LISTINGS_FILE_FORMAT,
+    LISTINGS_STREAMING,
+    LOGGER_NAME,
+)
+from src.util.dataframe_ops import open_dataset_writer
+from src.util.dataset_registry import DatasetRegistry
+from src.util.flatten import flatten_records
+from src.util.metrics import mark_skipped
+from src.util.schemas import LISTINGS_DTYPES, LISTINGS_FIELDS
+from src.util.storage import dataset_file
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
 class ListingsStep:
 
-    def __init__(self, timestamp: str):
+    def __init__(
+        self,
+        timestamp: str,
+        registry: Optional[DatasetRegistry] = None,
+        columns: Optional[List[str]] = None,
+        api: Optional[CoinMarketCapApi] = None,
+    ):
         """Step object that calls the CoinMarketCap API to pull latest listings of
         active cryptocurrencies and saves raw data to data lake as .csv.
 
         Args:
             timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
+            columns (Optional[List[str]], optional): Listing columns read by later
+                steps. Only the optional API fields covering them are requested and
+                kept. None to request every default field. Defaults to None.
+            api (Optional[CoinMarketCapApi], optional): Client shared between
+                executions. A new client is built if not provided. Defaults to None.
         """
         self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
+        self.columns = columns
+        self.api = api
         # output dataset details
         self.listings_base_path = LISTINGS_DATA_LOCATION
-        self.listings_file_format = LISTINGS_CSV_FORMAT
+        self.listings_file_format = LISTINGS_FILE_FORMAT
+
+        # fetch pages after the first concurrently, once the total count is known
+        self.concurrent_fetch = CMC_CONCURRENT_FETCH
+        # write each page to the data lake as it arrives instead of holding every page
+        self.streaming = LISTINGS_STREAMING
 
     @property
-    def listings_csv(self) -> str:
-        return join(
-            self.listings_base_path, self.listings_file_format.format(self.timestamp)
+    def listings_file(self) -> str:
+        return dataset_file(
+            self.listings_base_path,
+            self.listings_file_format,
+            self.timestamp,
+            LISTINGS_DATASET,
         )
 
+    @property
+    def aux(self) -> Optional[List[str]]:
+        """Optional API fields to request, None for the default fields"""
+        if self.columns is None:
+            return None
+        return CoinMarketCapApi.listings_aux_for_columns(self.columns)
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        """Declared listing fields to keep, leaving out optional fields not requested"""
+        if self.aux is None:
+            return LISTINGS_FIELDS
+        skipped = set(CoinMarketCapApi.LISTINGS_AUX_FIELDS) - set(self.aux)
+        return {
+            column: dtype
+            for column, dtype in LISTINGS_FIELDS.items()
+            if column.split(".")[0] not in skipped
+        }
+
     def generate_listings(self) -> Optional[pd.DataFrame]:
         """Gets the listings from the upstream CoinMarketCapAPI, writes to data lake location
         as a unique .csv, and returns the DataFrame for use in other workflow steps.
@@ -43,19 +98,49 @@ class ListingsStep:
 
         Returns:
             Optional[pd.DataFrame]: DataFrame with the Crypto listings. None
-                if file already exists.
+                if file already exists, or if streaming.
         """
-        if exists(self.listings_csv):
+        if dataset_exists(self.listings_file):
+            mark_skipped()
             logger.info(
-                f"Dataset already exists at '{self.listings_csv}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
+                f"Dataset already exists at '{self.listings_file}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
             )
+        elif self.streaming:
+            self.stream_listings()
         else:
             listings = self.fetch_listings_upstream()
             # Build out a flattened dataframe
-            df = pd.json_normalize(listings)
-            write_csv(self.listings_csv, df)
+            df = flatten_records(listings, self.fields)
+            self.registry.write(self.listings_file, df)
             return df
 
+    def stream_listings(self) -> int:
+        """Gets the listings from the upstream CoinMarketCapAPI one page at a time,
+        flattening and appending each page to the data lake as it arrives. Peak memory
+        is bounded by a single page instead of the entire market.
+
+        The dataset is not held in memory for later steps, which read only the columns
+        and rows they use from the data lake instead.
+
+        Raises:
+            e: Exception from connecting with the Listings API
+
+        Returns:
+            int: Number of listings written
+        """
+        try:
+            api = self.api if self.api is not None else CoinMarketCapApi()
+            with open_dataset_writer(self.listings_file, LISTINGS_DTYPES) as writer:
+                for page in api.iter_latest_listings_pages(self.aux):
+                    writer.write(flatten_records(page, self.fields))
+        except Exception as e:
+            logger.error(
+                "ERROR getting crypto listings from CMC API to generate listings dataset. Investigate connection, authentication, and inputs, and try re-running process."
+            )
+            raise e
+        logger.info(f"Streamed {writer.row_count} listings to '{self.listings_file}'")
+        return writer.row_count
+
     def fetch_listings_upstream(self) -> List[Dict]:
         """External call to the CMC API to gather all crypto coin listings.
 
@@ -66,8 +151,10 @@ class ListingsStep:
             List[Dict]: List of Coin Data
         """
         try:
-            api = CoinMarketCapApi()
-            listings = api.get_all_latest_listings()
+            api = self.api if self.api is not None else CoinMarketCapApi()
+            listings = api.get_all_latest_listings(
+                concurrent=self.concurrent_fetch, aux=self.aux
+            )
             return listings
         except Exception as e:
             logger.error(
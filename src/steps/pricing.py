@@ -1,29 +1,72 @@
 import logging
 from datetime import datetime, timezone
-from os.path import exists, join
-from typing import Optional
+from os.path import join
+from typing import List, Optional
 
 import pandas as pd
 
+from src.util.catalog import dataset_exists
 from src.util.config import (
     COINS_TO_TRACK_CSV_NAME,
     COINS_TO_TRACK_DATA_LOCATION,
-    LISTINGS_CSV_FORMAT,
     LISTINGS_DATA_LOCATION,
+    LISTINGS_DATASET,
+    LISTINGS_FILE_FORMAT,
     LOGGER_NAME,
-    PRICING_CSV_FORMAT,
     PRICING_DATA_LOCATION,
+    PRICING_DATASET,
+    PRICING_FILE_FORMAT,
+    PRICING_MODE,
+    PRICING_MODE_QUOTES,
+    QUOTES_DATA_LOCATION,
+    QUOTES_DATASET,
+    QUOTES_FILE_FORMAT,
     TIMESTAMP_FORMAT,
 )
-from src.util.dataframe_ops import read_csv, write_csv
+from src.util.dataframe_ops import read_csv
+from src.util.dataset_registry import DatasetRegistry
 from src.util.exceptions import InvalidSymbolException
+from src.util.metrics import mark_skipped
+from src.util.schemas import LISTINGS_DTYPES
+from src.util.storage import dataset_file
 
 logger = logging.getLogger(LOGGER_NAME)
 
+# Only columns of the listings dataset used to build the pricing dataset
+LISTINGS_PRICING_COLUMNS = [
+    "id",
+    "name",
+    "symbol",
+    "slug",
+    "cmc_rank",
+    "quote.USD.price",
+    "quote.USD.volume_24h",
+    "quote.USD.volume_change_24h",
+    "quote.USD.percent_change_1h",
+    "quote.USD.percent_change_24h",
+    "quote.USD.percent_change_7d",
+    "quote.USD.percent_change_30d",
+    "quote.USD.percent_change_60d",
+    "quote.USD.percent_change_90d",
+    "quote.USD.market_cap",
+    "quote.USD.market_cap_dominance",
+    "quote.USD.fully_diluted_market_cap",
+    "quote.USD.tvl",
+    "quote.USD.last_updated",
+]
+
 
 class PricingStep:
 
-    def __init__(self, timestamp: str):
+    # Listing columns read by the step
+    LISTINGS_COLUMNS = LISTINGS_PRICING_COLUMNS
+
+    def __init__(
+        self,
+        timestamp: str,
+        registry: Optional[DatasetRegistry] = None,
+        pricing_mode: str = PRICING_MODE,
+    ):
         """Step object that gathers pricing information from the listing
         data based on user inputted symbols to track. Normalizes naming to
         pascal case for all column names. Writes output to data lake as
@@ -31,35 +74,68 @@ class PricingStep:
 
         Args:
             timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
+            pricing_mode (str, optional): "listings" to price from the full listings,
+                "quotes" to price from the quotes of only the tracked coins. Defaults
+                to PRICING_MODE.
         """
         self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
 
         # input dataset details
         self.configuration_file_directory = COINS_TO_TRACK_DATA_LOCATION
         self.configuration_file_name = COINS_TO_TRACK_CSV_NAME
 
         self.listings_file_directory = LISTINGS_DATA_LOCATION
-        self.listings_file_format = LISTINGS_CSV_FORMAT
+        self.listings_file_format = LISTINGS_FILE_FORMAT
+
+        self.quotes_file_directory = QUOTES_DATA_LOCATION
+        self.quotes_file_format = QUOTES_FILE_FORMAT
+        self.pricing_mode = pricing_mode
 
         # output dataset details
         self.pricing_file_directory = PRICING_DATA_LOCATION
-        self.pricing_file_format = PRICING_CSV_FORMAT
+        self.pricing_file_format = PRICING_FILE_FORMAT
 
     @property
     def coins_to_track_csv(self) -> str:
         return join(self.configuration_file_directory, self.configuration_file_name)
 
     @property
-    def listings_csv(self) -> str:
-        return join(
+    def listings_file(self) -> str:
+        return dataset_file(
             self.listings_file_directory,
-            self.listings_file_format.format(self.timestamp),
+            self.listings_file_format,
+            self.timestamp,
+            LISTINGS_DATASET,
+        )
+
+    @property
+    def quotes_file(self) -> str:
+        return dataset_file(
+            self.quotes_file_directory,
+            self.quotes_file_format,
+            self.timestamp,
+            QUOTES_DATASET,
         )
 
     @property
-    def pricing_csv(self) -> str:
-        return join(
-            self.pricing_file_directory, self.pricing_file_format.format(self.timestamp)
+    def source_file(self) -> str:
+        """Listings or quotes dataset prices are read from, based on the pricing mode.
+        Both datasets share the same columns.
+        """
+        if self.pricing_mode == PRICING_MODE_QUOTES:
+            return self.quotes_file
+        return self.listings_file
+
+    @property
+    def pricing_file(self) -> str:
+        return dataset_file(
+            self.pricing_file_directory,
+            self.pricing_file_format,
+            self.timestamp,
+            PRICING_DATASET,
         )
 
     @property
@@ -90,14 +166,15 @@ class PricingStep:
             Optional[pd.DataFrame]: DataFrame with cleaned pricing information for
                 user inputted crypto symbols. None if file already existed.
         """
-        if exists(self.pricing_csv):
+        if dataset_exists(self.pricing_file):
+            mark_skipped()
             logger.info(
-                f"Dataset already exists at '{self.pricing_csv}'. Using pre-existing dataset "
+                f"Dataset already exists at '{self.pricing_file}'. Using pre-existing dataset "
                 "instead of generating. \n If you desire to generate a new dataset re-run without providing a timestamp."
             )
         else:
             coins_df = read_csv(self.coins_to_track_csv)
-            listings_df = read_csv(self.listings_csv)
+            listings_df = self.read_listings(list(coins_df["Symbol"]))
 
             # validate all the coins to track are legitimate
             self.validate_symbols(coins_df, listings_df)
@@ -110,9 +187,26 @@ class PricingStep:
             # tag with LoadedWhen and IsTopCurrency
             enriched_pricing_df = self.enrich_pricing_dataframe(pricing_df)
 
-            write_csv(self.pricing_csv, enriched_pricing_df)
+            self.registry.write(self.pricing_file, enriched_pricing_df)
             return enriched_pricing_df
 
+    def read_listings(self, symbols: List[str]) -> pd.DataFrame:
+        """Read only the listings of the given symbols, and only the columns used for
+        pricing data. Read from the quotes dataset in the "quotes" pricing mode.
+
+        Args:
+            symbols (List[str]): Symbols of the coins to track
+
+        Returns:
+            pd.DataFrame: Dataframe with pricing columns of listings for the symbols
+        """
+        return self.registry.read(
+            self.source_file,
+            columns=self.LISTINGS_COLUMNS,
+            filters=[("symbol", "in", symbols)],
+            dtypes=LISTINGS_DTYPES,
+        )
+
     def validate_symbols(
         self, coins_df: pd.DataFrame, listings_df: pd.DataFrame
     ) -> None:
@@ -0,0 +1,126 @@
+import logging
+from os.path import join
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.api.coin_market_cap_api import CoinMarketCapApi
+from src.util.catalog import dataset_exists
+from src.util.config import (
+    COINS_TO_TRACK_CSV_NAME,
+    COINS_TO_TRACK_DATA_LOCATION,
+    LOGGER_NAME,
+    QUOTES_DATA_LOCATION,
+    QUOTES_DATASET,
+    QUOTES_FILE_FORMAT,
+)
+from src.util.dataframe_ops import read_csv
+from src.util.dataset_registry import DatasetRegistry
+from src.util.flatten import flatten_records
+from src.util.metrics import mark_skipped
+from src.util.schemas import QUOTES_FIELDS
+from src.util.storage import dataset_file
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Always quoted, as every tracked coin is compared against Bitcoin
+BITCOIN_SYMBOL = "BTC"
+
+
+class QuotesStep:
+
+    def __init__(
+        self,
+        timestamp: str,
+        registry: Optional[DatasetRegistry] = None,
+        api: Optional[CoinMarketCapApi] = None,
+    ):
+        """Step object that calls the CoinMarketCap API to pull the latest quotes of
+        only the coins to track and Bitcoin, and saves the raw data to the data lake.
+
+        Used in place of the listings in the "quotes" pricing mode. The quotes dataset
+        has the same columns as the listings dataset, so later steps read either one
+        the same way.
+
+        Args:
+            timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
+            api (Optional[CoinMarketCapApi], optional): Client shared between
+                executions. A new client is built if not provided. Defaults to None.
+        """
+        self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
+        self.api = api
+
+        # input dataset details
+        self.configuration_file_directory = COINS_TO_TRACK_DATA_LOCATION
+        self.configuration_file_name = COINS_TO_TRACK_CSV_NAME
+
+        # output dataset details
+        self.quotes_base_path = QUOTES_DATA_LOCATION
+        self.quotes_file_format = QUOTES_FILE_FORMAT
+
+    @property
+    def coins_to_track_csv(self) -> str:
+        return join(self.configuration_file_directory, self.configuration_file_name)
+
+    @property
+    def quotes_file(self) -> str:
+        return dataset_file(
+            self.quotes_base_path,
+            self.quotes_file_format,
+            self.timestamp,
+            QUOTES_DATASET,
+        )
+
+    def generate_quotes(self) -> Optional[pd.DataFrame]:
+        """Gets the latest quotes of the coins to track and Bitcoin from the upstream
+        CoinMarketCapAPI, writes to data lake location, and returns the DataFrame for
+        use in other workflow steps.
+
+        If there already exists a file for the given execution timestamp, skips step to
+        avoid repeat work.
+
+        Returns:
+            Optional[pd.DataFrame]: DataFrame with the quotes. None if file already
+                exists.
+        """
+        if dataset_exists(self.quotes_file):
+            mark_skipped()
+            logger.info(
+                f"Dataset already exists at '{self.quotes_file}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
+            )
+        else:
+            coins_df = read_csv(self.coins_to_track_csv)
+            symbols = list(dict.fromkeys([BITCOIN_SYMBOL] + list(coins_df["Symbol"])))
+            quotes = self.fetch_quotes_upstream(symbols)
+            # Build out a flattened dataframe
+            df = flatten_records(quotes, QUOTES_FIELDS)
+            self.registry.write(self.quotes_file, df)
+            return df
+
+    def fetch_quotes_upstream(self, symbols: List[str]) -> List[Dict]:
+        """External call to the CMC API to gather the quotes of the given symbols.
+
+        Only active coins are kept, the same as the listings. Inactive coins sharing a
+        symbol have no rank or pricing data.
+
+        Args:
+            symbols (List[str]): Symbols of the coins to quote
+
+        Raises:
+            e: Exception from connecting with the Quotes API
+
+        Returns:
+            List[Dict]: List of Coin Data
+        """
+        try:
+            api = self.api if self.api is not None else CoinMarketCapApi()
+            quotes = api.get_latest_quotes(symbols)
+        except Exception as e:
+            logger.error(
+                "ERROR getting crypto quotes from CMC API to generate quotes dataset. Investigate connection, authentication, and inputs, and try re-running process."
+            )
+            raise e
+        return [quote for quote in quotes if quote.get("cmc_rank") is not None]
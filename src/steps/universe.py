@@ -1,55 +1,115 @@
 import logging
-from os.path import exists, join
+from os.path import join
 from typing import Dict, List, Optional
 
 import pandas as pd
 
 from src.api.coin_market_cap_api import CoinMarketCapApi
+from src.util.batch_checkpoint import BatchCheckpoint
+from src.util.catalog import dataset_exists
 from src.util.config import (
-    LISTINGS_CSV_FORMAT,
+    CMC_CONCURRENT_FETCH,
     LISTINGS_DATA_LOCATION,
+    LISTINGS_DATASET,
+    LISTINGS_FILE_FORMAT,
     LOGGER_NAME,
-    UNIVERSE_CSV_FORMAT,
+    METADATA_CACHE_FILE_NAME,
+    METADATA_CACHE_LOCATION,
+    UNIVERSE_CHECKPOINT_LOCATION,
     UNIVERSE_DATA_LOCATION,
+    UNIVERSE_DATASET,
+    UNIVERSE_DELTAS,
+    UNIVERSE_FILE_FORMAT,
+    UNIVERSE_INCREMENTAL,
 )
-from src.util.dataframe_ops import read_csv, write_csv
+from src.util.dataset_registry import DatasetRegistry
+from src.util.flatten import flatten_records
+from src.util.metadata_cache import MetadataCache
+from src.util.metrics import mark_skipped
+from src.util.schemas import LISTINGS_DTYPES, UNIVERSE_FIELDS
+from src.util.storage import dataset_file
+from src.util.universe_snapshots import UniverseSnapshots, snapshot
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
 class UniverseStep:
 
-    def __init__(self, timestamp: str):
+    # Listing columns read by the step
+    LISTINGS_COLUMNS = ["id"]
+
+    def __init__(
+        self,
+        timestamp: str,
+        registry: Optional[DatasetRegistry] = None,
+        api: Optional[CoinMarketCapApi] = None,
+        metadata_cache: Optional[MetadataCache] = None,
+    ):
         """Step object that calls the CoinMarketCap API to pull the static Metadata
         for all coins in the list of active cryptocurrencies and saves the raw data
         to the data lake as a .csv.
 
         Args:
             timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            registry (Optional[DatasetRegistry], optional): Registry of datasets produced
+                during the run. Defaults to None.
+            api (Optional[CoinMarketCapApi], optional): Client shared between
+                executions. A new client is built if not provided. Defaults to None.
+            metadata_cache (Optional[MetadataCache], optional): Metadata cache kept in
+                memory between executions, only re-read when the cache file changes.
+                Read from the cache file if not provided. Defaults to None.
         """
         self.timestamp = timestamp
+        self.registry = registry if registry is not None else DatasetRegistry()
+        self.api = api
+        self.metadata_cache = metadata_cache
 
         # input dataset details
         self.listings_base_path = LISTINGS_DATA_LOCATION
-        self.listings_file_format = LISTINGS_CSV_FORMAT
+        self.listings_file_format = LISTINGS_FILE_FORMAT
 
         # output dataset details
         self.universe_base_path = UNIVERSE_DATA_LOCATION
-        self.universe_file_format = UNIVERSE_CSV_FORMAT
+        self.universe_file_format = UNIVERSE_FILE_FORMAT
+        self.universe_checkpoint_base_path = UNIVERSE_CHECKPOINT_LOCATION
+
+        # metadata cache details
+        self.metadata_cache_directory = METADATA_CACHE_LOCATION
+        self.metadata_cache_file_name = METADATA_CACHE_FILE_NAME
+
+        # fetch metadata batches concurrently, within the rate limit of the CMC plan
+        self.concurrent_fetch = CMC_CONCURRENT_FETCH
+        # only fetch metadata for IDs that are new or expired in the metadata cache
+        self.incremental = UNIVERSE_INCREMENTAL
+        # store only the coins that changed since the previous execution
+        self.deltas = UNIVERSE_DELTAS
 
     @property
-    def listings_csv(self) -> str:
-        return join(
+    def listings_file(self) -> str:
+        return dataset_file(
             self.listings_base_path,
-            self.listings_file_format.format(self.timestamp),
+            self.listings_file_format,
+            self.timestamp,
+            LISTINGS_DATASET,
         )
 
     @property
-    def universe_csv(self) -> str:
-        return join(
-            self.universe_base_path, self.universe_file_format.format(self.timestamp)
+    def universe_file(self) -> str:
+        return dataset_file(
+            self.universe_base_path,
+            self.universe_file_format,
+            self.timestamp,
+            UNIVERSE_DATASET,
         )
 
+    @property
+    def universe_checkpoint_directory(self) -> str:
+        return join(self.universe_checkpoint_base_path, self.timestamp)
+
+    @property
+    def metadata_cache_file(self) -> str:
+        return join(self.metadata_cache_directory, self.metadata_cache_file_name)
+
     def generate_universe(self) -> Optional[pd.DataFrame]:
         """For a list of Tickers, gather the metadata from the upstream API,
         save into the data lake, and return the dataframe.
@@ -57,26 +117,78 @@ class UniverseStep:
         If there already exists a file for the given execution timestamp, skips step to
         avoid repeat work.
 
+        When running incrementally, metadata is only fetched for IDs that are new or
+        expired in the metadata cache. The dataset is still the complete universe.
+
+        Each completed batch of metadata is checkpointed, so re-running with the same
+        timestamp after a failure only requests the batches that did not complete.
+
+        Unless UNIVERSE_DELTAS is disabled, only the coins that were added, changed or
+        removed since the previous execution are written to the data lake, see
+        src.util.universe_snapshots. The returned dataset is the complete universe.
+
         Returns:
             Optional[pd.DataFrame]: DataFrame containing the universe of crypto metadata.
                 None if file already existed.
         """
-        if exists(self.universe_csv):
+        if dataset_exists(self.universe_file):
+            mark_skipped()
             logger.info(
-                f"Dataset already exists at '{self.universe_csv}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
+                f"Dataset already exists at '{self.universe_file}'. Using pre-existing dataset instead of generating new dataset. \nIf you desire to generate a new dataset re-run without providing a timestamp."
             )
         else:
-            listings_df = read_csv(self.listings_csv)
+            # only the IDs of the listings are needed
+            listings_df = self.registry.read(
+                self.listings_file,
+                columns=self.LISTINGS_COLUMNS,
+                dtypes=LISTINGS_DTYPES,
+            )
             crypto_ids = list(listings_df["id"])
             # Call the upstream Metadata API to gather the information.
-            metadata = self.get_metadata(crypto_ids)
+            if self.incremental:
+                metadata = self.get_metadata_incremental(crypto_ids)
+            else:
+                metadata = self.get_metadata(crypto_ids)
             # Build out a flattened dataframe
-            df = pd.json_normalize(metadata)
-            # write the dataframe to .csv in datalake
-            write_csv(self.universe_csv, df)
+            df = flatten_records(metadata, UNIVERSE_FIELDS)
+            # write the dataframe to the datalake, as the changes since the previous
+            # execution unless it is time for a full snapshot
+            stored_df = snapshot(df)
+            if self.deltas:
+                stored_df = UniverseSnapshots(
+                    self.universe_base_path, self.universe_file_format
+                ).encode(self.timestamp, df)
+            self.registry.write(self.universe_file, stored_df)
+            # the dataset is complete, batch checkpoints are no longer needed
+            BatchCheckpoint(self.universe_checkpoint_directory).clear()
             # return the dataframe to be used by other workflow steps
             return df
 
+    def get_metadata_incremental(self, ids: List[str]) -> List[Dict]:
+        """Get Metadata for a given list of CMC Coin IDs, only calling the API for IDs
+        that are missing from the metadata cache or have expired.
+
+        Args:
+            ids (List[str]): List of CMC Coin IDs to gather metadata on
+
+        Returns:
+            List[Dict]: List of metadata objects for each CMC Coin ID present
+        """
+        cache = self.metadata_cache
+        if cache is None:
+            cache = MetadataCache(self.metadata_cache_file)
+        else:
+            cache.refresh()
+        stale_ids = cache.stale_ids(ids)
+        logger.info(
+            f"Fetching metadata for {len(stale_ids)} new or expired of {len(ids)} coins, "
+            "using cached metadata for the rest"
+        )
+        if stale_ids:
+            cache.update(self.get_metadata(stale_ids))
+            cache.save()
+        return cache.get_many(ids)
+
     def get_metadata(self, ids: List[str]) -> List[Dict]:
         """Get Metadata for a given list of CMC Coin IDs.
 
@@ -90,8 +202,12 @@ class UniverseStep:
             List[Dict]: List of metadata objects for each CMC Coin ID present
         """
         try:
-            api = CoinMarketCapApi()
-            metadata = api.get_metadata_safe(ids)
+            api = self.api if self.api is not None else CoinMarketCapApi()
+            metadata = api.get_metadata_safe(
+                ids,
+                concurrent=self.concurrent_fetch,
+                checkpoint=BatchCheckpoint(self.universe_checkpoint_directory),
+            )
             return metadata
         except Exception as e:
             logger.error(
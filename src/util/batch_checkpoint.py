@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+from os.path import exists, join
+from typing import Dict, List, Optional
+
+
+class BatchCheckpoint:
+
+    def __init__(self, checkpoint_directory: str):
+        """Persists the result of each completed batch of API requests so that a
+        failed execution can resume without repeating the batches that finished.
+
+        Each batch is stored as its own JSON file, along with the IDs requested so a
+        checkpoint is only reused for the exact same batch.
+
+        Args:
+            checkpoint_directory (str): Directory to store the batch checkpoints in
+        """
+        self.checkpoint_directory = checkpoint_directory
+
+    def batch_file(self, index: int) -> str:
+        return join(self.checkpoint_directory, f"batch_{index:05d}.json")
+
+    def load(self, index: int, ids: List) -> Optional[List[Dict]]:
+        """Load the result of a completed batch.
+
+        Args:
+            index (int): Position of the batch in the full list of batches
+            ids (List): IDs requested in the batch
+
+        Returns:
+            Optional[List[Dict]]: Result of the batch. None if the batch has not
+                completed, or was completed for a different set of IDs.
+        """
+        if not exists(self.batch_file(index)):
+            return None
+        try:
+            with open(self.batch_file(index), "r") as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if checkpoint["ids"] != list(map(str, ids)):
+            return None
+        return checkpoint["data"]
+
+    def save(self, index: int, ids: List, data: List[Dict]) -> None:
+        """Persist the result of a completed batch. Writes to a temp file first so
+        a failure part way through never leaves a partial checkpoint behind.
+
+        Args:
+            index (int): Position of the batch in the full list of batches
+            ids (List): IDs requested in the batch
+            data (List[Dict]): Result of the batch
+        """
+        os.makedirs(self.checkpoint_directory, exist_ok=True)
+        temp_file = f"{self.batch_file(index)}.tmp"
+        with open(temp_file, "w") as file:
+            json.dump({"ids": list(map(str, ids)), "data": data}, file)
+        os.replace(temp_file, self.batch_file(index))
+
+    def clear(self) -> None:
+        """Remove all checkpoints, once the dataset they build has been written"""
+        shutil.rmtree(self.checkpoint_directory, ignore_errors=True)
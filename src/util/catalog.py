@@ -0,0 +1,814 @@
+"""SQLite catalog of the dataset files in a data lake.
+
+Every dataset file written through src.util.storage is recorded with its execution
+timestamp, row count, schema hash and status, so steps look files up in an index
+instead of calling exists() and listing dataset directories, which slows down as
+tens of thousands of execution files accumulate. Compacted files are recorded once
+for every execution they hold, so executions are still found by their timestamp.
+
+The catalog is a single database at DATA_LAKE_CATALOG_FILE, by default at the root of
+the data lake. Datasets are identified by the absolute path of their directory, so
+any lake read, e.g. the mock data lake of the tests, is cataloged in the one database
+instead of in a database written next to its datasets. Each dataset directory and
+partition is re-synced from the filesystem whenever its modification time changes
+without the catalog knowing, e.g. when files are copied in or deleted by hand, so the
+catalog never has to be trusted blindly. If the catalog cannot be used the filesystem
+is read instead.
+
+Nothing here imports pandas, so fast CLI commands can use the catalog too.
+"""
+
+import csv
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from os.path import basename, dirname, exists, join
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.util.config import (
+    COMPACTION_TIMESTAMP_COLUMN,
+    DATA_LAKE_CATALOG,
+    DATA_LAKE_CATALOG_FILE,
+    LOGGER_NAME,
+)
+from src.util.partitions import (
+    compacted_file,
+    is_compacted_file,
+    parse_compacted_file_name,
+    partition_date,
+    partition_name,
+    split_partition,
+    timestamp_date,
+)
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Extensions of the storage formats in src.util.storage, which imports pandas
+DATASET_EXTENSIONS = [".csv", ".parquet"]
+# File names of datasets end with the execution timestamp, e.g. 'coins_pricing_{}'
+DATASET_FILE_NAME = re.compile(r"^(?P<name>.*?)(?P<timestamp>\d{14})$")
+
+# A dataset file is 'writing' from when a writer is opened until it is closed,
+# lookups only ever return 'complete' files
+STATUS_WRITING = "writing"
+STATUS_COMPLETE = "complete"
+# A directory synced while its mtime was this recent is synced once more when the
+# mtime gets older, as a change made within the timestamp granularity of the
+# filesystem leaves the mtime unchanged
+RECENT_MTIME_NS = 2_000_000_000
+
+# Catalogs of an older version are emptied and re-synced from the filesystem
+CATALOG_VERSION = 4
+_SCHEMA = f"""
+DROP TABLE IF EXISTS files;
+DROP TABLE IF EXISTS directories;
+CREATE TABLE files (
+    dataset TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    compacted INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    row_count INTEGER,
+    schema_hash TEXT,
+    size_bytes INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (dataset, partition, file_name, timestamp)
+);
+CREATE INDEX files_by_timestamp ON files (dataset, name, timestamp);
+-- covers the lookup of the cataloged file names of a directory on a sync
+CREATE INDEX files_by_directory ON files (dataset, partition, compacted, status, file_name);
+CREATE TABLE directories (
+    dataset TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    mtime_ns INTEGER,
+    settled INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dataset, partition)
+);
+PRAGMA user_version = {CATALOG_VERSION};
+"""
+_INSERT_FILE = (
+    "INSERT OR REPLACE INTO files (dataset, partition, file_name, name, timestamp,"
+    " compacted, status, row_count, schema_hash, size_bytes, updated_at)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def parse_dataset_file_name(file_name: str) -> Optional[Tuple[str, str]]:
+    """Split a dataset file name into the name before the timestamp and the timestamp.
+
+    Args:
+        file_name (str): File name, e.g. 'coins_pricing_20250116000000.csv'
+
+    Returns:
+        Optional[Tuple[str, str]]: e.g. ('coins_pricing_', '20250116000000'). None if
+            not a dataset file.
+    """
+    for extension in DATASET_EXTENSIONS:
+        if file_name.endswith(extension):
+            match = DATASET_FILE_NAME.match(file_name[: -len(extension)])
+            if match is not None:
+                return match.group("name"), match.group("timestamp")
+    return None
+
+
+def list_directory(directory: str) -> List[str]:
+    return os.listdir(directory) if exists(directory) else []
+
+
+def scan_directory(
+    directory: str,
+) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, Tuple[str, str]], List[str]]:
+    """List the dataset files, compacted files and partitions of a directory from the
+    filesystem.
+
+    Args:
+        directory (str): Directory of a dataset, or a partition of it
+
+    Returns:
+        Tuple[Dict[str, Tuple[str, str]], Dict[str, Tuple[str, str]], List[str]]: Name
+            and timestamp of every dataset file and name and date of every compacted
+            file, keyed by file name, and the names of the partitions
+    """
+    return classify_file_names(list_directory(directory))
+
+
+def classify_file_names(
+    file_names: Iterable[str],
+) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, Tuple[str, str]], List[str]]:
+    """Sort the entries of a directory into dataset files, compacted files and
+    partitions, see scan_directory.
+    """
+    files, compacted, partitions = {}, {}, []
+    for file_name in file_names:
+        parsed = parse_dataset_file_name(file_name)
+        if parsed is not None:
+            files[file_name] = parsed
+            continue
+        parsed = parse_compacted_file_name(file_name)
+        if parsed is not None:
+            compacted[file_name] = parsed
+        elif partition_date(file_name) is not None:
+            partitions.append(file_name)
+    return files, compacted, sorted(partitions)
+
+
+def describe_file(
+    file_path: str, row_count: Optional[int] = None
+) -> Tuple[Optional[int], str]:
+    """Row count and schema hash of a dataset file. The schema hash covers the column
+    names, and their types for parquet files, which store them.
+
+    Args:
+        file_path (str): Dataset file
+        row_count (Optional[int], optional): Row count if already known, otherwise
+            counted from the file. Defaults to None.
+
+    Returns:
+        Tuple[Optional[int], str]: Row count and schema hash of the file
+    """
+    if file_path.endswith(".parquet"):
+        # only the footer of the file is read
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_metadata(file_path)
+        schema = metadata.schema.to_arrow_schema()
+        columns = [f"{field.name}:{field.type}" for field in schema]
+        if row_count is None:
+            row_count = metadata.num_rows
+    else:
+        with open(file_path, "r", newline="") as file:
+            reader = csv.reader(file)
+            columns = next(reader, [])
+            if row_count is None:
+                row_count = sum(1 for _ in reader)
+    schema_hash = hashlib.sha1("\n".join(columns).encode()).hexdigest()[:16]
+    return row_count, schema_hash
+
+
+def compacted_timestamps(file_path: str) -> Dict[str, int]:
+    """Row count of every execution held in a compacted file, reading only the
+    timestamp column.
+
+    Args:
+        file_path (str): Compacted file
+
+    Returns:
+        Dict[str, int]: Row count per execution timestamp
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(file_path, columns=[COMPACTION_TIMESTAMP_COLUMN])
+    return dict(Counter(table.column(COMPACTION_TIMESTAMP_COLUMN).to_pylist()))
+
+
+def file_rows(
+    dataset: str,
+    partition: str,
+    directory: str,
+    files: Dict[str, Tuple[str, str]],
+    compacted: Dict[str, Tuple[str, str]],
+    describe: bool,
+) -> List[tuple]:
+    """Catalog rows of the files of a directory. Compacted files have a row for every
+    execution they hold, so they are always read.
+
+    Args:
+        dataset (str): Absolute path of the dataset directory
+        partition (str): Name of the partition, '' for the dataset directory itself
+        directory (str): Directory of the files
+        files (Dict[str, Tuple[str, str]]): Dataset files, see scan_directory
+        compacted (Dict[str, Tuple[str, str]]): Compacted files, see scan_directory
+        describe (bool): Whether to read the row count and schema of dataset files
+
+    Returns:
+        List[tuple]: Rows of the files table
+    """
+    now = time.time()
+    rows = []
+    for file_name, (name, timestamp) in files.items():
+        file_path = join(directory, file_name)
+        row_count, schema_hash, size_bytes = None, None, None
+        if describe:
+            row_count, schema_hash = describe_file(file_path)
+            size_bytes = os.path.getsize(file_path)
+        rows.append(
+            (dataset, partition, file_name, name, timestamp, 0, STATUS_COMPLETE)
+            + (row_count, schema_hash, size_bytes, now)
+        )
+    for file_name, (name, _) in compacted.items():
+        file_path = join(directory, file_name)
+        _, schema_hash = describe_file(file_path, 0)
+        size_bytes = os.path.getsize(file_path)
+        for timestamp, row_count in compacted_timestamps(file_path).items():
+            rows.append(
+                (dataset, partition, file_name, name, timestamp, 1, STATUS_COMPLETE)
+                + (row_count, schema_hash, size_bytes, now)
+            )
+    return rows
+
+
+class DataLakeCatalog:
+
+    def __init__(self, db_file: str):
+        """Catalog of the dataset files in the directories of data lakes.
+
+        Datasets are identified by the absolute path of their directory.
+
+        Args:
+            db_file (str): SQLite database of the catalog
+        """
+        self.db_file = db_file
+        self._local = threading.local()
+        self.connect()
+
+    def connect(self) -> sqlite3.Connection:
+        """Connection to the catalog of the calling thread, so steps in any thread
+        can use the catalog without sharing a connection. Reopened if the catalog was
+        deleted while the process was running.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None or not exists(self.db_file):
+            connection = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version != CATALOG_VERSION:
+                connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def dataset(directory: str) -> str:
+        return os.path.abspath(directory)
+
+    @classmethod
+    def locate(cls, file_path: str) -> Tuple[str, str, str]:
+        """Dataset, partition and file name of a dataset file"""
+        directory, partition = split_partition(dirname(file_path))
+        return cls.dataset(directory), partition, basename(file_path)
+
+    @staticmethod
+    def directory_mtime(directory: str) -> int:
+        # -1 for a missing directory, so its files are dropped on the next sync
+        return os.stat(directory).st_mtime_ns if exists(directory) else -1
+
+    @staticmethod
+    def settled(mtime: int) -> bool:
+        """Whether a directory mtime is old enough that any later change to the
+        directory changes it
+        """
+        return time.time_ns() - mtime >= RECENT_MTIME_NS
+
+    def sync(self, directory: str, partition: str = "") -> None:
+        """Re-read the files of a dataset directory, or of one of its partitions, if
+        it changed since the catalog last saw it. Files found are added without a row
+        count or schema hash, files that are gone are removed. Syncing the dataset
+        directory also finds the partitions that were added or removed.
+
+        Args:
+            directory (str): Directory of a dataset within the lake
+            partition (str, optional): Name of the partition, '' for the dataset
+                directory itself. Defaults to ''.
+        """
+        dataset = self.dataset(directory)
+        path = join(directory, partition)
+        mtime = self.directory_mtime(path)
+        connection = self.connect()
+        known = connection.execute(
+            "SELECT mtime_ns, settled FROM directories WHERE dataset = ?"
+            " AND partition = ?",
+            (dataset, partition),
+        ).fetchone()
+        # a directory synced while its mtime was recent is synced once more after
+        # the mtime settles
+        if known is not None and known[0] == mtime:
+            if known[1] or not self.settled(mtime):
+                return
+
+        # only the names new to the catalog are parsed, as a directory holds tens of
+        # thousands of files of which a handful changed
+        file_names = set(list_directory(path))
+        cataloged = {
+            file_name
+            for (file_name,) in connection.execute(
+                "SELECT file_name FROM files WHERE dataset = ? AND partition = ?"
+                " AND status = ? AND NOT compacted",
+                (dataset, partition, STATUS_COMPLETE),
+            )
+        }
+        cataloged_compacted = dict(
+            connection.execute(
+                "SELECT DISTINCT file_name, size_bytes FROM files WHERE dataset = ?"
+                " AND partition = ? AND status = ? AND compacted",
+                (dataset, partition, STATUS_COMPLETE),
+            ).fetchall()
+        )
+        new_files, compacted, partitions = classify_file_names(file_names - cataloged)
+        # compacted files are only read when new, or rewritten since they were read
+        changed = {
+            file_name: parsed
+            for file_name, parsed in compacted.items()
+            if cataloged_compacted.get(file_name)
+            != os.path.getsize(join(path, file_name))
+        }
+        rows = file_rows(dataset, partition, path, new_files, changed, describe=False)
+        removed = ((cataloged | set(cataloged_compacted)) - file_names) | set(changed)
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "DELETE FROM files WHERE dataset = ? AND partition = ? AND file_name = ?",
+                [(dataset, partition, file_name) for file_name in removed],
+            )
+            connection.executemany(_INSERT_FILE, rows)
+            if partition == "":
+                self._sync_partitions(connection, dataset, partitions)
+            connection.execute(
+                "INSERT OR REPLACE INTO directories (dataset, partition, mtime_ns,"
+                " settled) VALUES (?, ?, ?, ?)",
+                (dataset, partition, mtime, self.settled(mtime)),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _sync_partitions(
+        connection: sqlite3.Connection, dataset: str, partitions: List[str]
+    ) -> None:
+        known = {
+            name
+            for (name,) in connection.execute(
+                "SELECT partition FROM directories WHERE dataset = ? AND partition != ''",
+                (dataset,),
+            )
+        }
+        for gone in known - set(partitions):
+            for table in ["files", "directories"]:
+                connection.execute(
+                    f"DELETE FROM {table} WHERE dataset = ? AND partition = ?",
+                    (dataset, gone),
+                )
+        # new partitions are read on their first sync
+        connection.executemany(
+            "INSERT OR IGNORE INTO directories (dataset, partition, mtime_ns)"
+            " VALUES (?, ?, NULL)",
+            [(dataset, name) for name in partitions],
+        )
+
+    def sync_dataset(
+        self, directory: str, partitions: Optional[List[str]] = None
+    ) -> None:
+        """Sync a dataset directory and its partitions.
+
+        Args:
+            directory (str): Directory of a dataset within the lake
+            partitions (Optional[List[str]], optional): Names of the partitions to
+                sync, None for every partition. Defaults to None.
+        """
+        self.sync(directory)
+        if partitions is None:
+            partitions = [
+                name
+                for (name,) in self.connect().execute(
+                    "SELECT partition FROM directories WHERE dataset = ?"
+                    " AND partition != ''",
+                    (self.dataset(directory),),
+                )
+            ]
+        for name in partitions:
+            self.sync(directory, name)
+
+    def find(self, directory: str, name: str, timestamp: str) -> List[str]:
+        """File paths of the complete dataset files of an execution, one per storage
+        format the execution was written in, followed by the compacted file holding
+        the execution.
+
+        Args:
+            directory (str): Directory of a dataset within the lake
+            name (str): File name before the timestamp, e.g. 'coins_pricing_'
+            timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+
+        Returns:
+            List[str]: File paths of the dataset files
+        """
+        self.sync_dataset(directory, [partition_name(timestamp_date(timestamp))])
+        rows = self.connect().execute(
+            "SELECT partition, file_name FROM files WHERE dataset = ? AND name = ?"
+            " AND timestamp = ? AND status = ?"
+            " ORDER BY compacted, partition, file_name",
+            (self.dataset(directory), name, timestamp, STATUS_COMPLETE),
+        )
+        return [join(directory, partition, file_name) for partition, file_name in rows]
+
+    def list(self, directory: str, name: str) -> List[Tuple[str, str]]:
+        """Timestamp and file path of every execution of a dataset, oldest first.
+        Executions still in their own file are not listed again from a compacted file.
+
+        Args:
+            directory (str): Directory of a dataset within the lake
+            name (str): File name before the timestamp, e.g. 'coins_pricing_'
+
+        Returns:
+            List[Tuple[str, str]]: Timestamp and file path of each execution
+        """
+        self.sync_dataset(directory)
+        rows = self.connect().execute(
+            "SELECT timestamp, partition, file_name FROM files AS f"
+            " WHERE dataset = ? AND name = ? AND status = ? AND NOT (compacted AND"
+            " EXISTS (SELECT 1 FROM files WHERE dataset = f.dataset AND name = f.name"
+            " AND timestamp = f.timestamp AND NOT compacted AND status = f.status))"
+            " ORDER BY timestamp, compacted, partition, file_name",
+            (self.dataset(directory), name, STATUS_COMPLETE),
+        )
+        return [
+            (timestamp, join(directory, partition, file_name))
+            for timestamp, partition, file_name in rows
+        ]
+
+    def start_write(self, file_path: str) -> Optional[int]:
+        """Record that a dataset file is being written. A complete file of the same
+        name stays complete until the new file replaces it.
+
+        Args:
+            file_path (str): Dataset file
+
+        Returns:
+            Optional[int]: Modification time of the directory before the write
+        """
+        parsed = parse_dataset_file_name(basename(file_path))
+        if parsed is None:
+            return None
+        dataset, partition, file_name = self.locate(file_path)
+        mtime = self.directory_mtime(dirname(file_path))
+        self.connect().execute(
+            _INSERT_FILE.replace("OR REPLACE", "OR IGNORE"),
+            (dataset, partition, file_name, *parsed, 0, STATUS_WRITING)
+            + (None, None, None, time.time()),
+        )
+        return mtime
+
+    def complete_write(
+        self, file_path: str, row_count: int, mtime_before: Optional[int]
+    ) -> None:
+        """Record a dataset file that has been written.
+
+        Args:
+            file_path (str): Dataset file
+            row_count (int): Rows written
+            mtime_before (Optional[int]): Modification time of the directory before
+                the write, from start_write
+        """
+        parsed = parse_dataset_file_name(basename(file_path))
+        if parsed is None:
+            return
+        dataset, partition, file_name = self.locate(file_path)
+        row_count, schema_hash = describe_file(file_path, row_count)
+        connection = self.connect()
+        connection.execute(
+            _INSERT_FILE,
+            (dataset, partition, file_name, *parsed, 0, STATUS_COMPLETE)
+            + (row_count, schema_hash, os.path.getsize(file_path), time.time()),
+        )
+        # the catalog stays in sync if it was in sync before the write, so the next
+        # lookup does not re-read the directory, otherwise the next lookup re-syncs
+        # it. The new mtime is trusted, as the catalog made the change.
+        connection.execute(
+            "UPDATE directories SET mtime_ns = ? WHERE dataset = ? AND partition = ?"
+            " AND mtime_ns = ?",
+            (
+                self.directory_mtime(dirname(file_path)),
+                dataset,
+                partition,
+                mtime_before,
+            ),
+        )
+
+    def discard_write(self, file_path: str) -> None:
+        """Forget a dataset file that failed to write, unless a complete file of the
+        same name is still in place.
+
+        Args:
+            file_path (str): Dataset file
+        """
+        dataset, partition, file_name = self.locate(file_path)
+        self.connect().execute(
+            "DELETE FROM files WHERE dataset = ? AND partition = ? AND file_name = ?"
+            " AND status = ?",
+            (dataset, partition, file_name, STATUS_WRITING),
+        )
+
+    def record_compaction(self, file_path: str, merged_files: List[str]) -> None:
+        """Record a compacted file in place of the dataset files merged into it, so
+        their executions are read from the compacted file before the files are
+        removed.
+
+        Args:
+            file_path (str): Compacted file
+            merged_files (List[str]): Dataset files merged into the compacted file
+        """
+        dataset, partition, file_name = self.locate(file_path)
+        rows = file_rows(
+            dataset,
+            partition,
+            dirname(file_path),
+            {},
+            {file_name: parse_compacted_file_name(file_name)},
+            describe=True,
+        )
+        connection = self.connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for replaced in [file_path] + merged_files:
+                _, replaced_partition, replaced_name = self.locate(replaced)
+                connection.execute(
+                    "DELETE FROM files WHERE dataset = ? AND partition = ?"
+                    " AND file_name = ?",
+                    (dataset, replaced_partition, replaced_name),
+                )
+                # re-read on the next lookup, once the merged files are removed
+                connection.execute(
+                    "UPDATE directories SET mtime_ns = NULL WHERE dataset = ?"
+                    " AND partition = ?",
+                    (dataset, replaced_partition),
+                )
+            connection.executemany(_INSERT_FILE, rows)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def rebuild(self, root: str) -> Dict[str, int]:
+        """Rebuild the catalog from the dataset files in every directory of a lake,
+        reading the row count and schema of every file. Datasets of any other lake
+        are forgotten, and re-synced from the filesystem on their next lookup.
+
+        Args:
+            root (str): Root directory of the data lake, holding a directory per dataset
+
+        Returns:
+            Dict[str, int]: Number of files cataloged per dataset
+        """
+        counts = {}
+        connection = self.connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM files")
+            connection.execute("DELETE FROM directories")
+            for name in sorted(os.listdir(root)):
+                directory = join(root, name)
+                if not os.path.isdir(directory):
+                    continue
+                dataset = self.dataset(directory)
+                _, _, partitions = scan_directory(directory)
+                for partition in [""] + partitions:
+                    path = join(directory, partition)
+                    mtime = self.directory_mtime(path)
+                    files, compacted, _ = scan_directory(path)
+                    connection.executemany(
+                        _INSERT_FILE,
+                        file_rows(dataset, partition, path, files, compacted, True),
+                    )
+                    connection.execute(
+                        "INSERT INTO directories (dataset, partition, mtime_ns,"
+                        " settled) VALUES (?, ?, ?, ?)",
+                        (dataset, partition, mtime, self.settled(mtime)),
+                    )
+                    if files or compacted:
+                        counts[name] = counts.get(name, 0) + len(files) + len(compacted)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return counts
+
+
+_catalogs: Dict[str, Optional[DataLakeCatalog]] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[DataLakeCatalog]:
+    """Catalog of the data lake, at DATA_LAKE_CATALOG_FILE.
+
+    Returns:
+        Optional[DataLakeCatalog]: The catalog. None if disabled with
+            DATA_LAKE_CATALOG or if it cannot be opened, e.g. on a read only lake.
+    """
+    if not DATA_LAKE_CATALOG:
+        return None
+    db_file = DATA_LAKE_CATALOG_FILE
+    with _catalogs_lock:
+        if db_file not in _catalogs:
+            try:
+                _catalogs[db_file] = (
+                    DataLakeCatalog(db_file) if exists(dirname(db_file)) else None
+                )
+            except sqlite3.Error as e:
+                logger.warning(
+                    f"Unable to open the data lake catalog at '{db_file}', reading the"
+                    f" filesystem instead: {e}"
+                )
+                _catalogs[db_file] = None
+        return _catalogs[db_file]
+
+
+def find_dataset_files(directory: str, file_format: str, timestamp: str) -> List[str]:
+    """File paths of the dataset files of an execution in either layout, followed by
+    the compacted file holding the execution, from the catalog or from the filesystem
+    if there is no catalog.
+
+    Args:
+        directory (str): Directory of a dataset
+        file_format (str): File name format without extension, e.g. 'coins_pricing_{}'
+        timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+
+    Returns:
+        List[str]: File paths of the dataset files, one per storage format written
+    """
+    catalog = get_catalog()
+    if catalog is not None:
+        try:
+            return catalog.find(directory, file_format.split("{}")[0], timestamp)
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Data lake catalog lookup failed, reading the filesystem: {e}"
+            )
+    date = timestamp_date(timestamp)
+    files = [
+        join(file_directory, file_format.format(timestamp)) + extension
+        for file_directory in [directory, join(directory, partition_name(date))]
+        for extension in DATASET_EXTENSIONS
+    ]
+    files = [file_path for file_path in files if exists(file_path)]
+    compacted = compacted_file(directory, file_format, date)
+    if exists(compacted) and timestamp in compacted_timestamps(compacted):
+        files.append(compacted)
+    return files
+
+
+def list_dataset_files(directory: str, file_format: str) -> List[Tuple[str, str]]:
+    """Timestamp and file path of every execution of a dataset in either layout,
+    oldest first, from the catalog or from the filesystem if there is no catalog.
+    Executions merged into a compacted file are listed with the compacted file.
+
+    Args:
+        directory (str): Directory of a dataset
+        file_format (str): File name format without extension, e.g. 'coins_pricing_{}'
+
+    Returns:
+        List[Tuple[str, str]]: Timestamp and file path of each execution
+    """
+    name = file_format.split("{}")[0]
+    catalog = get_catalog()
+    if catalog is not None:
+        try:
+            return catalog.list(directory, name)
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Data lake catalog lookup failed, reading the filesystem: {e}"
+            )
+    executions, compacted_executions = [], []
+    _, _, partitions = scan_directory(directory)
+    for partition in [""] + partitions:
+        path = join(directory, partition)
+        files, compacted, _ = scan_directory(path)
+        executions += [
+            (timestamp, join(path, file_name))
+            for file_name, (file_prefix, timestamp) in files.items()
+            if file_prefix == name
+        ]
+        for file_name, (file_prefix, _) in compacted.items():
+            if file_prefix == name:
+                compacted_executions += [
+                    (timestamp, join(path, file_name))
+                    for timestamp in compacted_timestamps(join(path, file_name))
+                ]
+    own_file = {timestamp for timestamp, _ in executions}
+    return sorted(
+        executions
+        + [
+            execution
+            for execution in compacted_executions
+            if execution[0] not in own_file
+        ]
+    )
+
+
+def dataset_exists(file_path: str) -> bool:
+    """Whether a complete dataset file exists, or its execution was compacted, from
+    the catalog or from the filesystem if there is no catalog.
+
+    Args:
+        file_path (str): Dataset file
+
+    Returns:
+        bool: True if the file exists or its execution is in a compacted file
+    """
+    parsed = parse_dataset_file_name(basename(file_path))
+    if parsed is None:
+        return exists(file_path)
+    name, timestamp = parsed
+    directory = split_partition(dirname(file_path))[0]
+    return any(
+        found == file_path or is_compacted_file(found)
+        for found in find_dataset_files(directory, name + "{}", timestamp)
+    )
+
+
+def locate_dataset(file_path: str) -> Tuple[str, Optional[str]]:
+    """Where to read a dataset file from. A dataset file merged into a compacted file
+    is read from the compacted file, keeping only the rows of its execution.
+
+    Args:
+        file_path (str): Dataset file
+
+    Returns:
+        Tuple[str, Optional[str]]: File to read, and the execution timestamp of the
+            rows to keep if it is a compacted file
+    """
+    parsed = parse_dataset_file_name(basename(file_path))
+    if parsed is None or exists(file_path):
+        return file_path, None
+    name, timestamp = parsed
+    directory = split_partition(dirname(file_path))[0]
+    found = find_dataset_files(directory, name + "{}", timestamp)
+    if found and is_compacted_file(found[-1]):
+        return found[-1], timestamp
+    return file_path, None
+
+
+class CatalogWrite:
+
+    def __init__(self, file_path: str):
+        """Records a dataset file in the catalog of its data lake while it is written.
+        Catalog failures are logged, never failing the write itself.
+
+        Args:
+            file_path (str): Dataset file being written
+        """
+        self.file_path = file_path
+        self.catalog = get_catalog()
+        self.mtime_before = self._call("start_write")
+
+    def _call(self, method: str, *args) -> Optional[int]:
+        if self.catalog is None:
+            return None
+        try:
+            return getattr(self.catalog, method)(self.file_path, *args)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(
+                f"Unable to record '{self.file_path}' in the data lake catalog: {e}"
+            )
+            return None
+
+    def complete(self, row_count: int) -> None:
+        self._call("complete_write", row_count, self.mtime_before)
+
+    def discard(self) -> None:
+        self._call("discard_write")
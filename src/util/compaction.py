@@ -0,0 +1,185 @@
+"""Compaction of the per execution files of a dataset into a parquet file per day.
+
+Every execution writes a small file per dataset, so a lake that has been running for
+a while holds thousands of them. Compacting merges the files of a day into a single
+file in the partition of the day, with a column holding the execution timestamp of
+every row. Executions are still looked up by their timestamp through the data lake
+catalog, and read back from the compacted file with only their own rows.
+"""
+
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from src.util.catalog import get_catalog, list_dataset_files
+from src.util.config import (
+    COMPACTION_TIMESTAMP_COLUMN,
+    DATASET_LOCATIONS,
+    LOGGER_NAME,
+)
+from src.util.dataframe_ops import read_compacted_dataset, read_dataset
+from src.util.exceptions import DatasetSchemaMismatchException
+from src.util.partitions import compacted_file, is_compacted_file, timestamp_date
+from src.util.schemas import DATASET_DTYPES
+from src.util.storage import ParquetStorageFormat
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def compacted_schema(
+    file_paths: List[str], dtypes: Optional[Dict[str, str]] = None
+) -> "pa.Schema":
+    """Columns and types of a compacted file, unified from the files merged into it,
+    so a column without values in the first file merged still keeps the values of
+    later files. Parquet files only have their footer read, other files are read in
+    full with their declared types.
+
+    Args:
+        file_paths (List[str]): Files merged into the compacted file
+        dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+            Defaults to None.
+
+    Raises:
+        DatasetSchemaMismatchException: The types of a column can not be unified,
+            e.g. numbers in one file and text in another
+
+    Returns:
+        pa.Schema: Schema of the compacted file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schemas = []
+    for file_path in file_paths:
+        if file_path.endswith(".parquet"):
+            schemas.append(pq.read_schema(file_path).remove_metadata())
+            continue
+        df = read_dataset(file_path, dtypes=dtypes)
+        if not df.empty:
+            schemas.append(
+                pa.Schema.from_pandas(df, preserve_index=False).remove_metadata()
+            )
+    if not schemas:
+        # only executions without any rows, nothing is compacted
+        return pa.schema([(COMPACTION_TIMESTAMP_COLUMN, pa.string())])
+    try:
+        # e.g. an integer column in one file and a float column in another
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise DatasetSchemaMismatchException(
+            f"Unable to compact {file_paths}, the types of their columns conflict: {e}"
+        ) from e
+    if COMPACTION_TIMESTAMP_COLUMN not in schema.names:
+        schema = schema.append(pa.field(COMPACTION_TIMESTAMP_COLUMN, pa.string()))
+    return schema
+
+
+def compact_partition(
+    directory: str,
+    file_format: str,
+    date: str,
+    executions: List[Tuple[str, str]],
+    dtypes: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """Merge the files of the executions of a day into the compacted file of the day,
+    along with any executions already in it. Files of an execution take precedence
+    over the compacted file, so an execution re-run after compaction is compacted
+    again. Executions without any rows are left in their own file, as a compacted
+    file only knows of executions through their rows.
+
+    The compacted file is written to a temp file first, recorded in the catalog and
+    only then are the merged files removed, so executions are never missing.
+
+    Args:
+        directory (str): Directory of the dataset
+        file_format (str): File name format without extension, e.g. 'coins_pricing_{}'
+        date (str): Day of the executions in YYYY-MM-DD
+        executions (List[Tuple[str, str]]): Timestamp and file path of each execution
+            of the day, see src.util.catalog.list_dataset_files
+        dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+            Defaults to None.
+
+    Returns:
+        List[str]: Files merged into the compacted file, which have been removed
+    """
+    file_path = compacted_file(directory, file_format, date)
+    dtypes = {**(dtypes or {}), COMPACTION_TIMESTAMP_COLUMN: "object"}
+    merged_files = []
+    compacted_dfs = {}
+    if os.path.exists(file_path):
+        compacted_dfs = read_compacted_dataset(file_path)
+
+    schema = compacted_schema(
+        sorted({execution_file for _, execution_file in executions}), dtypes
+    )
+    writer = ParquetStorageFormat().open_writer(file_path, dtypes, schema)
+    try:
+        for timestamp, execution_file in executions:
+            if is_compacted_file(execution_file):
+                df = compacted_dfs[timestamp]
+            else:
+                df = read_dataset(execution_file)
+                if df.empty:
+                    continue
+                merged_files.append(execution_file)
+            writer.write(df.assign(**{COMPACTION_TIMESTAMP_COLUMN: timestamp}))
+    except BaseException:
+        writer.discard()
+        raise
+    if writer.row_count == 0:
+        writer.discard()
+        return []
+    writer.close()
+
+    catalog = get_catalog()
+    if catalog is not None:
+        catalog.record_compaction(file_path, merged_files)
+    for merged_file in merged_files:
+        os.remove(merged_file)
+    return merged_files
+
+
+def compact_dataset(dataset: str, before: Optional[str] = None) -> Dict[str, int]:
+    """Compact the executions of every day of a dataset before a given day. The
+    current day is never compacted by default, as executions are still being written
+    to it.
+
+    Args:
+        dataset (str): Name of the dataset, one of DATASET_LOCATIONS
+        before (Optional[str], optional): Only compact days before this day in
+            YYYY-MM-DD. Defaults to the current UTC day.
+
+    Returns:
+        Dict[str, int]: Number of files merged per day
+    """
+    directory, file_format = DATASET_LOCATIONS[dataset]
+    if before is None:
+        before = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    days = defaultdict(list)
+    for timestamp, file_path in list_dataset_files(directory, file_format):
+        if timestamp_date(timestamp) < before:
+            days[timestamp_date(timestamp)].append((timestamp, file_path))
+
+    merged = {}
+    for date, executions in sorted(days.items()):
+        # days already compacted are only rewritten once new files are found
+        if all(is_compacted_file(file_path) for _, file_path in executions):
+            continue
+        merged_files = compact_partition(
+            directory, file_format, date, executions, DATASET_DTYPES.get(dataset)
+        )
+        # e.g. a day of executions without any rows
+        if not merged_files:
+            continue
+        logger.info(
+            f"Compacted {len(merged_files)} files of '{dataset}' on {date} into"
+            f" '{compacted_file(directory, file_format, date)}'"
+        )
+        merged[date] = len(merged_files)
+    return merged
@@ -1,40 +1,277 @@
 from os import getenv
 from os.path import dirname, join
+from tempfile import gettempdir
 
 TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
 LOGGER_NAME = "crypto_tracker_logger"
 
+# Max number of workflow steps that run at the same time, once their inputs are ready
+WORKFLOW_MAX_WORKERS = int(getenv("WORKFLOW_MAX_WORKERS", "4"))
+# Seconds between the scheduled executions of the daemon. Executions start on
+# multiples of the interval in UTC, e.g. every 5 minutes on the 5 minute mark.
+DAEMON_INTERVAL_SECONDS = float(getenv("DAEMON_INTERVAL_SECONDS", "300"))
+
+# DATASET NAMES
+AVG_BITCOIN_DIFF_DATASET = "avg_bitcoin_diff"
+BITCOIN_COMPARISON_DATASET = "bitcoin_comparison"
+LISTINGS_DATASET = "listings"
+PRICING_DATASET = "pricing"
+QUOTES_DATASET = "quotes"
+UNIVERSE_DATASET = "universe"
+
+# DATASET STORAGE FORMATS
+#
+# Storage format new files of each dataset are written in, either "csv" or "parquet".
+# The wide, raw bronze datasets default to compressed columnar parquet files. The
+# small silver and gold datasets default to csv so they are easy to open by hand.
+# Files are read in whichever format they were written in.
+DATASET_STORAGE_FORMATS = {
+    AVG_BITCOIN_DIFF_DATASET: getenv("AVG_BITCOIN_DIFF_STORAGE_FORMAT", "csv"),
+    BITCOIN_COMPARISON_DATASET: getenv("BITCOIN_COMPARISON_STORAGE_FORMAT", "csv"),
+    LISTINGS_DATASET: getenv("LISTINGS_STORAGE_FORMAT", "parquet"),
+    PRICING_DATASET: getenv("PRICING_STORAGE_FORMAT", "csv"),
+    QUOTES_DATASET: getenv("QUOTES_STORAGE_FORMAT", "parquet"),
+    UNIVERSE_DATASET: getenv("UNIVERSE_STORAGE_FORMAT", "parquet"),
+}
+# Compression codec for parquet files, "none" to write uncompressed files
+PARQUET_COMPRESSION = getenv("PARQUET_COMPRESSION", "zstd")
+if PARQUET_COMPRESSION.lower() == "none":
+    PARQUET_COMPRESSION = None
+
 # DATASET LOCATIONS
 #
 # In a more complicated system this could be moved to a configuration file
 # that may or may not be shared across different systems. Keeping in a constants
 # file for now, as this will change between computers.
+#
+# File formats leave out the extension, which comes from the storage format.
+
+DATA_LAKE_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake")
 
 AVG_BITCOIN_DIFF_DATA_LOCATION = join(
     dirname(dirname(dirname(__file__))), "data_lake/avg_bitcoin_diff"
 )
-AVG_BITCOIN_DIFF_CSV_FORMAT = "avg_bitcoin_diff_{}.csv"
+AVG_BITCOIN_DIFF_FILE_FORMAT = "avg_bitcoin_diff_{}"
+
+# Running sum and count per symbol across all executions
+AVG_BITCOIN_DIFF_STATE_LOCATION = join(
+    dirname(dirname(dirname(__file__))), "data_lake/avg_bitcoin_diff_state"
+)
+AVG_BITCOIN_DIFF_STATE_FILE_NAME = "avg_bitcoin_diff_state.json"
+# Hours before the latest applied execution that executions are still tracked one by
+# one. Older executions (e.g. re-run with --timestamp days later) are not applied to
+# the running totals, and need the averages to be rebuilt.
+AVG_BITCOIN_DIFF_REORDER_WINDOW_HOURS = float(
+    getenv("AVG_BITCOIN_DIFF_REORDER_WINDOW_HOURS", "48")
+)
 
 
 BITCOIN_COMPARISON_DATA_LOCATION = join(
     dirname(dirname(dirname(__file__))), "data_lake/bitcoin_comparison"
 )
-BITCOIN_COMPARISON_CSV_FORMAT = "bitcoin_comparison_{}.csv"
+BITCOIN_COMPARISON_FILE_FORMAT = "bitcoin_comparison_{}"
 
 COINS_TO_TRACK_DATA_LOCATION = join(
     dirname(dirname(dirname(__file__))), "data_lake/configuration"
 )
 COINS_TO_TRACK_CSV_NAME = "coins_to_track.csv"
 
+METADATA_CACHE_LOCATION = join(
+    dirname(dirname(dirname(__file__))), "data_lake/metadata_cache"
+)
+METADATA_CACHE_FILE_NAME = "metadata_cache.json"
+
 LISTINGS_DATA_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake/listings")
-LISTINGS_CSV_FORMAT = "crypto_listings_{}.csv"
+LISTINGS_FILE_FORMAT = "crypto_listings_{}"
 
 PRICING_DATA_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake/pricing")
-PRICING_CSV_FORMAT = "coins_pricing_{}.csv"
+PRICING_FILE_FORMAT = "coins_pricing_{}"
+
+QUOTES_DATA_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake/quotes")
+QUOTES_FILE_FORMAT = "crypto_quotes_{}"
 
 UNIVERSE_DATA_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake/universe")
-UNIVERSE_CSV_FORMAT = "crypto_universe_{}.csv"
+UNIVERSE_FILE_FORMAT = "crypto_universe_{}"
+
+# Completed metadata batches are checkpointed here, per execution timestamp, until
+# the universe dataset has been written
+UNIVERSE_CHECKPOINT_LOCATION = join(
+    dirname(dirname(dirname(__file__))), "data_lake/universe_checkpoints"
+)
+
+# Directory and file name format of every dataset, for jobs over the whole lake
+DATASET_LOCATIONS = {
+    AVG_BITCOIN_DIFF_DATASET: (
+        AVG_BITCOIN_DIFF_DATA_LOCATION,
+        AVG_BITCOIN_DIFF_FILE_FORMAT,
+    ),
+    BITCOIN_COMPARISON_DATASET: (
+        BITCOIN_COMPARISON_DATA_LOCATION,
+        BITCOIN_COMPARISON_FILE_FORMAT,
+    ),
+    LISTINGS_DATASET: (LISTINGS_DATA_LOCATION, LISTINGS_FILE_FORMAT),
+    PRICING_DATASET: (PRICING_DATA_LOCATION, PRICING_FILE_FORMAT),
+    QUOTES_DATASET: (QUOTES_DATA_LOCATION, QUOTES_FILE_FORMAT),
+    UNIVERSE_DATASET: (UNIVERSE_DATA_LOCATION, UNIVERSE_FILE_FORMAT),
+}
+
+# DATA LAKE LAYOUT
+#
+# "partitioned" writes the files of every execution into a directory per UTC day
+# within the dataset directory, e.g. 'pricing/date=2025-01-16/', "flat" writes them
+# straight into the dataset directory. Files are found in either layout, so the
+# layout of an existing lake can be changed at any time.
+DATA_LAKE_LAYOUT_FLAT = "flat"
+DATA_LAKE_LAYOUT_PARTITIONED = "partitioned"
+DATA_LAKE_LAYOUTS = [DATA_LAKE_LAYOUT_FLAT, DATA_LAKE_LAYOUT_PARTITIONED]
+DATA_LAKE_LAYOUT = getenv("DATA_LAKE_LAYOUT", DATA_LAKE_LAYOUT_PARTITIONED)
+# Directory of the partition of a UTC day, formatted with the date in YYYY-MM-DD
+PARTITION_DIRECTORY_FORMAT = "date={}"
+# Compaction merges the files of every execution of a day into a single parquet file
+# in the partition of the day, named with the date instead of the timestamp, e.g.
+# 'coins_pricing_2025-01-16.parquet'. Rows keep their execution timestamp in this
+# column.
+COMPACTION_TIMESTAMP_COLUMN = "execution_timestamp"
+
+# PRICING MODES
+#
+# "listings" prices the tracked coins from the full listings of every active coin.
+# "quotes" only requests quotes for the tracked coins and Bitcoin in a single request,
+# skipping the listings and universe datasets. Much faster and cheaper in API credits,
+# so the gold datasets can be refreshed often while full listings run less often.
+PRICING_MODE_LISTINGS = "listings"
+PRICING_MODE_QUOTES = "quotes"
+PRICING_MODES = [PRICING_MODE_LISTINGS, PRICING_MODE_QUOTES]
+PRICING_MODE = getenv("PRICING_MODE", PRICING_MODE_LISTINGS)
+
+# METADATA CACHE SETTINGS
+#
+# Coin metadata rarely changes. Cached metadata is reused for this many hours before
+# being re-fetched from the API.
+METADATA_CACHE_TTL_HOURS = float(getenv("METADATA_CACHE_TTL_HOURS", "24"))
+# Whether the Universe step only fetches metadata for new or expired IDs
+UNIVERSE_INCREMENTAL = getenv("UNIVERSE_INCREMENTAL", "true").lower() == "true"
+
+# UNIVERSE SNAPSHOTS
+#
+# Almost none of the coin metadata changes between executions, so the universe of an
+# execution is stored as the coins added, changed or removed since the previous
+# execution, with a full snapshot every UNIVERSE_SNAPSHOT_INTERVAL executions. The
+# full universe of an execution is rebuilt from the snapshot before it and the
+# changes since. Set UNIVERSE_DELTAS to false to store every universe in full.
+UNIVERSE_DELTAS = getenv("UNIVERSE_DELTAS", "true").lower() == "true"
+UNIVERSE_SNAPSHOT_INTERVAL = int(getenv("UNIVERSE_SNAPSHOT_INTERVAL", "48"))
+# Column holding whether a row is part of a snapshot, or an added / changed or
+# removed coin
+UNIVERSE_CHANGE_COLUMN = "universe_change"
+# Column holding the execution the changes were found against, which is not always
+# the execution stored before them, e.g. after an older execution is re-run
+UNIVERSE_BASE_COLUMN = "universe_base"
 
 # API INFORMATION
 COIN_MARKET_CAP_HOST = getenv("COIN_MARKET_CAP_HOST")
 COIN_MARKET_CAP_ACCESS_KEY = getenv("COIN_MARKET_CAP_ACCESS_KEY")
+
+# API CONNECTION SETTINGS
+#
+# Number of pooled keep-alive connections held open to the CMC host. Should be at
+# least as large as the number of concurrent requests made against the API.
+CMC_POOL_SIZE = int(getenv("CMC_POOL_SIZE", "10"))
+# Seconds to wait for a connection / response before giving up on a request
+CMC_REQUEST_TIMEOUT = float(getenv("CMC_REQUEST_TIMEOUT", "30"))
+
+# API RATE LIMITING
+#
+# Requests per minute allowed by the CMC plan (Basic plan is 30). All requests made
+# by a client draw from a token bucket refilled at this rate.
+CMC_REQUESTS_PER_MINUTE = float(getenv("CMC_REQUESTS_PER_MINUTE", "30"))
+# Largest burst of requests the token bucket allows
+CMC_RATE_LIMIT_BURST = float(getenv("CMC_RATE_LIMIT_BURST", "1"))
+# Whether the token bucket is shared by every process on the host, so workflows
+# running at the same time stay within the plan rate together. The bucket is kept in
+# a SQLite database all processes draw tokens from.
+CMC_SHARED_RATE_LIMIT = getenv("CMC_SHARED_RATE_LIMIT", "false").lower() == "true"
+CMC_RATE_LIMIT_DB = getenv(
+    "CMC_RATE_LIMIT_DB", join(gettempdir(), "crypto_tracker_rate_limit.sqlite3")
+)
+# Number of workers used when fetching batches concurrently
+CMC_MAX_WORKERS = int(getenv("CMC_MAX_WORKERS", "4"))
+# Whether pages of listings and batches of metadata are fetched concurrently or
+# one at a time
+CMC_CONCURRENT_FETCH = getenv("CMC_CONCURRENT_FETCH", "true").lower() == "true"
+# Whether only the optional listing fields read by later steps are requested from the
+# API, instead of the full default payload
+LISTINGS_SELECT_FIELDS = getenv("LISTINGS_SELECT_FIELDS", "true").lower() == "true"
+# Whether listings are written to the data lake page by page as they arrive, so only
+# a single page is held in memory. Pages are fetched one at a time when streaming.
+LISTINGS_STREAMING = getenv("LISTINGS_STREAMING", "false").lower() == "true"
+
+# API RETRIES
+#
+# Max number of attempts of a request that fails with a retryable error (429, 5xx,
+# connection errors and timeouts). Other errors, e.g. 401, fail straight away.
+CMC_RETRY_MAX_ATTEMPTS = int(getenv("CMC_RETRY_MAX_ATTEMPTS", "5"))
+# Seconds waited before the first retry, doubling on every retry up to the max delay.
+# A 429 waits exactly as long as its 'Retry-After' header asks instead.
+CMC_RETRY_BASE_DELAY = float(getenv("CMC_RETRY_BASE_DELAY", "2"))
+CMC_RETRY_MAX_DELAY = float(getenv("CMC_RETRY_MAX_DELAY", "60"))
+# Consecutive failed requests (5xx, connection errors and timeouts) before the circuit
+# opens and requests fail fast, and seconds before a trial request is let through
+CMC_CIRCUIT_FAILURE_THRESHOLD = int(getenv("CMC_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CMC_CIRCUIT_RESET_SECONDS = float(getenv("CMC_CIRCUIT_RESET_SECONDS", "60"))
+
+# API CREDITS
+#
+# Credits the CMC plan allows per month (Basic plan is 10,000). Requests are refused
+# once the credits used this month reach the budget. Unset for no budget, credits are
+# still tracked.
+CMC_MONTHLY_CREDIT_BUDGET = (
+    int(getenv("CMC_MONTHLY_CREDIT_BUDGET"))
+    if getenv("CMC_MONTHLY_CREDIT_BUDGET")
+    else None
+)
+# Credits used per month, from the 'credit_count' of every response. A SQLite database
+# shared by every process on the host.
+CMC_CREDIT_LEDGER_LOCATION = join(
+    dirname(dirname(dirname(__file__))), "data_lake/api_credits"
+)
+CMC_CREDIT_LEDGER_FILE_NAME = "credit_ledger.sqlite3"
+
+# DATA LAKE CATALOG
+#
+# SQLite index of the dataset files of a data lake, kept at the root of the lake by
+# default, so steps find files without listing dataset directories. Set to false to
+# always look at the filesystem.
+DATA_LAKE_CATALOG = getenv("DATA_LAKE_CATALOG", "true").lower() == "true"
+DATA_LAKE_CATALOG_FILE = getenv(
+    "DATA_LAKE_CATALOG_FILE", join(DATA_LAKE_LOCATION, "catalog.sqlite3")
+)
+
+# RUN REPORTS
+#
+# Structured report of the metrics of every step, written after every execution
+RUN_REPORT_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake/run_reports")
+RUN_REPORT_FILE_FORMAT = "run_report_{}.json"
+# Prometheus textfile the metrics of the latest execution are also written to, e.g.
+# in the textfile collector directory of node_exporter. Unset to not write metrics.
+METRICS_TEXTFILE = getenv("METRICS_TEXTFILE")
+
+# PROFILING
+#
+# Profiles of the steps of an execution run with '--profile', one directory per
+# execution timestamp
+PROFILE_LOCATION = join(dirname(dirname(dirname(__file__))), "data_lake/profiles")
+# Seconds between the stack samples collapsed into flamegraph input
+PROFILE_SAMPLE_INTERVAL = float(getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# Number of functions and allocation sites listed in the profile summaries
+PROFILE_TOP_ENTRIES = 30
+
+# API RECORDINGS
+#
+# Whether every successful API response is recorded, so it can be replayed later by
+# the stand-in CMC server (src.api.stand_in_server) without network access
+CMC_RECORD_RESPONSES = getenv("CMC_RECORD_RESPONSES", "false").lower() == "true"
+CMC_RECORDINGS_LOCATION = getenv(
+    "CMC_RECORDINGS_LOCATION",
+    join(dirname(dirname(dirname(__file__))), "data_lake/api_recordings"),
+)
@@ -1,8 +1,13 @@
 import logging
+import os
+from typing import Dict, List, Optional
 
 import pandas as pd
 
-from src.util.config import LOGGER_NAME
+from src.util.catalog import CatalogWrite, locate_dataset
+from src.util.config import COMPACTION_TIMESTAMP_COLUMN, LOGGER_NAME
+from src.util.metrics import record
+from src.util.storage import DatasetWriter, Filters, storage_format_for_path
 
 logger = logging.getLogger(LOGGER_NAME)
 
@@ -21,12 +26,14 @@ def read_csv(file_path: str) -> pd.DataFrame:
         pd.DataFrame: DataFrame representation of the dataset
     """
     try:
-        return pd.read_csv(file_path)
+        df = pd.read_csv(file_path)
     except Exception as e:
         logger.error(
             f"ERROR reading dataset at '{file_path}'. Fix input location and re-run process."
         )
         raise e
+    record(rows_in=len(df), bytes_read=os.path.getsize(file_path))
+    return df
 
 
 def write_csv(file_path: str, dataframe: pd.DataFrame) -> None:
@@ -47,3 +54,128 @@ def write_csv(file_path: str, dataframe: pd.DataFrame) -> None:
             f"ERROR writing dataset to file path '{file_path}'. Fix output location and re-run process."
         )
         raise e
+    record(rows_out=len(dataframe), bytes_written=os.path.getsize(file_path))
+
+
+def read_dataset(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+    dtypes: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """Helper function to read a dataset in the storage format matching its file
+    extension, or log out the error to end user in the case of an error.
+
+    Column projection and row filters are pushed down into the storage format where
+    it supports them. A dataset merged into a compacted file is read from the
+    compacted file, keeping only the rows of its execution.
+
+    Args:
+        file_path (str): File path of a dataset to read
+        columns (Optional[List[str]], optional): Only read these columns. Defaults to None.
+        filters (Optional[Filters], optional): Only read rows matching these filters.
+            Defaults to None.
+        dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+            Defaults to None.
+
+    Raises:
+        e: Exception from an attempt to read the dataset
+
+    Returns:
+        pd.DataFrame: DataFrame representation of the dataset
+    """
+    source, timestamp = locate_dataset(file_path)
+    if timestamp is not None:
+        filters = list(filters or []) + [(COMPACTION_TIMESTAMP_COLUMN, "==", timestamp)]
+    try:
+        df = storage_format_for_path(source).read(
+            source, columns=columns, filters=filters, dtypes=dtypes
+        )
+    except Exception as e:
+        logger.error(
+            f"ERROR reading dataset at '{file_path}'. Fix input location and re-run process."
+        )
+        raise e
+    if timestamp is not None:
+        df = df.drop(columns=[COMPACTION_TIMESTAMP_COLUMN], errors="ignore")
+    # bytes read is the size of the dataset file, less is read when pushing down
+    record(rows_in=len(df), bytes_read=os.path.getsize(source))
+    return df
+
+
+def read_compacted_dataset(
+    file_path: str, dtypes: Optional[Dict[str, str]] = None
+) -> Dict[str, pd.DataFrame]:
+    """Helper function to read every execution held in a compacted file at once, or
+    log out the error to end user in the case of an error.
+
+    Args:
+        file_path (str): File path of a compacted file
+        dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+            Defaults to None.
+
+    Raises:
+        e: Exception from an attempt to read the dataset
+
+    Returns:
+        Dict[str, pd.DataFrame]: DataFrame of each execution, by execution timestamp
+    """
+    try:
+        df = storage_format_for_path(file_path).read(file_path, dtypes=dtypes)
+    except Exception as e:
+        logger.error(
+            f"ERROR reading dataset at '{file_path}'. Fix input location and re-run process."
+        )
+        raise e
+    record(rows_in=len(df), bytes_read=os.path.getsize(file_path))
+    return {
+        timestamp: execution_df.drop(columns=[COMPACTION_TIMESTAMP_COLUMN]).reset_index(
+            drop=True
+        )
+        for timestamp, execution_df in df.groupby(
+            COMPACTION_TIMESTAMP_COLUMN, sort=True
+        )
+    }
+
+
+def write_dataset(file_path: str, dataframe: pd.DataFrame) -> None:
+    """Helper function to write a dataframe in the storage format matching the file
+    extension, or log out the error to the end user in the case of an error.
+
+    Args:
+        file_path (str): File to write the dataset to
+        dataframe (pd.DataFrame): DataFrame to write out
+
+    Raises:
+        e: Exception from an attempt to write the dataset
+    """
+    # partitions are created as the first file of a day is written
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    catalog_write = CatalogWrite(file_path)
+    try:
+        storage_format_for_path(file_path).write(file_path, dataframe)
+    except Exception as e:
+        catalog_write.discard()
+        logger.error(
+            f"ERROR writing dataset to file path '{file_path}'. Fix output location and re-run process."
+        )
+        raise e
+    catalog_write.complete(len(dataframe))
+    record(rows_out=len(dataframe), bytes_written=os.path.getsize(file_path))
+
+
+def open_dataset_writer(
+    file_path: str, dtypes: Optional[Dict[str, str]] = None
+) -> DatasetWriter:
+    """Helper function to open a writer that appends to a dataset one chunk at a time,
+    in the storage format matching the file extension.
+
+    Args:
+        file_path (str): File to write the dataset to
+        dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+            Defaults to None.
+
+    Returns:
+        DatasetWriter: Writer of the dataset, to be used as a context manager
+    """
+    return storage_format_for_path(file_path).open_writer(file_path, dtypes)
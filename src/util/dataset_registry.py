@@ -0,0 +1,105 @@
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.util.dataframe_ops import read_dataset, write_dataset
+from src.util.metrics import record
+from src.util.storage import Filters, apply_filters
+
+
+class DatasetRegistry:
+
+    def __init__(self):
+        """Run scoped registry of the datasets produced by workflow steps, keyed by
+        the file path of the dataset.
+
+        Datasets written through the registry are kept in memory and handed to later
+        steps that read them, so the data lake is only read for datasets that were
+        not produced during this run (e.g. when resuming with '--timestamp').
+        """
+        self._datasets: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+        # one lock per file path, so concurrent steps never parse the same file twice
+        self._path_locks: Dict[str, threading.Lock] = {}
+
+    def _path_lock(self, file_path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(file_path, threading.Lock())
+
+    def get(self, file_path: str) -> Optional[pd.DataFrame]:
+        """Get a dataset if it is held in memory, without reading from the data lake.
+
+        Args:
+            file_path (str): File path of the dataset
+
+        Returns:
+            Optional[pd.DataFrame]: DataFrame of the dataset. None if not in memory.
+        """
+        with self._lock:
+            df = self._datasets.get(file_path)
+        # shallow copy so callers adding columns never change the registered dataset
+        return None if df is None else df.copy(deep=False)
+
+    def put(self, file_path: str, dataframe: pd.DataFrame) -> None:
+        """Hold a dataset in memory for later steps.
+
+        Args:
+            file_path (str): File path of the dataset
+            dataframe (pd.DataFrame): DataFrame of the dataset
+        """
+        with self._lock:
+            self._datasets[file_path] = dataframe
+
+    def read(
+        self,
+        file_path: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """Read a dataset, from memory if it was produced during this run, otherwise
+        from the data lake.
+
+        Datasets read in full from the data lake are kept in memory for any later
+        steps. Reads of only some columns or rows are pushed down into the storage
+        format instead, and are not kept in memory.
+
+        Args:
+            file_path (str): File path of the dataset
+            columns (Optional[List[str]], optional): Only read these columns. Defaults to None.
+            filters (Optional[Filters], optional): Only read rows matching these filters.
+                Defaults to None.
+            dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+                Defaults to None.
+
+        Returns:
+            pd.DataFrame: DataFrame of the dataset
+        """
+        if columns is not None or filters:
+            df = self.get(file_path)
+            if df is None:
+                return read_dataset(file_path, columns, filters, dtypes)
+            df = apply_filters(df, filters)
+            # rows handed over from memory still count as read by the step
+            record(rows_in=len(df))
+            return df if columns is None else df[columns]
+
+        with self._path_lock(file_path):
+            df = self.get(file_path)
+            if df is None:
+                self.put(file_path, read_dataset(file_path, dtypes=dtypes))
+                df = self.get(file_path)
+            else:
+                record(rows_in=len(df))
+        return df
+
+    def write(self, file_path: str, dataframe: pd.DataFrame) -> None:
+        """Write a dataset to the data lake and hold it in memory for later steps.
+
+        Args:
+            file_path (str): File path to write the dataset to
+            dataframe (pd.DataFrame): DataFrame of the dataset
+        """
+        write_dataset(file_path, dataframe)
+        self.put(file_path, dataframe)
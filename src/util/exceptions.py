@@ -4,3 +4,43 @@ class InvalidSymbolException(Exception):
 
 class InvalidTimestampException(Exception):
     pass
+
+
+class InvalidStorageFormatException(Exception):
+    pass
+
+
+class InvalidPricingModeException(Exception):
+    pass
+
+
+class InvalidDataLakeLayoutException(Exception):
+    pass
+
+
+class DatasetSchemaMismatchException(Exception):
+    pass
+
+
+class MissingUniverseBaseException(Exception):
+    pass
+
+
+class WorkflowDefinitionException(Exception):
+    pass
+
+
+class RateLimitedException(Exception):
+    def __init__(self, msg: str, retry_after: float):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class CircuitOpenException(Exception):
+    def __init__(self, msg: str, retry_after: float):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class CreditBudgetExceededException(Exception):
+    pass
@@ -0,0 +1,39 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(lock_file: str) -> Iterator[None]:
+    """Hold an exclusive lock on a file for the duration of the block, blocking until
+    any other process holding it lets go. Used to read, update and write back a file
+    shared between processes without losing the updates of the others.
+
+    The lock is released by the OS if the process dies, so a crash never leaves it
+    held. Locks are per open file, so holding the same lock twice from one process
+    blocks, the same as from two processes.
+
+    Args:
+        lock_file (str): Location of the lock file, created if missing
+    """
+    os.makedirs(os.path.dirname(lock_file) or ".", exist_ok=True)
+    with open(lock_file, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
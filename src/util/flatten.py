@@ -0,0 +1,91 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+from src.util.config import LOGGER_NAME
+from src.util.schemas import LIST_FIELD
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Nested field names to the column of each leaf, e.g. {"quote": {"USD": {"price":
+# "quote.USD.price"}}}
+FieldTree = Dict[str, Union[str, "FieldTree"]]
+
+
+def build_field_tree(fields: Dict[str, str]) -> FieldTree:
+    """Arrange declared columns by their nested field names, so each nested object of
+    a record is only looked up once.
+
+    Args:
+        fields (Dict[str, str]): Declared type of each column, nested fields joined
+            with '.' e.g. 'quote.USD.price'
+
+    Returns:
+        FieldTree: Nested field names to the column of each leaf
+    """
+    tree: FieldTree = {}
+    for column in fields:
+        *parents, leaf = column.split(".")
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = column
+    return tree
+
+
+def _collect(
+    tree: FieldTree, records: List[Optional[Dict]], values: Dict[str, List]
+) -> None:
+    # Each nested object is pulled out of every record once, and its own fields are
+    # collected from that list, so the records are never walked per leaf column
+    for key, child in tree.items():
+        column = [
+            record.get(key) if isinstance(record, dict) else None for record in records
+        ]
+        if isinstance(child, str):
+            values[child] = column
+        else:
+            _collect(child, column, values)
+
+
+def _build_column(column: str, values: List, dtype: str) -> pd.Series:
+    if dtype == LIST_FIELD:
+        return pd.Series(
+            [value if isinstance(value, list) else [] for value in values],
+            dtype="object",
+        )
+    try:
+        return pd.Series(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # e.g. a missing value in an integer column, keep whatever type fits
+        logger.debug(f"Column '{column}' does not fit type {dtype}, inferring type")
+        return pd.Series(values)
+
+
+def flatten_records(records: List[Dict], fields: Dict[str, str]) -> pd.DataFrame:
+    """Flatten nested JSON records into a DataFrame of only the declared columns.
+
+    Replaces pd.json_normalize for API responses with a known layout. Values are
+    collected straight into one list per column, and each column is built with its
+    declared type. Fields that are not declared are never visited, and missing fields
+    are left empty.
+
+    Args:
+        records (List[Dict]): Nested JSON records, e.g. listings from the API
+        fields (Dict[str, str]): Declared type of each column to keep, nested fields
+            joined with '.' e.g. {'id': 'int64', 'quote.USD.price': 'float64',
+            'tags': LIST_FIELD}
+
+    Returns:
+        pd.DataFrame: DataFrame with one column per declared field, in declared order
+    """
+    values: Dict[str, List] = {}
+    _collect(build_field_tree(fields), records, values)
+
+    return pd.DataFrame(
+        {
+            column: _build_column(column, values[column], dtype)
+            for column, dtype in fields.items()
+        }
+    )
@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import time
+from os.path import exists
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.util.config import LOGGER_NAME, METADATA_CACHE_TTL_HOURS
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class MetadataCache:
+
+    def __init__(self, cache_file: str, ttl_hours: float = METADATA_CACHE_TTL_HOURS):
+        """Persistent cache of CMC coin metadata keyed by CMC ID. Each entry records
+        when it was fetched so entries older than the TTL can be refreshed.
+
+        Stored as a single JSON file, loaded lazily on first use.
+
+        Args:
+            cache_file (str): Location of the JSON file backing the cache
+            ttl_hours (float, optional): Hours an entry stays fresh. Defaults to
+                METADATA_CACHE_TTL_HOURS.
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_hours * 60 * 60
+        self._entries: Optional[Dict[str, Dict]] = None
+        # version of the file last loaded or saved, see refresh
+        self.version: Optional[Tuple[int, int]] = None
+
+    @staticmethod
+    def key(cmc_id) -> str:
+        # IDs come from both JSON (int) and pandas (numpy int), normalize for lookup
+        return str(int(cmc_id))
+
+    @property
+    def entries(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = self.load()
+        return self._entries
+
+    def file_version(self) -> Optional[Tuple[int, int]]:
+        if not exists(self.cache_file):
+            return None
+        stat = os.stat(self.cache_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> None:
+        """Drop the entries held in memory if the file changed since it was last
+        loaded or saved, e.g. by an execution in another process. Lets a cache kept
+        in memory between executions skip reading the file every time.
+        """
+        if self._entries is not None and self.file_version() != self.version:
+            self._entries = None
+
+    def load(self) -> Dict[str, Dict]:
+        """Read the cache from disk. A missing or unreadable cache file is treated
+        as an empty cache, as everything can be re-fetched from the API.
+
+        Returns:
+            Dict[str, Dict]: Cache entries keyed by CMC ID
+        """
+        self.version = self.file_version()
+        if self.version is None:
+            return {}
+        try:
+            with open(self.cache_file, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            logger.warning(
+                f"Unable to read metadata cache at '{self.cache_file}'. Rebuilding cache from the API."
+            )
+            return {}
+
+    def save(self) -> None:
+        """Write the cache to disk. Writes to a temp file first so a failure part way
+        through never leaves a corrupt cache behind.
+        """
+        temp_file = f"{self.cache_file}.tmp"
+        with open(temp_file, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(temp_file, self.cache_file)
+        self.version = self.file_version()
+
+    def stale_ids(self, ids: Iterable, now: Optional[float] = None) -> List:
+        """Find the IDs that are not cached, or whose entry is older than the TTL.
+
+        Args:
+            ids (Iterable): CMC IDs to check
+            now (Optional[float], optional): Current epoch time. Defaults to time.time().
+
+        Returns:
+            List: IDs that need to be fetched from the API, in input order
+        """
+        now = time.time() if now is None else now
+        stale = []
+        for cmc_id in ids:
+            entry = self.entries.get(self.key(cmc_id))
+            if entry is None or now - entry["fetched_at"] > self.ttl_seconds:
+                stale.append(cmc_id)
+        return stale
+
+    def update(self, metadata_objs: List[Dict], now: Optional[float] = None) -> None:
+        """Add or refresh entries for metadata objects fetched from the API.
+
+        Args:
+            metadata_objs (List[Dict]): Metadata "data" objects from the API
+            now (Optional[float], optional): Current epoch time. Defaults to time.time().
+        """
+        now = time.time() if now is None else now
+        for metadata in metadata_objs:
+            self.entries[self.key(metadata["id"])] = {
+                "fetched_at": now,
+                "metadata": metadata,
+            }
+
+    def get_many(self, ids: Iterable) -> List[Dict]:
+        """Get the cached metadata for a collection of IDs. IDs that are not cached
+        are skipped, matching the API which leaves out IDs it has no metadata for.
+
+        Args:
+            ids (Iterable): CMC IDs to get metadata for
+
+        Returns:
+            List[Dict]: Metadata objects, in input order
+        """
+        metadata_objs = []
+        for cmc_id in ids:
+            entry = self.entries.get(self.key(cmc_id))
+            if entry is not None:
+                metadata_objs.append(entry["metadata"])
+        return metadata_objs
@@ -0,0 +1,256 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Counters kept for every step, in the order they are reported
+STEP_COUNTERS = [
+    "rows_in",
+    "rows_out",
+    "bytes_read",
+    "bytes_written",
+    "api_calls",
+    "retries",
+    "rate_limited",
+    "credits_used",
+]
+
+# Prefix of every metric in the Prometheus textfile
+PROMETHEUS_PREFIX = "crypto_tracker"
+
+
+class StepMetrics:
+
+    def __init__(self, name: str):
+        """Thread safe metrics of a single workflow step.
+
+        Args:
+            name (str): Name of the step, e.g. 'listings'
+        """
+        self.name = name
+        self.status = "running"
+        self.skipped = False
+        self.started_at: Optional[datetime] = None
+        self.duration_seconds: Optional[float] = None
+        self.counters = {counter: 0 for counter in STEP_COUNTERS}
+        self.lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self.lock:
+            for counter, count in counts.items():
+                self.counters[counter] += count
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "step": self.name,
+                "status": self.status,
+                "skipped": self.skipped,
+                "started_at": (
+                    None if self.started_at is None else self.started_at.isoformat()
+                ),
+                "duration_seconds": self.duration_seconds,
+                **self.counters,
+            }
+
+
+# Metrics of the step running in the current thread. Set by RunReport.step, and
+# copied into worker threads with propagate_context.
+_current_step: contextvars.ContextVar[Optional[StepMetrics]] = contextvars.ContextVar(
+    "current_step", default=None
+)
+
+
+def record(**counts: int) -> None:
+    """Add to the counters of the step running in the current thread. Does nothing
+    outside of a step, e.g. in tests or when rebuilding averages.
+
+    Args:
+        **counts (int): Amount to add to each counter, from STEP_COUNTERS
+    """
+    step = _current_step.get()
+    if step is not None:
+        step.add(**counts)
+
+
+def mark_skipped() -> None:
+    """Mark the step running in the current thread as skipped, as its dataset already
+    exists from a previous execution with the same timestamp.
+    """
+    step = _current_step.get()
+    if step is not None:
+        step.skipped = True
+
+
+def propagate_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a function submitted to a thread pool so it records to the metrics of the
+    step that submitted it. Worker threads do not inherit context variables.
+
+    Args:
+        fn (Callable[..., Any]): Function to run in worker threads
+
+    Returns:
+        Callable[..., Any]: Function running in a copy of the submitting context
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # each call gets its own copy, a context can only be entered by one thread
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+class RunReport:
+
+    def __init__(self, timestamp: str, pricing_mode: Optional[str] = None):
+        """Structured report of a workflow execution, with the metrics of every step.
+
+        Args:
+            timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            pricing_mode (Optional[str], optional): Pricing mode of the execution.
+                Defaults to None.
+        """
+        self.timestamp = timestamp
+        self.pricing_mode = pricing_mode
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.duration_seconds: Optional[float] = None
+        self.status = "running"
+        self.steps: List[StepMetrics] = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[StepMetrics]:
+        """Collect the metrics of a step while it runs in the current thread.
+
+        Args:
+            name (str): Name of the step
+
+        Yields:
+            Iterator[StepMetrics]: Metrics of the step
+        """
+        metrics = StepMetrics(name)
+        with self.lock:
+            self.steps.append(metrics)
+        token = _current_step.set(metrics)
+        metrics.started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            yield metrics
+            metrics.status = "succeeded"
+        except BaseException:
+            metrics.status = "failed"
+            raise
+        finally:
+            metrics.duration_seconds = time.perf_counter() - start
+            _current_step.reset(token)
+
+    def finish(self, succeeded: bool) -> None:
+        self.duration_seconds = time.perf_counter() - self.start
+        self.status = "succeeded" if succeeded else "failed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            steps = [step.to_dict() for step in self.steps]
+        return {
+            "timestamp": self.timestamp,
+            "pricing_mode": self.pricing_mode,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": self.duration_seconds,
+            "totals": {
+                counter: sum(step[counter] for step in steps)
+                for counter in STEP_COUNTERS
+            },
+            "steps": steps,
+        }
+
+    def write_json(self, file_path: str) -> None:
+        """Write the report as JSON.
+
+        Args:
+            file_path (str): File to write the report to
+        """
+        write_atomic(file_path, json.dumps(self.to_dict(), indent=2))
+
+    def to_prometheus(self) -> str:
+        """Report in the Prometheus text exposition format, e.g. to be picked up by
+        the textfile collector of node_exporter.
+
+        Returns:
+            str: Gauges of the run and of every step, labelled by step name
+        """
+        report = self.to_dict()
+        finished_at = self.started_at.timestamp() + (report["duration_seconds"] or 0)
+        lines = []
+
+        def gauge(name: str, help: str, samples: List[tuple]) -> None:
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} gauge")
+            for labels, value in samples:
+                label_str = ",".join(
+                    f'{key}="{label}"' for key, label in labels.items()
+                )
+                labels_part = f"{{{label_str}}}" if labels else ""
+                lines.append(f"{metric}{labels_part} {float(value or 0)}")
+
+        gauge(
+            "run_duration_seconds",
+            "Wall time of the last workflow execution",
+            [({}, report["duration_seconds"])],
+        )
+        gauge(
+            "run_success",
+            "Whether the last workflow execution succeeded",
+            [({}, report["status"] == "succeeded")],
+        )
+        gauge(
+            "run_finished_timestamp_seconds",
+            "Unix time the last workflow execution finished",
+            [({}, finished_at)],
+        )
+        steps = report["steps"]
+        gauge(
+            "step_duration_seconds",
+            "Wall time of each step in the last execution",
+            [({"step": step["step"]}, step["duration_seconds"]) for step in steps],
+        )
+        gauge(
+            "step_success",
+            "Whether each step in the last execution succeeded",
+            [({"step": step["step"]}, step["status"] == "succeeded") for step in steps],
+        )
+        gauge(
+            "step_skipped",
+            "Whether each step reused a dataset from a previous execution",
+            [({"step": step["step"]}, step["skipped"]) for step in steps],
+        )
+        for counter in STEP_COUNTERS:
+            gauge(
+                f"step_{counter}",
+                f"{counter.replace('_', ' ').capitalize()} of each step in the last execution",
+                [({"step": step["step"]}, step[counter]) for step in steps],
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, file_path: str) -> None:
+        """Write the report as a Prometheus textfile.
+
+        Args:
+            file_path (str): File to write the metrics to, should end in '.prom'
+        """
+        write_atomic(file_path, self.to_prometheus())
+
+
+def write_atomic(file_path: str, content: str) -> None:
+    # written to a temp file first so a reader never sees a half written file
+    temp_file = f"{file_path}.tmp"
+    with open(temp_file, "w") as file:
+        file.write(content)
+    os.replace(temp_file, file_path)
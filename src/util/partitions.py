@@ -0,0 +1,128 @@
+"""Date partitioned layout of the data lake, and the names of compacted files.
+
+With the partitioned layout the files of an execution are written into the partition
+of its UTC day within the dataset directory, e.g.
+'pricing/date=2025-01-16/coins_pricing_20250116000000.csv'. Once a day is over its
+files can be compacted into a single parquet file in the same partition, e.g.
+'pricing/date=2025-01-16/coins_pricing_2025-01-16.parquet'.
+
+Nothing here imports pandas.
+"""
+
+import re
+from os.path import basename, dirname, join
+from typing import Optional, Tuple
+
+from src.util.config import (
+    DATA_LAKE_LAYOUT,
+    DATA_LAKE_LAYOUT_FLAT,
+    DATA_LAKE_LAYOUT_PARTITIONED,
+    DATA_LAKE_LAYOUTS,
+    PARTITION_DIRECTORY_FORMAT,
+)
+from src.util.exceptions import InvalidDataLakeLayoutException
+
+DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+PARTITION_DIRECTORY = re.compile(
+    "^"
+    + re.escape(PARTITION_DIRECTORY_FORMAT).replace(
+        r"\{\}", f"(?P<date>{DATE_PATTERN})"
+    )
+    + "$"
+)
+# Compacted files are always parquet, and end with the date of the partition
+COMPACTED_EXTENSION = ".parquet"
+COMPACTED_FILE_NAME = re.compile(
+    rf"^(?P<name>.*?)(?P<date>{DATE_PATTERN}){re.escape(COMPACTED_EXTENSION)}$"
+)
+
+
+def timestamp_date(timestamp: str) -> str:
+    """UTC day of an execution timestamp, e.g. '2025-01-16' for '20250116000000'"""
+    return f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}"
+
+
+def partition_name(date: str) -> str:
+    """Directory name of the partition of a day in YYYY-MM-DD, e.g. 'date=2025-01-16'"""
+    return PARTITION_DIRECTORY_FORMAT.format(date)
+
+
+def partition_date(name: str) -> Optional[str]:
+    """Day of a partition from its directory name. None if not a partition."""
+    match = PARTITION_DIRECTORY.match(name)
+    return None if match is None else match.group("date")
+
+
+def split_partition(directory: str) -> Tuple[str, str]:
+    """Split the directory of a dataset file into the directory of the dataset and
+    the name of the partition.
+
+    Args:
+        directory (str): Directory a dataset file is in
+
+    Returns:
+        Tuple[str, str]: Directory of the dataset and the partition name, '' if the
+            file is directly in the dataset directory
+    """
+    if partition_date(basename(directory)) is not None:
+        return dirname(directory), basename(directory)
+    return directory, ""
+
+
+def write_directory(
+    directory: str, timestamp: str, layout: str = DATA_LAKE_LAYOUT
+) -> str:
+    """Directory new files of an execution are written to.
+
+    Args:
+        directory (str): Directory of the dataset
+        timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+        layout (str, optional): One of DATA_LAKE_LAYOUTS. Defaults to DATA_LAKE_LAYOUT.
+
+    Raises:
+        InvalidDataLakeLayoutException: Raised if the layout is not supported
+
+    Returns:
+        str: The dataset directory, or the partition of the day of the execution
+    """
+    if layout == DATA_LAKE_LAYOUT_FLAT:
+        return directory
+    if layout == DATA_LAKE_LAYOUT_PARTITIONED:
+        return join(directory, partition_name(timestamp_date(timestamp)))
+    raise InvalidDataLakeLayoutException(
+        f"Invalid data lake layout: '{layout}'. Supported layouts are {DATA_LAKE_LAYOUTS}."
+    )
+
+
+def compacted_file(directory: str, file_format: str, date: str) -> str:
+    """File path of the compacted file of a day.
+
+    Args:
+        directory (str): Directory of the dataset
+        file_format (str): File name format without extension, e.g. 'coins_pricing_{}'
+        date (str): Day in YYYY-MM-DD
+
+    Returns:
+        str: File path of the compacted file in the partition of the day
+    """
+    return join(
+        directory, partition_name(date), file_format.format(date) + COMPACTED_EXTENSION
+    )
+
+
+def parse_compacted_file_name(file_name: str) -> Optional[Tuple[str, str]]:
+    """Split a compacted file name into the name before the date and the date.
+
+    Args:
+        file_name (str): File name, e.g. 'coins_pricing_2025-01-16.parquet'
+
+    Returns:
+        Optional[Tuple[str, str]]: e.g. ('coins_pricing_', '2025-01-16'). None if not
+            a compacted file.
+    """
+    match = COMPACTED_FILE_NAME.match(file_name)
+    return None if match is None else (match.group("name"), match.group("date"))
+
+
+def is_compacted_file(file_path: str) -> bool:
+    return parse_compacted_file_name(basename(file_path)) is not None
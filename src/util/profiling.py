@@ -0,0 +1,165 @@
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from os.path import join
+from types import FrameType
+from typing import Iterator, List, Optional
+
+from src.util.config import PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_ENTRIES
+
+# Frames of the profilers themselves, left out of the allocation sites
+_TRACEMALLOC_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+class StackSampler:
+
+    def __init__(self, root: str, interval: float = PROFILE_SAMPLE_INTERVAL):
+        """Sample the stacks of every running thread at a fixed interval, counting
+        each unique stack. Unlike cProfile, samples keep the full call stack, so they
+        can be drawn as a flamegraph.
+
+        Args:
+            root (str): Frame every stack is nested under, e.g. the step name
+            interval (float, optional): Seconds between samples.
+                Defaults to PROFILE_SAMPLE_INTERVAL.
+        """
+        self.root = root
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler")
+        self.started_by: Optional[threading.Thread] = None
+
+    @staticmethod
+    def frame_name(frame: FrameType) -> str:
+        module = frame.f_globals.get("__name__", "?")
+        return f"{module}:{frame.f_code.co_qualname}"
+
+    def _run(self) -> None:
+        ignored = {threading.get_ident()}
+        if threading.main_thread() is not self.started_by:
+            # the main thread only ever shows the DAG waiting on the step
+            ignored.add(threading.main_thread().ident)
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in ignored:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(self.frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[";".join([self.root] + names[::-1])] += 1
+
+    def start(self) -> None:
+        self.started_by = threading.current_thread()
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed stack format read by flamegraph.pl, speedscope
+        and inferno, one 'frame;frame;frame count' line per unique stack.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class StepProfiler:
+
+    def __init__(self, directory: str, steps: Optional[List[str]] = None):
+        """Profile workflow steps with cProfile, tracemalloc and a stack sampler,
+        writing for every profiled step:
+
+        - '{step}.prof': cProfile stats, to load with pstats or snakeviz
+        - '{step}_cpu.txt': functions with the most cumulative time
+        - '{step}_allocations.txt': lines that allocated the most memory still held
+            when the step finished, and the peak memory traced during the step
+        - '{step}.collapsed': sampled stacks, to render with flamegraph.pl
+
+        cProfile can only profile one step at a time, so profiled workflows must run
+        their steps one after the other. Profiling slows steps down several times,
+        compare durations between profiled runs only.
+
+        Args:
+            directory (str): Directory the profiles are written to
+            steps (Optional[List[str]], optional): Names of the steps to profile,
+                None for every step. Defaults to None.
+        """
+        self.directory = directory
+        self.steps = steps
+
+    def profiles(self, name: str) -> bool:
+        return self.steps is None or name in self.steps
+
+    @contextlib.contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile a step while it runs, if it is one of the steps to profile. The
+        profiles are written even if the step fails.
+
+        Args:
+            name (str): Name of the step
+        """
+        if not self.profiles(name):
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+        sampler = StackSampler(name)
+        profile = cProfile.Profile()
+
+        sampler.start()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            sampler.stop()
+            after = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.write(name, profile, sampler, before, after, peak)
+
+    def write(
+        self,
+        name: str,
+        profile: cProfile.Profile,
+        sampler: StackSampler,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        peak: int,
+    ) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(join(self.directory, f"{name}.prof"))
+
+        cpu = io.StringIO()
+        stats = pstats.Stats(profile, stream=cpu)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_ENTRIES)
+        with open(join(self.directory, f"{name}_cpu.txt"), "w") as file:
+            file.write(cpu.getvalue())
+
+        lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB", ""]
+        lines.append(f"Top {PROFILE_TOP_ENTRIES} allocation sites by memory held:")
+        for diff in after.compare_to(before, "lineno")[:PROFILE_TOP_ENTRIES]:
+            lines.append(str(diff))
+        with open(join(self.directory, f"{name}_allocations.txt"), "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+        with open(join(self.directory, f"{name}.collapsed"), "w") as file:
+            file.write(sampler.collapsed())
@@ -0,0 +1,155 @@
+"""Views of the data lake for CLI commands that need to start fast, e.g. dashboards
+shelling out to print the averages. Nothing here imports pandas.
+"""
+
+import csv
+import json
+import os
+from os.path import exists, join
+from typing import Any, Dict, List, Optional, Tuple
+
+from tabulate import tabulate
+
+from src.util.catalog import find_dataset_files, list_dataset_files
+from src.util.config import COMPACTION_TIMESTAMP_COLUMN
+from src.util.partitions import is_compacted_file
+
+
+def latest_dataset(
+    directory: str, file_format: str, timestamp: Optional[str] = None
+) -> Optional[Tuple[str, str]]:
+    """Find the latest execution in a dataset directory, and the file it is in.
+
+    Args:
+        directory (str): Directory of the dataset
+        file_format (str): File name format without extension, e.g. 'coins_pricing_{}'
+        timestamp (Optional[str], optional): Only find the execution with this
+            timestamp. Defaults to None.
+
+    Returns:
+        Optional[Tuple[str, str]]: Timestamp of the execution and the file path of
+            its dataset, or of the compacted file holding it. None if there is none.
+    """
+    if timestamp is not None:
+        files = find_dataset_files(directory, file_format, timestamp)
+        return (timestamp, files[0]) if files else None
+    files = list_dataset_files(directory, file_format)
+    return files[-1] if files else None
+
+
+def read_table(
+    file_path: str,
+    timestamp: Optional[str] = None,
+    dtypes: Optional[Dict[str, str]] = None,
+) -> Tuple[List[str], List[List[Any]]]:
+    """Read a small dataset as a header and rows. Columns of CSV files declared as
+    numbers are parsed like pandas does, so the rows print the same as a DataFrame
+    read by the steps. Other columns are kept as text, e.g. a symbol such as '00'.
+
+    Args:
+        file_path (str): Dataset file, .csv or .parquet
+        timestamp (Optional[str], optional): Execution to keep the rows of, if the
+            file is a compacted file. Defaults to None.
+        dtypes (Optional[Dict[str, str]], optional): Declared type of each column,
+            see src.util.schemas. Defaults to None.
+
+    Returns:
+        Tuple[List[str], List[List[Any]]]: Column names and rows of the dataset
+    """
+    if file_path.endswith(".parquet"):
+        # still much lighter than pandas
+        import pyarrow.parquet as pq
+
+        # files in a partition directory, e.g. 'date=2025-01-16', are not read as a
+        # hive partitioned dataset, which would add a 'date' column
+        if is_compacted_file(file_path):
+            table = pq.read_table(
+                file_path,
+                filters=[(COMPACTION_TIMESTAMP_COLUMN, "==", timestamp)],
+                partitioning=None,
+            ).drop_columns([COMPACTION_TIMESTAMP_COLUMN])
+        else:
+            table = pq.read_table(file_path, partitioning=None)
+        columns = table.to_pydict()
+        return table.column_names, [list(row) for row in zip(*columns.values())]
+    with open(file_path, "r", newline="") as file:
+        reader = csv.reader(file)
+        headers = next(reader, [])
+        column_dtypes = [(dtypes or {}).get(header, "object") for header in headers]
+        return headers, [
+            [parse_value(value, dtype) for value, dtype in zip(row, column_dtypes)]
+            for row in reader
+        ]
+
+
+def parse_value(value: str, dtype: str) -> Any:
+    if dtype.startswith(("int", "float")):
+        # missing numbers are NaN in pandas, printed empty
+        if value == "":
+            return None
+        return int(value) if dtype.startswith("int") else float(value)
+    return value
+
+
+def print_averages_table(headers: List[str], rows: List[List[Any]]) -> None:
+    """Pretty print the average difference dataset to the end user.
+
+    Args:
+        headers (List[str]): Column names
+        rows (List[List[Any]]): Rows, sorted by average difference
+    """
+    print(
+        "\nDisplaying average difference between the 24 hour percent change of each "
+        "coin \nand the 24 hour percent change of Bitcoin, across all executions."
+    )
+    print("\n\n" + tabulate(rows, headers=headers, tablefmt="rounded_grid"))
+
+
+def latest_run_report(directory: str, file_format: str) -> Optional[Dict]:
+    """Read the run report of the latest execution.
+
+    Args:
+        directory (str): Directory of the run reports
+        file_format (str): File name format of a run report, e.g. 'run_report_{}.json'
+
+    Returns:
+        Optional[Dict]: The run report. None if there is none.
+    """
+    if not exists(directory):
+        return None
+    prefix, suffix = file_format.split("{}")
+    file_names = [
+        file_name
+        for file_name in os.listdir(directory)
+        if file_name.startswith(prefix) and file_name.endswith(suffix)
+    ]
+    if not file_names:
+        return None
+    with open(join(directory, max(file_names)), "r") as file:
+        return json.load(file)
+
+
+def format_run_report(report: Dict) -> str:
+    """Summary of a run report, a line for the execution and one for every step.
+
+    Args:
+        report (Dict): Run report, see src.util.metrics.RunReport
+
+    Returns:
+        str: Summary to print
+    """
+    duration = report["duration_seconds"]
+    lines = [
+        f"Execution {report['timestamp']} ({report['pricing_mode']}) "
+        f"{report['status']}"
+        + ("" if duration is None else f" in {duration:.2f}s")
+        + f", started at {report['started_at']}"
+    ]
+    for step in report["steps"]:
+        status = "skipped" if step["skipped"] else step["status"]
+        lines.append(
+            f"  {step['step']:<20} {status:<10} {step['duration_seconds'] or 0:8.2f}s"
+            f"  {step['rows_in']} rows in, {step['rows_out']} rows out,"
+            f" {step['api_calls']} API calls"
+        )
+    return "\n".join(lines)
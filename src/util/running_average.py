@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from os.path import dirname, exists
+from typing import Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from src.util.config import (
+    AVG_BITCOIN_DIFF_REORDER_WINDOW_HOURS,
+    LOGGER_NAME,
+    TIMESTAMP_FORMAT,
+)
+from src.util.file_lock import file_lock
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class RunningAverageState:
+
+    def __init__(
+        self,
+        state_file: str,
+        reorder_window_hours: float = AVG_BITCOIN_DIFF_REORDER_WINDOW_HOURS,
+    ):
+        """Persisted running sum and count per key, so an average across every
+        execution can be kept up to date by applying only the newest dataset instead
+        of re-reading the full history.
+
+        Also records which execution timestamps have been applied, so a dataset is
+        never counted twice: the latest timestamp applied, and every timestamp applied
+        within the reorder window before it. Executions older than the window are
+        treated as applied, so the record stays the same size however long the
+        workflow runs.
+
+        Args:
+            state_file (str): Location of the JSON file backing the state
+            reorder_window_hours (float, optional): Hours before the latest applied
+                execution that executions can still be applied. Defaults to
+                AVG_BITCOIN_DIFF_REORDER_WINDOW_HOURS.
+        """
+        self.state_file = state_file
+        self.reorder_window = timedelta(hours=reorder_window_hours)
+        self.latest_timestamp: Optional[str] = None
+        self.applied_timestamps = set()
+        self.totals: Dict[str, Dict[str, float]] = {}
+        # version of the file last loaded or saved, see refresh
+        self.version: Optional[Tuple[int, int, int]] = None
+        self._lock_depth = 0
+
+    @property
+    def exists(self) -> bool:
+        return exists(self.state_file)
+
+    def file_version(self) -> Optional[Tuple[int, int, int]]:
+        if not self.exists:
+            return None
+        stat = os.stat(self.state_file)
+        # every save replaces the file, so the inode tells apart saves made within
+        # the resolution of the modification time
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextmanager
+    def locked(self) -> Iterator["RunningAverageState"]:
+        """Hold the lock of the state file and refresh the state, so it can be
+        updated and saved without losing the updates of other processes running at
+        the same time. Can be nested.
+
+        Yields:
+            RunningAverageState: The refreshed state
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+            return
+
+        with file_lock(f"{self.state_file}.lock"):
+            self._lock_depth = 1
+            try:
+                yield self.refresh()
+            finally:
+                self._lock_depth = 0
+
+    def refresh(self) -> "RunningAverageState":
+        """Re-read the state only if the file changed since it was last loaded or
+        saved, e.g. by a rebuild in another process. Lets a state kept in memory
+        between executions skip reading the file every time.
+
+        Returns:
+            RunningAverageState: The refreshed state, for chaining
+        """
+        if self.version is None or self.file_version() != self.version:
+            self.reset()
+            self.load()
+        return self
+
+    def load(self) -> "RunningAverageState":
+        """Read the state from disk, if it has been saved before.
+
+        Returns:
+            RunningAverageState: The loaded state, for chaining
+        """
+        if self.exists:
+            with open(self.state_file, "r") as file:
+                state = json.load(file)
+            self.applied_timestamps = set(state["applied_timestamps"])
+            # states saved before the latest timestamp was kept hold every timestamp
+            self.latest_timestamp = state.get(
+                "latest_timestamp", max(self.applied_timestamps, default=None)
+            )
+            self.totals = state["totals"]
+            self.forget_old_timestamps()
+        self.version = self.file_version()
+        return self
+
+    def save(self) -> None:
+        """Write the state to disk. Writes to a temp file first so a failure part way
+        through never leaves a corrupt state behind. Hold the lock of the state, see
+        locked, when other processes may be updating it too.
+        """
+        os.makedirs(dirname(self.state_file), exist_ok=True)
+        descriptor, temp_file = tempfile.mkstemp(
+            dir=dirname(self.state_file), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(
+                    {
+                        "latest_timestamp": self.latest_timestamp,
+                        "applied_timestamps": sorted(self.applied_timestamps),
+                        "totals": self.totals,
+                    },
+                    file,
+                )
+            os.replace(temp_file, self.state_file)
+        except BaseException:
+            if exists(temp_file):
+                os.remove(temp_file)
+            raise
+        self.version = self.file_version()
+
+    def reset(self) -> None:
+        """Forget everything applied, used before a full rebuild"""
+        self.latest_timestamp = None
+        self.applied_timestamps = set()
+        self.totals = {}
+
+    def window_start(self) -> Optional[str]:
+        # oldest timestamp that can still be applied, None before anything is applied
+        if self.latest_timestamp is None:
+            return None
+        latest = datetime.strptime(self.latest_timestamp, TIMESTAMP_FORMAT)
+        return (latest - self.reorder_window).strftime(TIMESTAMP_FORMAT)
+
+    def forget_old_timestamps(self) -> None:
+        window_start = self.window_start()
+        if window_start is not None:
+            self.applied_timestamps = {
+                timestamp
+                for timestamp in self.applied_timestamps
+                if timestamp >= window_start
+            }
+
+    def apply(
+        self, timestamp: str, df: pd.DataFrame, key_column: str, value_column: str
+    ) -> bool:
+        """Add the values of a single execution's dataset to the running totals.
+        Cost is proportional to the number of keys, not the history.
+
+        Args:
+            timestamp (str): Execution timestamp of the dataset
+            df (pd.DataFrame): Dataset of the execution
+            key_column (str): Column to group the averages by
+            value_column (str): Column to average
+
+        Returns:
+            bool: True if applied, False if the timestamp had already been applied or
+                is older than the reorder window
+        """
+        if timestamp in self.applied_timestamps:
+            return False
+        window_start = self.window_start()
+        if window_start is not None and timestamp < window_start:
+            logger.warning(
+                f"Execution {timestamp} is more than {self.reorder_window} older than"
+                f" the latest execution applied to the running averages"
+                f" ({self.latest_timestamp}) and was not applied. Re-run with"
+                " --rebuild-averages to include it."
+            )
+            return False
+
+        # count() skips missing values, the same as mean()
+        grouped = df.groupby(key_column)[value_column].agg(["sum", "count"])
+        for key, row in grouped.iterrows():
+            totals = self.totals.setdefault(str(key), {"sum": 0.0, "count": 0})
+            totals["sum"] += float(row["sum"])
+            totals["count"] += int(row["count"])
+
+        self.applied_timestamps.add(timestamp)
+        if self.latest_timestamp is None or timestamp > self.latest_timestamp:
+            self.latest_timestamp = timestamp
+            self.forget_old_timestamps()
+        return True
+
+    def averages(self) -> Dict[str, float]:
+        """Average of every key across all applied datasets.
+
+        Returns:
+            Dict[str, float]: Average value per key
+        """
+        return {
+            key: totals["sum"] / totals["count"]
+            for key, totals in self.totals.items()
+            if totals["count"] > 0
+        }
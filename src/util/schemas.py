@@ -0,0 +1,149 @@
+from typing import Dict
+
+from src.util.config import (
+    AVG_BITCOIN_DIFF_DATASET,
+    BITCOIN_COMPARISON_DATASET,
+    LISTINGS_DATASET,
+    PRICING_DATASET,
+    QUOTES_DATASET,
+    UNIVERSE_DATASET,
+)
+
+# Declared type of fields holding a list, e.g. "tags". Kept as a list per row instead of
+# being expanded into columns, with missing values as an empty list. Defined here
+# rather than in src.util.flatten, so the schemas can be imported without pandas.
+LIST_FIELD = "list"
+
+# DECLARED FIELDS OF RAW DATASETS
+#
+# Fields kept from the API responses of each bronze dataset, flattened into columns by
+# src.util.flatten.flatten_records. Nested fields are joined with '.'. Fields the API
+# adds that are not declared here are not kept.
+
+LISTINGS_FIELDS = {
+    "id": "int64",
+    "name": "object",
+    "symbol": "object",
+    "slug": "object",
+    "num_market_pairs": "float64",
+    "date_added": "object",
+    "tags": LIST_FIELD,
+    "max_supply": "float64",
+    "circulating_supply": "float64",
+    "total_supply": "float64",
+    "infinite_supply": "object",
+    "platform.id": "float64",
+    "platform.name": "object",
+    "platform.symbol": "object",
+    "platform.slug": "object",
+    "platform.token_address": "object",
+    "cmc_rank": "int64",
+    "self_reported_circulating_supply": "float64",
+    "self_reported_market_cap": "float64",
+    "tvl_ratio": "float64",
+    "last_updated": "object",
+    "quote.USD.price": "float64",
+    "quote.USD.volume_24h": "float64",
+    "quote.USD.volume_change_24h": "float64",
+    "quote.USD.percent_change_1h": "float64",
+    "quote.USD.percent_change_24h": "float64",
+    "quote.USD.percent_change_7d": "float64",
+    "quote.USD.percent_change_30d": "float64",
+    "quote.USD.percent_change_60d": "float64",
+    "quote.USD.percent_change_90d": "float64",
+    "quote.USD.market_cap": "float64",
+    "quote.USD.market_cap_dominance": "float64",
+    "quote.USD.fully_diluted_market_cap": "float64",
+    "quote.USD.tvl": "float64",
+    "quote.USD.last_updated": "object",
+}
+
+# Quotes of the tracked coins share the layout of the listings
+QUOTES_FIELDS = LISTINGS_FIELDS
+
+UNIVERSE_FIELDS = {
+    "id": "int64",
+    "name": "object",
+    "symbol": "object",
+    "category": "object",
+    "description": "object",
+    "slug": "object",
+    "logo": "object",
+    "subreddit": "object",
+    "notice": "object",
+    "tags": LIST_FIELD,
+    "tag-names": LIST_FIELD,
+    "tag-groups": LIST_FIELD,
+    "urls.website": LIST_FIELD,
+    "urls.twitter": LIST_FIELD,
+    "urls.message_board": LIST_FIELD,
+    "urls.chat": LIST_FIELD,
+    "urls.facebook": LIST_FIELD,
+    "urls.explorer": LIST_FIELD,
+    "urls.reddit": LIST_FIELD,
+    "urls.technical_doc": LIST_FIELD,
+    "urls.source_code": LIST_FIELD,
+    "urls.announcement": LIST_FIELD,
+    "platform.id": "float64",
+    "platform.name": "object",
+    "platform.slug": "object",
+    "platform.symbol": "object",
+    "platform.token_address": "object",
+    "date_added": "object",
+    "twitter_username": "object",
+    "is_hidden": "float64",
+    "date_launched": "object",
+    "contract_address": LIST_FIELD,
+    "self_reported_circulating_supply": "float64",
+    "self_reported_tags": LIST_FIELD,
+    "self_reported_market_cap": "float64",
+    "infinite_supply": "object",
+}
+
+
+def declared_dtypes(fields: Dict[str, str]) -> Dict[str, str]:
+    """Column types of declared fields, leaving out list fields which have no pandas
+    type to cast to.
+    """
+    return {column: dtype for column, dtype in fields.items() if dtype != LIST_FIELD}
+
+
+# DECLARED COLUMN TYPES
+#
+# Types of the columns the workflow reads from each dataset. Applied when a dataset
+# is read so values never depend on type inference (e.g. a column that is empty for
+# every coin in one execution). Columns that are not declared keep their inferred type.
+
+LISTINGS_DTYPES = declared_dtypes(LISTINGS_FIELDS)
+
+QUOTES_DTYPES = declared_dtypes(QUOTES_FIELDS)
+
+UNIVERSE_DTYPES = declared_dtypes(UNIVERSE_FIELDS)
+
+PRICING_DTYPES = {
+    "ID": "int64",
+    "Name": "object",
+    "Symbol": "object",
+    "CMCRank": "int64",
+    "PercentChange24h": "float64",
+}
+
+BITCOIN_COMPARISON_DTYPES = {
+    "ID": "int64",
+    "Symbol": "object",
+    "BitcoinVsCurrency24hPercentChangeDiff": "float64",
+}
+
+AVG_BITCOIN_DIFF_DTYPES = {
+    "Symbol": "object",
+    "AvgBitcoinVsCurrency24hPercentChangeDiff": "float64",
+}
+
+DATASET_DTYPES = {
+    AVG_BITCOIN_DIFF_DATASET: AVG_BITCOIN_DIFF_DTYPES,
+    BITCOIN_COMPARISON_DATASET: BITCOIN_COMPARISON_DTYPES,
+    LISTINGS_DATASET: LISTINGS_DTYPES,
+    PRICING_DATASET: PRICING_DTYPES,
+    QUOTES_DATASET: QUOTES_DTYPES,
+    UNIVERSE_DATASET: UNIVERSE_DTYPES,
+}
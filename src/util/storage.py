@@ -0,0 +1,505 @@
+import logging
+import operator
+import os
+from os.path import exists, join
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.util.catalog import CatalogWrite, find_dataset_files
+from src.util.config import DATASET_STORAGE_FORMATS, LOGGER_NAME, PARQUET_COMPRESSION
+from src.util.exceptions import (
+    DatasetSchemaMismatchException,
+    InvalidStorageFormatException,
+)
+from src.util.metrics import record
+from src.util.partitions import partition_name, timestamp_date, write_directory
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Row filters as (column, operator, value), e.g. ("name", "==", "Bitcoin"). Matches the
+# filter format of pyarrow, so filters can be pushed down into parquet reads.
+Filters = List[Tuple[str, str, Any]]
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def apply_filters(df: pd.DataFrame, filters: Optional[Filters]) -> pd.DataFrame:
+    """Keep only the rows of a DataFrame matching every filter.
+
+    Args:
+        df (pd.DataFrame): DataFrame to filter
+        filters (Optional[Filters]): Row filters, None to keep every row
+
+    Returns:
+        pd.DataFrame: DataFrame with only the matching rows
+    """
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if op == "in":
+            mask &= df[column].isin(value)
+        elif op == "not in":
+            mask &= ~df[column].isin(value)
+        else:
+            mask &= FILTER_OPERATORS[op](df[column], value)
+    return df[mask].reset_index(drop=True)
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """Cast the columns of a DataFrame to their declared types. Declared columns that
+    are not in the DataFrame are skipped.
+
+    Args:
+        df (pd.DataFrame): DataFrame to cast
+        dtypes (Optional[Dict[str, str]]): Declared type of each column
+
+    Returns:
+        pd.DataFrame: DataFrame with declared types
+    """
+    if not dtypes:
+        return df
+    mismatched = {
+        column: dtype
+        for column, dtype in dtypes.items()
+        if column in df.columns and df[column].dtype != dtype
+    }
+    return df.astype(mismatched) if mismatched else df
+
+
+def filter_columns(filters: Optional[Filters]) -> List[str]:
+    return [column for column, _, _ in filters or []]
+
+
+class DatasetWriter:
+
+    def __init__(self, file_path: str, dtypes: Optional[Dict[str, str]] = None):
+        """Writes a dataset one chunk at a time, so only a single chunk is held in
+        memory. The columns and their types are fixed by the first chunk written, and
+        a later chunk that does not fit them raises DatasetSchemaMismatchException
+        instead of losing any of its values.
+
+        Chunks are written to a temp file that replaces the dataset file when the
+        writer is closed, so a failure part way through never leaves a partial
+        dataset behind. Use as a context manager to close or discard the temp file.
+        The dataset file is recorded in the data lake catalog once it is in place.
+
+        Args:
+            file_path (str): File path of the dataset
+            dtypes (Optional[Dict[str, str]], optional): Declared type of each column,
+                applied to every chunk. Defaults to None.
+        """
+        self.file_path = file_path
+        self.temp_file = f"{file_path}.tmp"
+        self.dtypes = dtypes
+        self.columns: Optional[List[str]] = None
+        self.row_count = 0
+        # partitions are created as the first file of a day is written
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.catalog_write = CatalogWrite(file_path)
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        """Append a chunk of rows to the dataset. Columns missing from the chunk are
+        written as nulls.
+
+        Args:
+            dataframe (pd.DataFrame): Chunk of rows to append
+
+        Raises:
+            DatasetSchemaMismatchException: The chunk has columns that are not in the
+                dataset
+        """
+        dataframe = apply_dtypes(dataframe, self.dtypes)
+        if self.columns is None:
+            self.columns = list(dataframe.columns)
+        else:
+            unknown = [c for c in dataframe.columns if c not in self.columns]
+            if unknown:
+                raise DatasetSchemaMismatchException(
+                    f"Columns {unknown} are not in the columns {self.columns} of"
+                    f" '{self.file_path}', fixed by its first chunk or schema."
+                )
+            dataframe = dataframe.reindex(columns=self.columns)
+        self.write_chunk(dataframe)
+        self.row_count += len(dataframe)
+
+    def write_chunk(self, dataframe: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finish writing and move the temp file into place as the dataset file"""
+        os.replace(self.temp_file, self.file_path)
+        self.catalog_write.complete(self.row_count)
+        record(rows_out=self.row_count, bytes_written=os.path.getsize(self.file_path))
+
+    def discard(self) -> None:
+        """Remove anything written so far, leaving no dataset file behind"""
+        if exists(self.temp_file):
+            os.remove(self.temp_file)
+        self.catalog_write.discard()
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class CsvDatasetWriter(DatasetWriter):
+
+    def __init__(self, file_path: str, dtypes: Optional[Dict[str, str]] = None):
+        super().__init__(file_path, dtypes)
+        self.header_written = False
+
+    def write_chunk(self, dataframe: pd.DataFrame) -> None:
+        # the header is only written with the first chunk, later chunks are appended
+        dataframe.to_csv(
+            self.temp_file,
+            mode="a" if self.header_written else "w",
+            header=not self.header_written,
+            index=False,
+        )
+        self.header_written = True
+
+    def close(self) -> None:
+        if not self.header_written:
+            # nothing was written, still leave an empty dataset behind
+            self.write_chunk(pd.DataFrame())
+        super().close()
+
+
+class ParquetDatasetWriter(DatasetWriter):
+
+    def __init__(
+        self,
+        file_path: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        compression: Optional[str] = PARQUET_COMPRESSION,
+        schema: Optional["pa.Schema"] = None,
+    ):
+        """
+        Args:
+            file_path (str): File path of the dataset
+            dtypes (Optional[Dict[str, str]], optional): Declared type of each column,
+                applied to every chunk. Defaults to None.
+            compression (Optional[str], optional): Compression codec supported by
+                pyarrow, None for no compression. Defaults to PARQUET_COMPRESSION.
+            schema (Optional[pa.Schema], optional): Columns and types of the file,
+                when known up front. Otherwise fixed by the first chunk written, e.g.
+                a column with no values in the first chunk has no type, and a later
+                chunk with values in it raises DatasetSchemaMismatchException.
+                Defaults to None.
+        """
+        super().__init__(file_path, dtypes)
+        self.compression = compression
+        self.schema = schema
+        if schema is not None:
+            self.columns = list(schema.names)
+        self.writer = None
+
+    def write_chunk(self, dataframe: pd.DataFrame) -> None:
+        # imported here as pyarrow is only needed once a parquet file is written
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None and self.schema is None:
+            table = pa.Table.from_pandas(dataframe, preserve_index=False)
+            self.writer = pq.ParquetWriter(
+                self.temp_file, table.schema, compression=self.compression or "none"
+            )
+        else:
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(
+                    self.temp_file, self.schema, compression=self.compression or "none"
+                )
+            schema = self.writer.schema
+            arrays = []
+            for field in schema:
+                if dataframe[field.name].isna().all():
+                    # e.g. a column missing from the chunk
+                    arrays.append(pa.nulls(len(dataframe), type=field.type))
+                    continue
+                try:
+                    # only casts that keep every value, e.g. int to float
+                    arrays.append(
+                        pa.array(
+                            dataframe[field.name], type=field.type, from_pandas=True
+                        )
+                    )
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    raise DatasetSchemaMismatchException(
+                        f"Column '{field.name}' can not be written as type"
+                        f" {field.type} of '{self.file_path}': {e}"
+                    ) from e
+            table = pa.Table.from_arrays(arrays, schema=schema)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is None:
+            # nothing was written, still leave an empty dataset behind
+            self.write_chunk(pd.DataFrame())
+        self.writer.close()
+        super().close()
+
+    def discard(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        super().discard()
+
+
+class StorageFormat:
+    """File format a dataset is stored in within the data lake"""
+
+    name = ""
+    extension = ""
+
+    def read(
+        self,
+        file_path: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """Read a dataset file.
+
+        Args:
+            file_path (str): File path of the dataset
+            columns (Optional[List[str]], optional): Only read these columns, None to
+                read every column. Defaults to None.
+            filters (Optional[Filters], optional): Only read rows matching these
+                filters. Defaults to None.
+            dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+                Defaults to None.
+
+        Returns:
+            pd.DataFrame: DataFrame of the dataset
+        """
+        raise NotImplementedError
+
+    def write(self, file_path: str, dataframe: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def open_writer(
+        self, file_path: str, dtypes: Optional[Dict[str, str]] = None
+    ) -> DatasetWriter:
+        """Open a writer that appends to a dataset file one chunk at a time.
+
+        Args:
+            file_path (str): File path of the dataset
+            dtypes (Optional[Dict[str, str]], optional): Declared type of each column.
+                Defaults to None.
+
+        Returns:
+            DatasetWriter: Writer of the dataset file
+        """
+        raise NotImplementedError
+
+
+class CsvStorageFormat(StorageFormat):
+    """Plain .csv files. Easy to open by hand, but slow to parse for wide datasets
+    and every value is re-inferred from text on read.
+    """
+
+    name = "csv"
+    extension = ".csv"
+
+    def read(
+        self,
+        file_path: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        # Text still has to be scanned, but only the used columns are converted
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(columns + filter_columns(filters)))
+        df = pd.read_csv(file_path, usecols=usecols, dtype=dtypes)
+        df = apply_filters(df, filters)
+        return df if columns is None else df[columns]
+
+    def write(self, file_path: str, dataframe: pd.DataFrame) -> None:
+        dataframe.to_csv(file_path, index=False)
+
+    def open_writer(
+        self, file_path: str, dtypes: Optional[Dict[str, str]] = None
+    ) -> DatasetWriter:
+        return CsvDatasetWriter(file_path, dtypes)
+
+
+class ParquetStorageFormat(StorageFormat):
+    """Compressed, columnar .parquet files written with pyarrow. Column types are
+    stored with the data, so values are read back with the types they were written
+    with.
+    """
+
+    name = "parquet"
+    extension = ".parquet"
+
+    def __init__(self, compression: Optional[str] = PARQUET_COMPRESSION):
+        """
+        Args:
+            compression (Optional[str], optional): Compression codec supported by pyarrow
+                (e.g. 'zstd', 'snappy', 'gzip'), None for no compression. Defaults to
+                PARQUET_COMPRESSION.
+        """
+        self.compression = compression
+
+    def read(
+        self,
+        file_path: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        # Columns and filters are pushed down into pyarrow, so only the requested
+        # columns and matching row groups are decoded
+        df = pd.read_parquet(
+            file_path, engine="pyarrow", columns=columns, filters=filters or None
+        )
+        return apply_dtypes(df, dtypes)
+
+    def write(self, file_path: str, dataframe: pd.DataFrame) -> None:
+        dataframe.to_parquet(
+            file_path, engine="pyarrow", compression=self.compression, index=False
+        )
+
+    def open_writer(
+        self,
+        file_path: str,
+        dtypes: Optional[Dict[str, str]] = None,
+        schema: Optional["pa.Schema"] = None,
+    ) -> DatasetWriter:
+        return ParquetDatasetWriter(file_path, dtypes, self.compression, schema)
+
+
+STORAGE_FORMATS: Dict[str, StorageFormat] = {
+    storage_format.name: storage_format
+    for storage_format in [CsvStorageFormat(), ParquetStorageFormat()]
+}
+
+
+def get_storage_format(name: str) -> StorageFormat:
+    """Get a storage format by name.
+
+    Args:
+        name (str): Name of the storage format, e.g. 'csv' or 'parquet'
+
+    Raises:
+        InvalidStorageFormatException: Raised if the storage format is not supported
+
+    Returns:
+        StorageFormat: The storage format
+    """
+    try:
+        return STORAGE_FORMATS[name]
+    except KeyError:
+        raise InvalidStorageFormatException(
+            f"Invalid storage format: '{name}'. Supported formats are {list(STORAGE_FORMATS)}."
+        )
+
+
+def dataset_storage_format(dataset: str) -> StorageFormat:
+    """Get the storage format configured for a dataset in DATASET_STORAGE_FORMATS.
+
+    Args:
+        dataset (str): Name of the dataset
+
+    Returns:
+        StorageFormat: Storage format new files of the dataset are written in
+    """
+    return get_storage_format(DATASET_STORAGE_FORMATS.get(dataset, "csv"))
+
+
+def storage_format_for_path(file_path: str) -> StorageFormat:
+    """Get the storage format of a file from its extension.
+
+    Args:
+        file_path (str): File path of a dataset
+
+    Raises:
+        InvalidStorageFormatException: Raised if the extension is not a supported format
+
+    Returns:
+        StorageFormat: The storage format of the file
+    """
+    for storage_format in STORAGE_FORMATS.values():
+        if file_path.endswith(storage_format.extension):
+            return storage_format
+    raise InvalidStorageFormatException(
+        f"Unable to determine storage format of '{file_path}' from its extension."
+    )
+
+
+def strip_extension(file_name: str) -> Optional[str]:
+    """Remove the storage format extension from a dataset file name.
+
+    Args:
+        file_name (str): File name of a dataset
+
+    Returns:
+        Optional[str]: File name without extension. None if not a dataset file.
+    """
+    for storage_format in STORAGE_FORMATS.values():
+        if file_name.endswith(storage_format.extension):
+            return file_name[: -len(storage_format.extension)]
+    return None
+
+
+def dataset_file(directory: str, file_format: str, timestamp: str, dataset: str) -> str:
+    """Build the file path of a dataset for an execution.
+
+    If the file already exists in any supported storage format (e.g. written before
+    the configured format was changed) or layout, that file is used, otherwise the
+    path uses the storage format configured for the dataset within the directory of
+    the configured DATA_LAKE_LAYOUT. Existing files are looked up in the data lake
+    catalog. Executions merged into a compacted file keep the path they are written
+    to, and are read from the compacted file.
+
+    Args:
+        directory (str): Directory of the dataset
+        file_format (str): File name format without extension, e.g. 'coins_pricing_{}'
+        timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+        dataset (str): Name of the dataset
+
+    Returns:
+        str: File path of the dataset for the execution
+    """
+    file_name = file_format.format(timestamp)
+    write_stem = join(write_directory(directory, timestamp), file_name)
+    configured_format = dataset_storage_format(dataset)
+    existing = find_dataset_files(directory, file_format, timestamp)
+    # check the configured format and layout first, as that is where new files are
+    # written
+    candidate_formats = [configured_format] + [
+        storage_format
+        for storage_format in STORAGE_FORMATS.values()
+        if storage_format is not configured_format
+    ]
+    candidate_stems = [write_stem] + [
+        join(file_directory, file_name)
+        for file_directory in [
+            directory,
+            join(directory, partition_name(timestamp_date(timestamp))),
+        ]
+        if join(file_directory, file_name) != write_stem
+    ]
+    for storage_format in candidate_formats:
+        for file_stem in candidate_stems:
+            if file_stem + storage_format.extension in existing:
+                return file_stem + storage_format.extension
+    return write_stem + configured_format.extension
@@ -0,0 +1,324 @@
+"""Universe datasets stored as a snapshot followed by the changes of each execution.
+
+The universe holds the metadata of every coin (descriptions, URLs, logos, platforms),
+which hardly ever changes between executions, so storing it in full every execution
+fills the lake with copies of the same rows. Instead the universe of an execution is
+stored as the coins that were added or changed since the previous execution, plus a
+row for every coin that was removed, marked in UNIVERSE_CHANGE_COLUMN. The execution
+the changes were found against is kept in UNIVERSE_BASE_COLUMN, so executions stored
+out of order, e.g. re-run with --timestamp or running at the same time, never change
+the universe of the executions stored before them. Every UNIVERSE_SNAPSHOT_INTERVAL
+executions the universe is stored in full again, so rebuilding the universe of an
+execution never reads more than that many files.
+
+Universe files written before universes were stored as changes hold the universe in
+full, and are read as snapshots.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.util.catalog import list_dataset_files
+from src.util.config import (
+    LOGGER_NAME,
+    UNIVERSE_BASE_COLUMN,
+    UNIVERSE_CHANGE_COLUMN,
+    UNIVERSE_DATA_LOCATION,
+    UNIVERSE_FILE_FORMAT,
+    UNIVERSE_SNAPSHOT_INTERVAL,
+)
+from src.util.dataframe_ops import read_compacted_dataset, read_dataset
+from src.util.exceptions import MissingUniverseBaseException
+from src.util.partitions import is_compacted_file
+from src.util.schemas import UNIVERSE_DTYPES
+from src.util.storage import apply_dtypes
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Values of UNIVERSE_CHANGE_COLUMN. Removed coins keep the last values they had.
+CHANGE_SNAPSHOT = "snapshot"
+CHANGE_UPSERT = "upsert"
+CHANGE_DELETE = "delete"
+
+
+def normalize_value(value: Any) -> Any:
+    """Value of a universe column as plain python objects, so values compare equal
+    whether they were just fetched, or read back from a .parquet file (lists as numpy
+    arrays, missing struct fields as None) or a .csv file.
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, list):
+        return [normalize_value(item) for item in value]
+    if isinstance(value, dict):
+        items = {key: normalize_value(item) for key, item in value.items()}
+        return {key: item for key, item in items.items() if item is not None}
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def row_signatures(universe: pd.DataFrame) -> pd.Series:
+    """Text of every row of a universe, by coin ID, to find the coins that changed.
+
+    Args:
+        universe (pd.DataFrame): Universe dataset
+
+    Returns:
+        pd.Series: Text of the values of each row, indexed by coin ID
+    """
+    columns = [
+        [str(normalize_value(value)) for value in universe[column]]
+        for column in universe.columns
+    ]
+    return pd.Series(
+        ["\x1f".join(values) for values in zip(*columns)],
+        index=universe["id"].to_numpy(),
+        dtype="object",
+    )
+
+
+def universe_changes(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """Coins added, changed or removed between two universes.
+
+    Args:
+        previous (pd.DataFrame): Universe of the previous execution
+        current (pd.DataFrame): Universe of the current execution, with the same columns
+
+    Returns:
+        pd.DataFrame: Added and changed coins marked as upserts, and the last values
+            of removed coins marked as deletes
+    """
+    previous = previous.reindex(columns=current.columns)
+    previous_signatures = row_signatures(previous)
+    current_signatures = row_signatures(current)
+    changed = (
+        current_signatures.reindex(current["id"]).to_numpy()
+        != previous_signatures.reindex(current["id"]).to_numpy()
+    )
+    upserts = current[changed].assign(**{UNIVERSE_CHANGE_COLUMN: CHANGE_UPSERT})
+    deletes = previous[~previous["id"].isin(current["id"])].assign(
+        **{UNIVERSE_CHANGE_COLUMN: CHANGE_DELETE}
+    )
+    if deletes.empty:
+        return upserts.reset_index(drop=True)
+    return pd.concat([upserts, deletes], ignore_index=True)
+
+
+def snapshot(universe: pd.DataFrame) -> pd.DataFrame:
+    """Universe of an execution to store in full, marked as a snapshot.
+
+    Args:
+        universe (pd.DataFrame): Full universe of the execution
+
+    Returns:
+        pd.DataFrame: Universe to store for the execution
+    """
+    # an empty universe has no rows to mark, it is read as a snapshot without the
+    # change column instead
+    if universe.empty:
+        return universe
+    return universe.assign(**{UNIVERSE_CHANGE_COLUMN: CHANGE_SNAPSHOT})
+
+
+def is_snapshot(universe: pd.DataFrame) -> bool:
+    # universes written before changes were stored have no change column, or a
+    # null change once compacted with the changes of other executions
+    if UNIVERSE_CHANGE_COLUMN not in universe.columns:
+        return True
+    if universe.empty:
+        return False
+    change = normalize_value(universe[UNIVERSE_CHANGE_COLUMN].iloc[0])
+    return change is None or change == CHANGE_SNAPSHOT
+
+
+def base_timestamp(changes: pd.DataFrame) -> Optional[str]:
+    """Execution the stored changes of an execution were found against.
+
+    Args:
+        changes (pd.DataFrame): Stored universe of an execution, the changes since
+            another execution
+
+    Returns:
+        Optional[str]: UTC Timestamp of the execution. None if not recorded, for
+            changes stored before it was, which were found against the execution
+            stored before them.
+    """
+    if UNIVERSE_BASE_COLUMN not in changes.columns or changes.empty:
+        return None
+    base = normalize_value(changes[UNIVERSE_BASE_COLUMN].iloc[0])
+    # read back as a number from .csv files
+    return str(int(base)) if isinstance(base, (int, float)) else base
+
+
+def apply_changes(
+    universe: Optional[pd.DataFrame], changes: pd.DataFrame
+) -> pd.DataFrame:
+    """Apply the stored universe of an execution to the universe before it.
+
+    Args:
+        universe (Optional[pd.DataFrame]): Universe before the execution, None if
+            there is none
+        changes (pd.DataFrame): Stored universe of the execution, a snapshot or the
+            changes since the previous execution
+
+    Returns:
+        pd.DataFrame: Universe of the execution
+    """
+    if is_snapshot(changes) or universe is None:
+        kept = None
+    else:
+        kept = universe[~universe["id"].isin(changes["id"])]
+    if UNIVERSE_CHANGE_COLUMN in changes.columns:
+        changes = changes[changes[UNIVERSE_CHANGE_COLUMN] != CHANGE_DELETE].drop(
+            columns=[UNIVERSE_CHANGE_COLUMN, UNIVERSE_BASE_COLUMN], errors="ignore"
+        )
+    if kept is None or kept.empty:
+        return changes
+    if changes.empty:
+        return kept
+    return pd.concat([kept, changes], ignore_index=True)
+
+
+class UniverseSnapshots:
+
+    def __init__(
+        self,
+        directory: str = UNIVERSE_DATA_LOCATION,
+        file_format: str = UNIVERSE_FILE_FORMAT,
+        snapshot_interval: int = UNIVERSE_SNAPSHOT_INTERVAL,
+    ):
+        """Stores the universe of each execution as the changes since the previous
+        execution, and rebuilds the full universe of any execution.
+
+        Args:
+            directory (str, optional): Directory of the universe dataset. Defaults to
+                UNIVERSE_DATA_LOCATION.
+            file_format (str, optional): File name format without extension. Defaults
+                to UNIVERSE_FILE_FORMAT.
+            snapshot_interval (int, optional): Most executions stored from one
+                snapshot to the next. Defaults to UNIVERSE_SNAPSHOT_INTERVAL.
+        """
+        self.directory = directory
+        self.file_format = file_format
+        self.snapshot_interval = snapshot_interval
+
+    def executions(self) -> List[Tuple[str, str]]:
+        return list_dataset_files(self.directory, self.file_format)
+
+    def read_chain(self, executions: List[Tuple[str, str]]) -> List[pd.DataFrame]:
+        """Read the stored universes from the last one back to the snapshot it was
+        built on, following the execution each set of changes was found against.
+
+        Args:
+            executions (List[Tuple[str, str]]): Timestamp and file path of each
+                execution up to the last one, oldest first
+
+        Raises:
+            MissingUniverseBaseException: The execution changes were found against is
+                no longer stored
+
+        Returns:
+            List[pd.DataFrame]: Stored universes from the snapshot to the last
+                execution, oldest first
+        """
+        positions = {timestamp: i for i, (timestamp, _) in enumerate(executions)}
+        chain = []
+        compacted: Dict[str, Dict[str, pd.DataFrame]] = {}
+        position = len(executions) - 1
+        while position >= 0:
+            timestamp, file_path = executions[position]
+            if is_compacted_file(file_path):
+                if file_path not in compacted:
+                    compacted[file_path] = read_compacted_dataset(
+                        file_path, UNIVERSE_DTYPES
+                    )
+                changes = compacted[file_path][timestamp]
+            else:
+                changes = read_dataset(file_path, dtypes=UNIVERSE_DTYPES)
+            chain.append(changes)
+            if is_snapshot(changes):
+                break
+            base = base_timestamp(changes)
+            if base is None:
+                position -= 1
+            elif base in positions:
+                position = positions[base]
+            else:
+                raise MissingUniverseBaseException(
+                    f"Universe of execution {timestamp} is stored as the changes since"
+                    f" execution {base}, which is no longer in '{self.directory}'."
+                )
+        return chain[::-1]
+
+    def materialize(self, timestamp: str) -> Optional[pd.DataFrame]:
+        """Rebuild the full universe of an execution.
+
+        Args:
+            timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+
+        Returns:
+            Optional[pd.DataFrame]: Universe of the execution, ordered by coin ID.
+                None if the execution has no universe.
+        """
+        executions = [
+            execution for execution in self.executions() if execution[0] <= timestamp
+        ]
+        if not executions or executions[-1][0] != timestamp:
+            return None
+        universe = None
+        for changes in self.read_chain(executions):
+            universe = apply_changes(universe, changes)
+        universe = universe.sort_values("id", ignore_index=True)
+        return apply_dtypes(universe, UNIVERSE_DTYPES)
+
+    def encode(self, timestamp: str, universe: pd.DataFrame) -> pd.DataFrame:
+        """Build the universe to store for an execution, the changes since the
+        latest execution before it or a snapshot.
+
+        A snapshot is stored for the first execution, once the last snapshot is
+        UNIVERSE_SNAPSHOT_INTERVAL executions old, and when the columns of the
+        universe change.
+
+        Args:
+            timestamp (str): UTC Timestamp of execution in YYYYMMDDHHMMSS
+            universe (pd.DataFrame): Full universe of the execution
+
+        Returns:
+            pd.DataFrame: Universe to store for the execution
+        """
+        previous = [
+            execution for execution in self.executions() if execution[0] < timestamp
+        ]
+        if not previous:
+            return snapshot(universe)
+
+        chain = self.read_chain(previous)
+        previous_universe = None
+        for changes in chain:
+            previous_universe = apply_changes(previous_universe, changes)
+        # an empty universe is always stored as changes, as an empty snapshot could
+        # not be told apart from an execution without any changes
+        if not universe.empty and (
+            len(chain) >= self.snapshot_interval
+            or set(previous_universe.columns) != set(universe.columns)
+        ):
+            return snapshot(universe)
+
+        changes = universe_changes(previous_universe, universe)
+        logger.info(
+            f"Storing {len(changes)} added, changed or removed coins of the universe of"
+            f" {len(universe)} coins"
+        )
+        if changes.empty and not universe.empty:
+            # an unchanged coin is stored again, to keep a row recording the base
+            changes = universe.iloc[:1].assign(
+                **{UNIVERSE_CHANGE_COLUMN: CHANGE_UPSERT}
+            )
+        return changes.assign(**{UNIVERSE_BASE_COLUMN: previous[-1][0]})
@@ -0,0 +1,2 @@
+from .daemon import WarmState, WorkflowDaemon
+from .dag import Task, WorkflowDag
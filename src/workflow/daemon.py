@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from os.path import join
+from typing import Any, Callable, Optional
+
+from src.api.coin_market_cap_api import CoinMarketCapApi
+from src.util.config import (
+    AVG_BITCOIN_DIFF_STATE_FILE_NAME,
+    AVG_BITCOIN_DIFF_STATE_LOCATION,
+    DAEMON_INTERVAL_SECONDS,
+    LOGGER_NAME,
+    METADATA_CACHE_FILE_NAME,
+    METADATA_CACHE_LOCATION,
+    TIMESTAMP_FORMAT,
+)
+from src.util.metadata_cache import MetadataCache
+from src.util.running_average import RunningAverageState
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class WarmState:
+
+    def __init__(self, api: Optional[CoinMarketCapApi] = None):
+        """State kept in memory between the executions of a long running process, so
+        each execution only pays for its own data work:
+
+        - the API client, keeping its pooled connections, rate limiter, circuit
+            breaker and credit count
+        - the metadata cache, so the universe step does not re-read it
+        - the running average totals, so the average difference step does not
+            re-read them
+
+        The cache and totals are re-read if their files change on disk, e.g. when
+        averages are rebuilt by another process.
+
+        Args:
+            api (Optional[CoinMarketCapApi], optional): Client shared between
+                executions. Defaults to a new client.
+        """
+        self.api = api if api is not None else CoinMarketCapApi()
+        self.metadata_cache = MetadataCache(
+            join(METADATA_CACHE_LOCATION, METADATA_CACHE_FILE_NAME)
+        )
+        self.average_state = RunningAverageState(
+            join(AVG_BITCOIN_DIFF_STATE_LOCATION, AVG_BITCOIN_DIFF_STATE_FILE_NAME)
+        )
+
+    def close(self) -> None:
+        self.api.close()
+
+
+class WorkflowDaemon:
+
+    def __init__(
+        self,
+        run: Callable[[str], Any],
+        interval_seconds: float = DAEMON_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Runs the workflow on a fixed schedule from a single long running process.
+
+        Executions start on multiples of the interval in UTC, and are timestamped
+        with the scheduled time. If the previous execution is still running when an
+        execution is due, that execution is skipped instead of running two at once.
+        A failed execution is logged and the daemon carries on with the next one.
+
+        Args:
+            run (Callable[[str], Any]): Runs a single execution, given its timestamp
+            interval_seconds (float, optional): Seconds between executions.
+                Defaults to DAEMON_INTERVAL_SECONDS.
+            clock (Callable[[], float], optional): Current epoch time.
+                Defaults to time.time.
+        """
+        self.run = run
+        self.interval_seconds = interval_seconds
+        self.clock = clock
+        self.stopped = threading.Event()
+        self.running: Optional[threading.Thread] = None
+        self.runs = 0
+        self.skipped = 0
+
+    def next_tick(self, now: float) -> float:
+        """Epoch time of the next scheduled execution after now"""
+        return (now // self.interval_seconds + 1) * self.interval_seconds
+
+    def tick(self, timestamp: str) -> bool:
+        """Start an execution in the background, unless the previous one is still
+        running.
+
+        Args:
+            timestamp (str): Timestamp of the execution in YYYYMMDDHHMMSS format
+
+        Returns:
+            bool: True if the execution was started, False if it was skipped
+        """
+        if self.running is not None and self.running.is_alive():
+            self.skipped += 1
+            logger.warning(
+                f"Skipping execution {timestamp}, the previous execution is still running"
+            )
+            return False
+        self.runs += 1
+        self.running = threading.Thread(
+            target=self.run_execution, args=(timestamp,), name=f"workflow-{timestamp}"
+        )
+        self.running.start()
+        return True
+
+    def run_execution(self, timestamp: str) -> None:
+        try:
+            self.run(timestamp)
+        except Exception:
+            logger.exception(f"Execution {timestamp} failed, waiting for the next one")
+
+    def serve(self) -> None:
+        """Run executions on schedule until stopped. Waits for the running execution
+        to finish before returning.
+        """
+        logger.info(
+            f"Running the workflow every {self.interval_seconds:g} seconds, "
+            "stop with Ctrl+C or SIGTERM"
+        )
+        tick_at = 0.0
+        while not self.stopped.is_set():
+            now = self.clock()
+            # never the same tick twice, even if the wait returned a little early
+            tick_at = self.next_tick(max(now, tick_at))
+            if self.stopped.wait(max(0.0, tick_at - now)):
+                break
+            timestamp = datetime.fromtimestamp(tick_at, timezone.utc)
+            self.tick(timestamp.strftime(TIMESTAMP_FORMAT))
+
+        if self.running is not None and self.running.is_alive():
+            logger.info("Waiting for the running execution to finish")
+            self.running.join()
+        logger.info(
+            f"Daemon stopped after {self.runs} executions, {self.skipped} skipped"
+        )
+
+    def stop(self, *_) -> None:
+        """Stop scheduling executions. Can be used as a signal handler"""
+        self.stopped.set()
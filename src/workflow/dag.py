@@ -0,0 +1,184 @@
+import contextlib
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from src.util.config import LOGGER_NAME, WORKFLOW_MAX_WORKERS
+from src.util.exceptions import WorkflowDefinitionException
+from src.util.metrics import RunReport
+from src.util.profiling import StepProfiler
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class Task:
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], Any],
+        depends_on: Optional[List[str]] = None,
+        description: Optional[str] = None,
+    ):
+        """A single unit of work in the workflow, along with the tasks that must
+        complete before it can start.
+
+        Args:
+            name (str): Unique name of the task within the workflow
+            run (Callable[[], Any]): Function that performs the work
+            depends_on (Optional[List[str]], optional): Names of tasks that must complete
+                first. Defaults to None.
+            description (Optional[str], optional): Message logged when the task starts.
+                Defaults to None.
+        """
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on or [])
+        self.description = description
+
+
+class WorkflowDag:
+
+    def __init__(
+        self,
+        max_workers: int = WORKFLOW_MAX_WORKERS,
+        report: Optional[RunReport] = None,
+        profiler: Optional[StepProfiler] = None,
+    ):
+        """Workflow declared as a dependency graph of tasks. Each task starts as soon
+        as all of its dependencies have completed, so independent tasks run alongside
+        each other.
+
+        Args:
+            max_workers (int, optional): Max number of tasks running at once.
+                Defaults to WORKFLOW_MAX_WORKERS.
+            report (Optional[RunReport], optional): Report the metrics of each task
+                are collected in. Defaults to None.
+            profiler (Optional[StepProfiler], optional): Profiler of the tasks to
+                profile. Tasks run one at a time when profiled. Defaults to None.
+        """
+        self.max_workers = 1 if profiler is not None else max_workers
+        self.tasks: Dict[str, Task] = {}
+        self.report = report
+        self.profiler = profiler
+
+    def add_task(
+        self,
+        name: str,
+        run: Callable[[], Any],
+        depends_on: Optional[List[str]] = None,
+        description: Optional[str] = None,
+    ) -> Task:
+        """Declare a task in the workflow. See Task for arguments.
+
+        Raises:
+            WorkflowDefinitionException: Raised if a task with the name already exists
+
+        Returns:
+            Task: The declared task
+        """
+        if name in self.tasks:
+            raise WorkflowDefinitionException(f"Task '{name}' is declared twice")
+        task = Task(name, run, depends_on, description)
+        self.tasks[name] = task
+        return task
+
+    def validate(self) -> None:
+        """Confirm every dependency and task to profile is a declared task, and there
+        are no cycles.
+
+        Raises:
+            WorkflowDefinitionException: Raised if the graph can never complete
+        """
+        for task in self.tasks.values():
+            unknown = [dep for dep in task.depends_on if dep not in self.tasks]
+            if unknown:
+                raise WorkflowDefinitionException(
+                    f"Task '{task.name}' depends on undeclared tasks: {unknown}"
+                )
+        if self.profiler is not None and self.profiler.steps is not None:
+            unknown = [name for name in self.profiler.steps if name not in self.tasks]
+            if unknown:
+                raise WorkflowDefinitionException(
+                    f"Cannot profile undeclared tasks: {unknown}. "
+                    f"Declared tasks are: {list(self.tasks)}"
+                )
+
+        # Kahn's algorithm, any task never freed up is part of a cycle
+        remaining = {name: len(task.depends_on) for name, task in self.tasks.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        while ready:
+            done = ready.pop()
+            del remaining[done]
+            for name in self.dependents(done):
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    ready.append(name)
+        if remaining:
+            raise WorkflowDefinitionException(
+                f"Tasks have circular dependencies: {sorted(remaining)}"
+            )
+
+    def dependents(self, name: str) -> List[str]:
+        return [task.name for task in self.tasks.values() if name in task.depends_on]
+
+    def run_task(self, task: Task) -> Any:
+        """Run a single task, collecting its metrics in the report and profiling it
+        if there is one
+        """
+        with contextlib.ExitStack() as stack:
+            if self.report is not None:
+                stack.enter_context(self.report.step(task.name))
+            if self.profiler is not None:
+                stack.enter_context(self.profiler.profile(task.name))
+            return task.run()
+
+    def run(self) -> Dict[str, Any]:
+        """Run every task in the workflow, starting each one as soon as its
+        dependencies have completed.
+
+        If a task fails no new tasks are started. Tasks that are already running are
+        allowed to finish before the failure is raised.
+
+        Raises:
+            WorkflowDefinitionException: Raised if the graph can never complete
+            Exception: The first exception raised by a task
+
+        Returns:
+            Dict[str, Any]: Return value of each task, keyed by task name
+        """
+        self.validate()
+        results: Dict[str, Any] = {}
+        remaining = {name: set(task.depends_on) for name, task in self.tasks.items()}
+        running: Dict[Future, str] = {}
+        failure: Optional[Exception] = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def submit_ready() -> None:
+                for name in [name for name, deps in remaining.items() if not deps]:
+                    del remaining[name]
+                    task = self.tasks[name]
+                    if task.description:
+                        logger.info(task.description)
+                    running[executor.submit(self.run_task, task)] = name
+
+            submit_ready()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Workflow task '{name}' failed")
+                        failure = failure or e
+                        continue
+                    for deps in remaining.values():
+                        deps.discard(name)
+                if failure is None:
+                    submit_ready()
+
+        if failure is not None:
+            raise failure
+        return results
@@ -1,9 +1,16 @@
+import json
+from os.path import join
+from test.helpers import TestConstants as tc
 from test.helpers import example_listings_api_return, example_metadata_api_return
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
 from src.api.coin_market_cap_api import CoinMarketCapApi
+from src.api.credit_budget import CreditBudget
+from src.api.rate_limiter import TokenBucket
+from src.util.batch_checkpoint import BatchCheckpoint
+from src.util.exceptions import RateLimitedException
 
 # NOTE: Test Constants and helpers live in test.helpers to
 #  avoid repeat work
@@ -21,6 +28,26 @@ class TestCoinMarketCapApi:
         # this is imperfect since we are mocking, but need to make sure we are paginating
         assert len(listings) >= 10648
 
+    def test_get_all_listings_concurrent(self):
+        api = CoinMarketCapApi()
+        total_count = 12000
+
+        def get_page(start, limit, aux=None):
+            # market shifts by one coin after the first page, repeating its last row
+            offset = start - 1 if start == 1 else start - 2
+            ids = range(offset, min(offset + limit, total_count))
+            return {
+                "status": {"total_count": total_count},
+                "data": [{"id": i} for i in ids],
+            }
+
+        with patch.object(api, "get_latest_listings", side_effect=get_page):
+            listings = api.get_all_latest_listings(concurrent=True)
+
+        ids = [listing["id"] for listing in listings]
+        assert len(ids) == len(set(ids)), "Repeated listings are deduplicated"
+        assert ids == sorted(ids), "Pages are merged back in order"
+
     @patch(
         "src.api.coin_market_cap_api.CoinMarketCapApi.get_metadata",
         return_value=example_metadata_api_return(),
@@ -37,3 +64,105 @@ class TestCoinMarketCapApi:
         # There should be 3 calls made for 500 ids.
         # Total list should have 4 x 3 = 12 objects
         assert len(metadata_objs) == 12
+
+    @patch("requests.Session.get")
+    def test_get_latest_quotes(self, mock_session_get):
+        with open(tc.MOCK_QUOTES_API_RESPONSE_LOCATION, "rb") as file:
+            content = file.read()
+        mock_session_get.return_value = MagicMock(
+            status_code=200, content=content, json=lambda: json.loads(content)
+        )
+        credit_budget = CreditBudget(monthly_budget=None, ledger_file=None)
+        api = CoinMarketCapApi(credit_budget=credit_budget)
+
+        quotes = api.get_latest_quotes(["BTC", "LUNA"])
+
+        params = mock_session_get.call_args.kwargs["params"]
+        assert params["symbol"] == "BTC,LUNA"
+        # every coin of every symbol in the response, including inactive coins
+        assert len(quotes) == 20
+        assert quotes[0]["name"] == "Bitcoin"
+        assert credit_budget.used == 1, "Credits of the response are counted"
+
+    def test_listings_aux_for_columns(self):
+        aux = CoinMarketCapApi.listings_aux_for_columns(
+            ["id", "platform.id", "quote.USD.price", "cmc_rank"]
+        )
+        assert aux == ["cmc_rank", "platform"]
+
+    @patch("requests.Session.get")
+    def test_get_latest_listings_aux(self, mock_session_get):
+        mock_session_get.return_value = MagicMock(status_code=200, content=b"{}")
+        api = CoinMarketCapApi()
+
+        api.get_latest_listings(1, 5000, aux=["cmc_rank"])
+
+        assert mock_session_get.call_args.kwargs["params"]["aux"] == "cmc_rank"
+
+    def test_session_is_pooled(self):
+        api = CoinMarketCapApi(pool_size=4)
+        adapter = api.session.get_adapter("https://pro-api.coinmarketcap.com/")
+        assert adapter._pool_maxsize == 4
+        assert "gzip" in api.session.headers["Accept-Encoding"]
+
+    @patch("requests.Session.get")
+    def test_timing_hooks(self, mock_session_get):
+        mock_session_get.return_value = MagicMock(status_code=200, content=b"{}")
+        api = CoinMarketCapApi()
+        timings = []
+        api.timing_hooks.append(lambda res, seconds: timings.append(seconds))
+
+        api.get("https://pro-api.coinmarketcap.com/v1/cryptocurrency/info", {})
+
+        assert len(timings) == 1
+        assert timings[0] >= 0
+
+    def test_get_metadata_safe_concurrent(self):
+        api = CoinMarketCapApi(rate_limiter=TokenBucket(60000, capacity=10))
+        ids = list(range(1000))
+        # echo back one object per id so order can be verified
+        with patch.object(
+            api,
+            "request_metadata",
+            side_effect=lambda batch: [{"id": i} for i in batch],
+        ):
+            metadata_objs = api.get_metadata_safe(ids, concurrent=True, max_workers=4)
+
+        assert [obj["id"] for obj in metadata_objs] == ids
+
+    @patch("requests.Session.get")
+    def test_rate_limited_pauses_bucket(self, mock_session_get):
+        mock_session_get.return_value = MagicMock(
+            status_code=429, content=b"{}", headers={"Retry-After": "5"}
+        )
+        bucket = TokenBucket(60000, capacity=10)
+        api = CoinMarketCapApi(rate_limiter=bucket)
+
+        with pytest.raises(RateLimitedException) as e:
+            api.get("https://pro-api.coinmarketcap.com/v1/cryptocurrency/info", {})
+
+        assert e.value.retry_after == 5
+        assert bucket.paused_until > 0
+
+    def test_get_metadata_safe_resumes_from_checkpoint(self):
+        checkpoint = BatchCheckpoint(
+            join(tc.TEMP_UNIVERSE_CHECKPOINT_DIRECTORY, tc.TEST_TIMESTAMP)
+        )
+        ids = list(range(500))
+        # the first batch completed in a previous execution
+        checkpoint.save(0, ids[:240], [{"id": i} for i in ids[:240]])
+
+        api = CoinMarketCapApi()
+        try:
+            with patch.object(
+                api,
+                "get_metadata",
+                side_effect=lambda batch: [{"id": i} for i in batch],
+            ) as mock_get_metadata:
+                metadata_objs = api.get_metadata_safe(ids, checkpoint=checkpoint)
+
+            assert mock_get_metadata.call_count == 2, "Completed batch is not requested"
+            assert [obj["id"] for obj in metadata_objs] == ids
+            assert checkpoint.load(2, ids[480:]) is not None, "New batches are saved"
+        finally:
+            checkpoint.clear()
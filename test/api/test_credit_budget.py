@@ -0,0 +1,52 @@
+from os.path import join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pytest
+
+from src.api.credit_budget import CreditBudget
+from src.util.exceptions import CreditBudgetExceededException
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp API Credits Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_API_CREDITS_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_API_CREDITS_DIRECTORY)
+
+
+class TestCreditBudget:
+
+    def test_budget_is_enforced(self):
+        budget = CreditBudget(monthly_budget=10, ledger_file=None)
+        budget.record(4)
+        budget.check()
+        budget.record(6)
+
+        assert budget.remaining == 0
+        with pytest.raises(CreditBudgetExceededException):
+            budget.check()
+
+    def test_credits_persist_between_executions(self, clean_test_directory):
+        ledger_file = join(tc.TEMP_API_CREDITS_DIRECTORY, "credit_ledger.sqlite3")
+        CreditBudget(monthly_budget=100, ledger_file=ledger_file).record(25)
+
+        assert CreditBudget(monthly_budget=100, ledger_file=ledger_file).remaining == 75
+
+    def test_credits_are_shared_between_executions(self, clean_test_directory):
+        ledger_file = join(tc.TEMP_API_CREDITS_DIRECTORY, "credit_ledger.sqlite3")
+        budget = CreditBudget(monthly_budget=100, ledger_file=ledger_file)
+        other_budget = CreditBudget(monthly_budget=100, ledger_file=ledger_file)
+
+        budget.record(25)
+        other_budget.record(10)
+        budget.record(1)
+
+        assert budget.remaining == 64
+        assert other_budget.remaining == 64
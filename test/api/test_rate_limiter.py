@@ -0,0 +1,72 @@
+import time
+from os.path import join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pytest
+
+from src.api.rate_limiter import (
+    DEFAULT_RETRY_AFTER_SECONDS,
+    SharedTokenBucket,
+    TokenBucket,
+    parse_retry_after,
+)
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Rate Limit Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_RATE_LIMIT_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_RATE_LIMIT_DIRECTORY)
+
+
+class TestRateLimiter:
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after("12") == 12
+        assert parse_retry_after(None) == DEFAULT_RETRY_AFTER_SECONDS
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+    def test_token_bucket_spaces_requests(self):
+        # 10 requests per second, no burst
+        bucket = TokenBucket(600, capacity=1)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        # first token is available immediately, the next two take 0.1s each
+        assert time.monotonic() - start >= 0.18
+
+    def test_token_bucket_pause(self):
+        bucket = TokenBucket(60000, capacity=5)
+        bucket.pause(0.2)
+        start = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - start >= 0.18
+
+    def test_shared_token_bucket_spans_clients(self, clean_test_directory):
+        # two buckets on the same database, as two workflow processes would have
+        db_file = join(tc.TEMP_RATE_LIMIT_DIRECTORY, "rate_limit.sqlite3")
+        first = SharedTokenBucket(600, capacity=1, db_file=db_file)
+        second = SharedTokenBucket(600, capacity=1, db_file=db_file)
+        start = time.monotonic()
+        first.acquire()
+        second.acquire()
+        first.acquire()
+        # only the first token is free, the rate is shared between both buckets
+        assert time.monotonic() - start >= 0.18
+        first.close()
+        second.close()
+
+    def test_shared_token_bucket_pause(self, clean_test_directory):
+        db_file = join(tc.TEMP_RATE_LIMIT_DIRECTORY, "rate_limit.sqlite3")
+        first = SharedTokenBucket(60000, capacity=5, db_file=db_file)
+        second = SharedTokenBucket(60000, capacity=5, db_file=db_file)
+        first.pause(0.2)
+        start = time.monotonic()
+        second.acquire()
+        assert time.monotonic() - start >= 0.18
+        first.close()
+        second.close()
@@ -0,0 +1,73 @@
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from src.api.retry_policy import CircuitBreaker, RetryPolicy
+from src.util.exceptions import CircuitOpenException, RateLimitedException
+
+
+def http_error(status_code: int) -> requests.HTTPError:
+    return requests.HTTPError(response=MagicMock(status_code=status_code))
+
+
+class TestRetryPolicy:
+
+    def test_rate_limited_waits_for_retry_after(self):
+        sleeps = []
+        policy = RetryPolicy(base_delay=2, sleep=sleeps.append)
+        request = MagicMock(side_effect=[RateLimitedException("429", 7.5), "ok"])
+
+        assert policy.call(request) == "ok"
+        assert sleeps == [7.5], "Waits exactly as long as the server asks"
+
+    def test_server_errors_back_off(self):
+        sleeps = []
+        policy = RetryPolicy(base_delay=2, max_delay=5, sleep=sleeps.append)
+        request = MagicMock(
+            side_effect=[
+                http_error(503),
+                requests.ConnectionError(),
+                http_error(500),
+                1,
+            ]
+        )
+
+        assert policy.call(request) == 1
+        assert sleeps == [2, 4, 5]
+
+    def test_fatal_error_is_not_retried(self):
+        policy = RetryPolicy(sleep=lambda seconds: None)
+        request = MagicMock(side_effect=http_error(401))
+
+        with pytest.raises(requests.HTTPError):
+            policy.call(request)
+        assert request.call_count == 1
+
+    def test_gives_up_after_max_attempts(self):
+        policy = RetryPolicy(max_attempts=3, sleep=lambda seconds: None)
+        request = MagicMock(side_effect=requests.Timeout())
+
+        with pytest.raises(requests.Timeout):
+            policy.call(request)
+        assert request.call_count == 3
+
+    def test_circuit_opens_after_repeated_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        policy = RetryPolicy(
+            max_attempts=5, circuit_breaker=breaker, sleep=lambda seconds: None
+        )
+        request = MagicMock(side_effect=http_error(502))
+
+        with pytest.raises(CircuitOpenException):
+            policy.call(request)
+        assert request.call_count == 2, "Fails fast once the circuit is open"
+        assert breaker.is_open
+
+    def test_circuit_closes_after_successful_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        policy = RetryPolicy(circuit_breaker=breaker, sleep=lambda seconds: None)
+
+        assert policy.call(lambda: "ok") == "ok"
+        assert not breaker.is_open
@@ -0,0 +1,131 @@
+import json
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pytest
+import requests
+
+from src.api.coin_market_cap_api import CoinMarketCapApi
+from src.api.credit_budget import CreditBudget
+from src.api.rate_limiter import TokenBucket
+from src.api.response_recorder import ResponseRecorder, load_recordings, save_recording
+from src.api.retry_policy import RetryPolicy
+from src.api.stand_in_server import (
+    INFO_PATH,
+    LISTINGS_PATH,
+    QUOTES_PATH,
+    LatencyModel,
+    RecordedData,
+    StandInServer,
+)
+from src.util.exceptions import RateLimitedException
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+@pytest.fixture
+def recorded_data():
+    """Recordings of each endpoint built from the mock API responses. Written to the
+    Temp API Recordings Directory, which is cleaned up before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_API_RECORDINGS_DIRECTORY)
+    with open(tc.MOCK_QUOTES_API_RESPONSE_LOCATION, "r") as file:
+        quotes = json.load(file)
+    with open(tc.MOCK_METADATA_API_RESPONSE_LOCATION, "r") as file:
+        metadata = json.load(file)
+    # the active coins quoted double as the latest listings
+    listings = {
+        "status": quotes["status"],
+        "data": [
+            quote
+            for coins in quotes["data"].values()
+            for quote in coins
+            if quote["cmc_rank"] is not None
+        ],
+    }
+    save_recording(tc.TEMP_API_RECORDINGS_DIRECTORY, LISTINGS_PATH, {}, listings, 0.2)
+    save_recording(tc.TEMP_API_RECORDINGS_DIRECTORY, QUOTES_PATH, {}, quotes, 0.1)
+    save_recording(tc.TEMP_API_RECORDINGS_DIRECTORY, INFO_PATH, {}, metadata, 0.1)
+    yield RecordedData(tc.TEMP_API_RECORDINGS_DIRECTORY)
+    delete_directory_contents(tc.TEMP_API_RECORDINGS_DIRECTORY)
+
+
+def stand_in_api(server: StandInServer) -> CoinMarketCapApi:
+    api = CoinMarketCapApi(
+        rate_limiter=TokenBucket(60000, capacity=100),
+        retry_policy=RetryPolicy(max_attempts=1),
+        credit_budget=CreditBudget(monthly_budget=None, ledger_file=None),
+    )
+    api.host = server.url
+    return api
+
+
+class TestStandInServer:
+
+    def test_recorded_data(self, recorded_data):
+        assert len(recorded_data.listings) == 19, "Only active coins are listed"
+        ranks = [listing["cmc_rank"] for listing in recorded_data.listings]
+        assert ranks == sorted(ranks), "Listings are served by rank"
+        assert recorded_data.latencies == [0.1, 0.2, 0.1]
+
+    @pytest.mark.parametrize("concurrent", [False, True])
+    def test_listings_are_paginated(self, recorded_data, concurrent):
+        with StandInServer(recorded_data) as server:
+            api = stand_in_api(server)
+            api.LISTINGS_PAGE_LIMIT = 5
+            listings = api.get_all_latest_listings(concurrent=concurrent)
+            first_page = api.get_latest_listings(1, 5, aux=["cmc_rank"])
+
+        assert [listing["id"] for listing in listings] == [
+            listing["id"] for listing in recorded_data.listings
+        ]
+        assert first_page["status"]["total_count"] == 19
+        assert "cmc_rank" in first_page["data"][0]
+        assert "tags" not in first_page["data"][0], "Fields not in 'aux' are left out"
+
+    def test_quotes_and_metadata(self, recorded_data):
+        with StandInServer(recorded_data) as server:
+            api = stand_in_api(server)
+            quotes = api.get_latest_quotes(["BTC", "LUNA", "NOT_A_COIN"])
+            metadata = api.get_metadata(["1", "74"])
+
+        assert sorted(quote["symbol"] for quote in quotes) == ["BTC", "LUNA", "LUNA"]
+        assert [coin["symbol"] for coin in metadata] == ["BTC", "DOGE"]
+
+    def test_uri_length_limit(self, recorded_data):
+        with StandInServer(recorded_data, max_uri_length=100) as server:
+            api = stand_in_api(server)
+            with pytest.raises(requests.HTTPError) as e:
+                api.get_metadata([str(id) for id in range(1, 100)])
+
+        assert e.value.response.status_code == 414
+
+    def test_rate_limit(self, recorded_data):
+        with StandInServer(recorded_data, requests_per_minute=2) as server:
+            api = stand_in_api(server)
+            api.get_latest_quotes(["BTC"])
+            api.get_latest_quotes(["ETH"])
+            with pytest.raises(RateLimitedException) as e:
+                api.request_latest_quotes(["SOL"])
+
+        assert 0 < e.value.retry_after <= 60
+
+    def test_recorded_latency_is_replayed(self, recorded_data):
+        latency = LatencyModel(samples=[0.25], seed=1)
+        assert latency.sample() == 0.25
+        assert LatencyModel(median=0.1, seed=1).sample() > 0
+        assert LatencyModel().sample() == 0
+
+    def test_record_mode(self, recorded_data):
+        with StandInServer(recorded_data) as server:
+            api = stand_in_api(server)
+            delete_directory_contents(tc.TEMP_API_RECORDINGS_DIRECTORY)
+            api.timing_hooks.append(ResponseRecorder(tc.TEMP_API_RECORDINGS_DIRECTORY))
+            api.get_latest_quotes(["BTC"])
+
+        recordings = list(load_recordings(tc.TEMP_API_RECORDINGS_DIRECTORY))
+        assert len(recordings) == 1
+        assert recordings[0]["path"] == QUOTES_PATH
+        assert recordings[0]["params"]["symbol"] == "BTC"
+        assert recordings[0]["body"]["data"]["BTC"][0]["id"] == 1
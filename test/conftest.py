@@ -0,0 +1,15 @@
+import pytest
+
+import src.util.catalog as catalog_module
+
+
+@pytest.fixture(autouse=True)
+def temp_catalog(tmp_path, monkeypatch):
+    """Every test uses its own data lake catalog in a temp directory, so reading the
+    mock data lake never writes a catalog into it, or into the production data lake.
+    """
+    catalog_file = str(tmp_path / "catalog.sqlite3")
+    monkeypatch.setenv("DATA_LAKE_CATALOG_FILE", catalog_file)
+    monkeypatch.setattr(catalog_module, "DATA_LAKE_CATALOG_FILE", catalog_file)
+    monkeypatch.setattr(catalog_module, "_catalogs", {})
+    yield catalog_file
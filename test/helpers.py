@@ -1,5 +1,6 @@
 import json
 import os
+import shutil
 from os.path import dirname, join
 from typing import Dict, List
 
@@ -22,6 +23,9 @@ class TestConstants:
     MOCK_METADATA_API_RESPONSE_LOCATION = join(
         dirname(__file__), "mock_api_response/example_metadata_v1_res.json"
     )
+    MOCK_QUOTES_API_RESPONSE_LOCATION = join(
+        dirname(__file__), "mock_api_response/example_quotes_latest_res.json"
+    )
 
     # Mock data locations, to be read in for test cases
     MOCK_AVG_BITCOIN_DIFF_DIRECTORY = join(
@@ -36,12 +40,20 @@ class TestConstants:
     MOCK_BAD_CONFIGURATION_FILE_NAME = "bad_coins_to_track.csv"
     MOCK_LISTINGS_DIRECTORY = join(dirname(__file__), "mock_data_lake/listings")
     MOCK_PRICING_DIRECTORY = join(dirname(__file__), "mock_data_lake/pricing")
+    MOCK_QUOTES_DIRECTORY = join(dirname(__file__), "mock_data_lake/quotes")
     MOCK_UNIVERSE_DIRECTORY = join(dirname(__file__), "mock_data_lake/universe")
 
     # Temp data locations, to be written to from test cases and cleaned up
+    TEMP_API_RECORDINGS_DIRECTORY = join(
+        dirname(__file__), "temp_data_lake/api_recordings"
+    )
+    TEMP_API_CREDITS_DIRECTORY = join(dirname(__file__), "temp_data_lake/api_credits")
     TEMP_AVG_BITCOIN_DIFF_DIRECTORY = join(
         dirname(__file__), "temp_data_lake/avg_bitcoin_diff"
     )
+    TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY = join(
+        dirname(__file__), "temp_data_lake/avg_bitcoin_diff_state"
+    )
     TEMP_BITCOIN_COMPARISONS_DIRECTORY = join(
         dirname(__file__), "temp_data_lake/bitcoin_comparison"
     )
@@ -49,8 +61,17 @@ class TestConstants:
         dirname(__file__), "temp_data_lake/configuration"
     )
     TEMP_LISTINGS_DIRECTORY = join(dirname(__file__), "temp_data_lake/listings")
+    TEMP_METADATA_CACHE_DIRECTORY = join(
+        dirname(__file__), "temp_data_lake/metadata_cache"
+    )
     TEMP_PRICING_DIRECTORY = join(dirname(__file__), "temp_data_lake/pricing")
+    TEMP_PROFILES_DIRECTORY = join(dirname(__file__), "temp_data_lake/profiles")
+    TEMP_RATE_LIMIT_DIRECTORY = join(dirname(__file__), "temp_data_lake/rate_limit")
+    TEMP_QUOTES_DIRECTORY = join(dirname(__file__), "temp_data_lake/quotes")
     TEMP_UNIVERSE_DIRECTORY = join(dirname(__file__), "temp_data_lake/universe")
+    TEMP_UNIVERSE_CHECKPOINT_DIRECTORY = join(
+        dirname(__file__), "temp_data_lake/universe_checkpoints"
+    )
 
 
 # GENERAL HELPERS
@@ -68,6 +89,9 @@ def delete_directory_contents(directory: str) -> None:
         # .mark_keep is how we keep the folders around in the git repo.
         if os.path.isfile(file_path) and ".mark_keep" not in file_path:
             os.remove(file_path)
+        # date partitions of the partitioned data lake layout
+        elif os.path.isdir(file_path) and filename.startswith("date="):
+            shutil.rmtree(file_path)
 
 
 # API RESPONSE HELPERS
@@ -97,3 +121,16 @@ def example_metadata_api_return() -> List[Dict]:
     with open(TestConstants.MOCK_METADATA_API_RESPONSE_LOCATION, "r") as file:
         jsn = json.load(file)
         return list(jsn["data"].values())
+
+
+def example_quotes_api_return() -> List[Dict]:
+    """Retrieve the example return from the quotes call, flattened into a list of
+    quotes the same way as in the API class.
+
+    Returns:
+        List[Dict]: List of the quotes on coins that would be returned by the
+            quotes API
+    """
+    with open(TestConstants.MOCK_QUOTES_API_RESPONSE_LOCATION, "r") as file:
+        jsn = json.load(file)
+        return [quote for quotes in jsn["data"].values() for quote in quotes]
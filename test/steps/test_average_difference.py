@@ -2,10 +2,14 @@ import os
 from os.path import dirname, exists, join
 from test.helpers import TestConstants as tc
 from test.helpers import delete_directory_contents
+from unittest.mock import patch
 
+import pandas as pd
 import pytest
 
 from src.steps.average_difference import AverageDifferenceStep
+from src.util.dataframe_ops import read_csv
+from src.util.running_average import RunningAverageState
 
 # NOTE: Test Constants and helpers live in test.helpers to
 #  avoid repeat work
@@ -17,8 +21,10 @@ def clean_test_directory():
     before and after tests.
     """
     delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY)
+    delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY)
     yield
     delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY)
+    delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY)
 
 
 class TestAverageDifference:
@@ -27,6 +33,7 @@ class TestAverageDifference:
         step = AverageDifferenceStep(tc.TEST_TIMESTAMP)
         step.bitcoin_comparison_directory = tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY
         step.avg_bitcoin_diff_directory = tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY
+        step.avg_bitcoin_diff_state_directory = tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY
 
         df = step.generate_average_difference()
 
@@ -38,3 +45,102 @@ class TestAverageDifference:
         assert exists(
             tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY
         ), "Test data should have been written out to the data lake location"
+
+    def test_generate_average_difference_incremental(self, clean_test_directory):
+        step = AverageDifferenceStep(tc.TEST_TIMESTAMP)
+        step.bitcoin_comparison_directory = tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY
+        step.avg_bitcoin_diff_directory = tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY
+        step.avg_bitcoin_diff_state_directory = tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY
+        # running totals saved by the previous execution
+        previous_state = RunningAverageState(step.avg_bitcoin_diff_state_file)
+        previous_state.apply(
+            "20250115000000",
+            read_csv(
+                join(
+                    tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY,
+                    "bitcoin_comparison_20250115000000.csv",
+                )
+            ),
+            "Symbol",
+            "BitcoinVsCurrency24hPercentChangeDiff",
+        )
+        previous_state.save()
+
+        with patch.object(step, "iter_bitcoin_comparisons") as mock_iter:
+            df = step.generate_average_difference()
+
+        mock_iter.assert_not_called()
+        expected = (
+            step.read_all_bitcoin_comparisons()
+            .groupby("Symbol")["BitcoinVsCurrency24hPercentChangeDiff"]
+            .mean()
+        )
+        averages = df.set_index("Symbol")["AvgBitcoinVsCurrency24hPercentChangeDiff"]
+        pd.testing.assert_series_equal(
+            averages.sort_index(), expected.sort_index(), check_names=False
+        )
+
+    def test_generate_average_difference_warm_state(self, clean_test_directory):
+        step = AverageDifferenceStep(tc.TEST_TIMESTAMP)
+        step.bitcoin_comparison_directory = tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY
+        step.avg_bitcoin_diff_directory = tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY
+        step.avg_bitcoin_diff_state_directory = tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY
+        # running totals kept in memory by a daemon between executions
+        step.average_state = RunningAverageState(step.avg_bitcoin_diff_state_file)
+
+        step.generate_average_difference()
+        assert step.average_state.totals
+
+        with patch.object(RunningAverageState, "load") as mock_load:
+            assert step.load_average_state() is step.average_state
+        mock_load.assert_not_called()
+
+        # re-read once another process changes the state file
+        other_state = RunningAverageState(step.avg_bitcoin_diff_state_file)
+        other_state.save()
+        assert step.load_average_state().totals == {}
+
+    def test_generate_average_difference_concurrent_execution(
+        self, clean_test_directory
+    ):
+        step = AverageDifferenceStep(tc.TEST_TIMESTAMP)
+        step.bitcoin_comparison_directory = tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY
+        step.avg_bitcoin_diff_directory = tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY
+        step.avg_bitcoin_diff_state_directory = tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY
+        RunningAverageState(step.avg_bitcoin_diff_state_file).save()
+
+        def load_during_other_execution():
+            state = RunningAverageState(step.avg_bitcoin_diff_state_file).load()
+            # another execution saves its comparison after this one loaded the totals
+            other_state = RunningAverageState(step.avg_bitcoin_diff_state_file).load()
+            other_state.apply(
+                "20250115000000",
+                read_csv(
+                    join(
+                        tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY,
+                        "bitcoin_comparison_20250115000000.csv",
+                    )
+                ),
+                "Symbol",
+                "BitcoinVsCurrency24hPercentChangeDiff",
+            )
+            other_state.save()
+            return state
+
+        with patch.object(
+            step, "load_average_state", side_effect=load_during_other_execution
+        ):
+            df = step.generate_average_difference()
+
+        expected = (
+            step.read_all_bitcoin_comparisons()
+            .groupby("Symbol")["BitcoinVsCurrency24hPercentChangeDiff"]
+            .mean()
+        )
+        averages = df.set_index("Symbol")["AvgBitcoinVsCurrency24hPercentChangeDiff"]
+        pd.testing.assert_series_equal(
+            averages.sort_index(), expected.sort_index(), check_names=False
+        )
+        assert RunningAverageState(
+            step.avg_bitcoin_diff_state_file
+        ).load().applied_timestamps == {"20250115000000", tc.TEST_TIMESTAMP}
@@ -42,3 +42,10 @@ class TestBitcoinComparison:
         assert exists(
             tc.TEMP_BITCOIN_COMPARISONS_DIRECTORY
         ), "File should have been written out to data lake location"
+
+    def test_bitcoin_percent_change_from_quotes(self):
+        step = BitcoinComparisonStep(tc.TEST_TIMESTAMP, pricing_mode="quotes")
+        # Overwriting data location properties to use predictable test locations
+        step.quotes_file_directory = tc.MOCK_QUOTES_DIRECTORY
+
+        assert step.bitcoin_percent_change_24h() == pytest.approx(2.76610597)
@@ -8,6 +8,7 @@ import pytest
 from pandas import DataFrame
 
 from src.steps.listings import ListingsStep
+from src.util.dataframe_ops import read_dataset
 
 # NOTE: Test Constants and helpers live in test.helpers to
 #  avoid repeat work
@@ -38,6 +39,8 @@ class TestListings:
         listings_step = ListingsStep(tc.TEST_TIMESTAMP)
         # Overwriting data location properties to use predictable test locations
         listings_step.listings_base_path = tc.TEMP_LISTINGS_DIRECTORY
+        # Mock returns the same page every call, keep to the sequential path
+        listings_step.concurrent_fetch = False
         df = listings_step.generate_listings()
 
         assert len(df) == 15000
@@ -45,3 +48,37 @@ class TestListings:
         assert exists(
             tc.TEMP_LISTINGS_DIRECTORY
         ), "Test data should have been written out to data lake location"
+
+    @patch(
+        "src.api.coin_market_cap_api.CoinMarketCapApi.get_latest_listings",
+        return_value=example_listings_api_return(),
+    )
+    def test_stream_listings(self, mock_get_latest_listings, clean_test_directory):
+        listings_step = ListingsStep(tc.TEST_TIMESTAMP)
+        # Overwriting data location properties to use predictable test locations
+        listings_step.listings_base_path = tc.TEMP_LISTINGS_DIRECTORY
+        listings_step.streaming = True
+        df = listings_step.generate_listings()
+
+        assert df is None, "Streamed listings are not held in memory"
+        assert mock_get_latest_listings.call_count == 3
+        assert len(read_dataset(listings_step.listings_file)) == 15000
+
+    @patch(
+        "src.api.coin_market_cap_api.CoinMarketCapApi.get_latest_listings",
+        return_value=example_listings_api_return(),
+    )
+    def test_generate_listings_selected_fields(
+        self, mock_get_latest_listings, clean_test_directory
+    ):
+        listings_step = ListingsStep(
+            tc.TEST_TIMESTAMP, columns=["id", "cmc_rank", "quote.USD.price"]
+        )
+        # Overwriting data location properties to use predictable test locations
+        listings_step.listings_base_path = tc.TEMP_LISTINGS_DIRECTORY
+        listings_step.concurrent_fetch = False
+        df = listings_step.generate_listings()
+
+        assert mock_get_latest_listings.call_args.kwargs["aux"] == ["cmc_rank"]
+        assert "cmc_rank" in df.columns
+        assert "tags" not in df.columns, "Optional fields not requested are not kept"
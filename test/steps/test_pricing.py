@@ -1,10 +1,10 @@
 import os
-from os.path import exists
+from os.path import exists, join
 from test.helpers import TestConstants as tc
 from test.helpers import delete_directory_contents
 
 import pytest
-from pandas import DataFrame
+from pandas import DataFrame, read_csv
 
 from src.steps.pricing import PricingStep
 from src.util.exceptions import InvalidSymbolException
@@ -63,3 +63,18 @@ class TestPricingStep:
         assert exists(
             tc.TEMP_PRICING_DIRECTORY
         ), "Test data should have been written out to the data lake location"
+
+    def test_generate_pricing_from_quotes(self, clean_test_directory):
+        pricing = PricingStep(tc.TEST_TIMESTAMP, pricing_mode="quotes")
+        # Overwriting data location properties to use predictable test locations
+        pricing.configuration_file_directory = tc.MOCK_CONFIGURATION_DIRECTORY
+        pricing.quotes_file_directory = tc.MOCK_QUOTES_DIRECTORY
+        pricing.pricing_file_directory = tc.TEMP_PRICING_DIRECTORY
+
+        df = pricing.generate_pricing()
+        expected_df = read_csv(
+            join(tc.MOCK_PRICING_DIRECTORY, f"coins_pricing_{tc.TEST_TIMESTAMP}.csv")
+        )
+
+        assert list(df.columns) == list(expected_df.columns)
+        assert list(df["Symbol"]) == list(expected_df["Symbol"])
@@ -0,0 +1,50 @@
+from os.path import dirname, exists, join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents, example_quotes_api_return
+from unittest.mock import patch
+
+import pytest
+
+from src.steps.quotes import QuotesStep
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Quotes Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_QUOTES_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_QUOTES_DIRECTORY)
+
+
+class TestQuotes:
+
+    def test_quotes_base_path(self):
+        path = QuotesStep(tc.TEST_TIMESTAMP).quotes_base_path
+        expected_path = join(dirname(dirname(dirname(__file__))), "data_lake/quotes")
+        assert path == expected_path
+
+    @patch(
+        "src.api.coin_market_cap_api.CoinMarketCapApi.get_latest_quotes",
+        return_value=example_quotes_api_return(),
+    )
+    def test_generate_quotes(self, mock_get_latest_quotes, clean_test_directory):
+        quotes_step = QuotesStep(tc.TEST_TIMESTAMP)
+        # Overwriting data location properties to use predictable test locations
+        quotes_step.configuration_file_directory = tc.MOCK_CONFIGURATION_DIRECTORY
+        quotes_step.quotes_base_path = tc.TEMP_QUOTES_DIRECTORY
+        df = quotes_step.generate_quotes()
+
+        symbols = mock_get_latest_quotes.call_args.args[0]
+        assert symbols[0] == "BTC"
+        assert len(symbols) == len(set(symbols)), "Bitcoin is only requested once"
+        # the inactive coin sharing the LUNA symbol is left out
+        assert len(df) == 19
+        assert "Terra Classic" not in list(df["name"])
+        assert exists(
+            quotes_step.quotes_file
+        ), "Test data should have been written out to data lake location"
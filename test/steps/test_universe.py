@@ -7,6 +7,8 @@ from unittest.mock import patch
 import pytest
 
 from src.steps.universe import UniverseStep
+from src.util.config import UNIVERSE_CHANGE_COLUMN
+from src.util.dataframe_ops import read_dataset
 
 # NOTE: Test Constants and helpers live in test.helpers to
 #  avoid repeat work
@@ -18,8 +20,10 @@ def clean_test_directory():
     before and after tests.
     """
     delete_directory_contents(tc.TEMP_UNIVERSE_DIRECTORY)
+    delete_directory_contents(tc.TEMP_METADATA_CACHE_DIRECTORY)
     yield
     delete_directory_contents(tc.TEMP_UNIVERSE_DIRECTORY)
+    delete_directory_contents(tc.TEMP_METADATA_CACHE_DIRECTORY)
 
 
 class TestUniverse:
@@ -39,6 +43,12 @@ class TestUniverse:
         # Overwriting data location properties to use predictable test locations
         universe_step.universe_base_path = tc.TEMP_UNIVERSE_DIRECTORY
         universe_step.listings_base_path = tc.MOCK_LISTINGS_DIRECTORY
+        universe_step.universe_checkpoint_base_path = (
+            tc.TEMP_UNIVERSE_CHECKPOINT_DIRECTORY
+        )
+        # Mock is on the sequential fetch path, and returns the same ids every call
+        universe_step.concurrent_fetch = False
+        universe_step.incremental = False
         df = universe_step.generate_universe()
 
         # Little hacky, but there are 150000 ids in the mock list.
@@ -49,3 +59,73 @@ class TestUniverse:
         assert exists(
             tc.TEMP_UNIVERSE_DIRECTORY
         ), "Test data should have been written out to the data lake location"
+
+    def test_generate_universe_incremental(self, clean_test_directory):
+        universe_step = UniverseStep(tc.TEST_TIMESTAMP)
+        # Overwriting data location properties to use predictable test locations
+        universe_step.universe_base_path = tc.TEMP_UNIVERSE_DIRECTORY
+        universe_step.listings_base_path = tc.MOCK_LISTINGS_DIRECTORY
+        universe_step.metadata_cache_directory = tc.TEMP_METADATA_CACHE_DIRECTORY
+        universe_step.universe_checkpoint_base_path = (
+            tc.TEMP_UNIVERSE_CHECKPOINT_DIRECTORY
+        )
+
+        with patch(
+            "src.api.coin_market_cap_api.CoinMarketCapApi.get_metadata_safe",
+            side_effect=lambda ids, **kwargs: [{"id": i, "name": "Coin"} for i in ids],
+        ) as mock_get_metadata_safe:
+            df = universe_step.generate_universe()
+            assert mock_get_metadata_safe.call_count == 1
+            assert len(df) == 15000
+
+            # A later run finds every id in the cache and makes no calls
+            delete_directory_contents(tc.TEMP_UNIVERSE_DIRECTORY)
+            df = universe_step.generate_universe()
+            assert mock_get_metadata_safe.call_count == 1
+            assert len(df) == 15000, "Universe is still complete when served from cache"
+
+    @patch(
+        "src.api.coin_market_cap_api.CoinMarketCapApi.get_metadata",
+        side_effect=lambda ids: [{"id": i, "name": "Coin"} for i in ids],
+    )
+    def test_generate_universe_without_deltas(
+        self, mock_get_metadata, clean_test_directory
+    ):
+        universe_step = UniverseStep(tc.TEST_TIMESTAMP)
+        universe_step.universe_base_path = tc.TEMP_UNIVERSE_DIRECTORY
+        universe_step.listings_base_path = tc.MOCK_LISTINGS_DIRECTORY
+        universe_step.universe_checkpoint_base_path = (
+            tc.TEMP_UNIVERSE_CHECKPOINT_DIRECTORY
+        )
+        universe_step.concurrent_fetch = False
+        universe_step.incremental = False
+        universe_step.deltas = False
+        df = universe_step.generate_universe()
+
+        # stored in full, still marked as a snapshot so it is never read as changes
+        stored = read_dataset(universe_step.universe_file)
+        assert len(stored) == len(df)
+        assert set(stored[UNIVERSE_CHANGE_COLUMN]) == {"snapshot"}
+
+    @patch(
+        "src.api.coin_market_cap_api.CoinMarketCapApi.get_metadata",
+        side_effect=lambda ids: [{"id": i, "name": "Coin"} for i in ids],
+    )
+    def test_generate_universe_clears_checkpoints(
+        self, mock_get_metadata, clean_test_directory
+    ):
+        universe_step = UniverseStep(tc.TEST_TIMESTAMP)
+        # Overwriting data location properties to use predictable test locations
+        universe_step.universe_base_path = tc.TEMP_UNIVERSE_DIRECTORY
+        universe_step.listings_base_path = tc.MOCK_LISTINGS_DIRECTORY
+        universe_step.universe_checkpoint_base_path = (
+            tc.TEMP_UNIVERSE_CHECKPOINT_DIRECTORY
+        )
+        universe_step.concurrent_fetch = False
+        universe_step.incremental = False
+
+        universe_step.generate_universe()
+
+        assert not exists(
+            universe_step.universe_checkpoint_directory
+        ), "Checkpoints should be removed once the universe dataset is written"
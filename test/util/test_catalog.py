@@ -0,0 +1,154 @@
+import os
+from os.path import dirname, exists, join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+import src.util.catalog as catalog_module
+from src.util.catalog import (
+    dataset_exists,
+    find_dataset_files,
+    get_catalog,
+    list_dataset_files,
+)
+from src.util.config import PRICING_FILE_FORMAT
+from src.util.dataframe_ops import open_dataset_writer, write_dataset
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Pricing Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_PRICING_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_PRICING_DIRECTORY)
+
+
+def pricing_file(timestamp: str, extension: str = ".csv") -> str:
+    return join(
+        tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT.format(timestamp) + extension
+    )
+
+
+def cataloged_file(file_name: str):
+    connection = get_catalog().connect()
+    return connection.execute(
+        "SELECT status, row_count, schema_hash FROM files WHERE dataset = ?"
+        " AND partition = '' AND file_name = ?",
+        (os.path.abspath(tc.TEMP_PRICING_DIRECTORY), file_name),
+    ).fetchone()
+
+
+class TestCatalog:
+
+    def test_written_datasets_are_cataloged(self, clean_test_directory):
+        df = pd.DataFrame({"Symbol": ["BTC", "ETH"], "Price": [100.0, 10.0]})
+        write_dataset(pricing_file(tc.TEST_TIMESTAMP), df)
+        with open_dataset_writer(pricing_file("20250117000000", ".parquet")) as writer:
+            writer.write(df)
+            writer.write(df)
+
+        status, row_count, schema_hash = cataloged_file(
+            f"coins_pricing_{tc.TEST_TIMESTAMP}.csv"
+        )
+        assert (status, row_count) == ("complete", 2)
+        assert schema_hash is not None
+        assert cataloged_file("coins_pricing_20250117000000.parquet")[:2] == (
+            "complete",
+            4,
+        )
+        assert list_dataset_files(tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT) == [
+            (tc.TEST_TIMESTAMP, pricing_file(tc.TEST_TIMESTAMP)),
+            ("20250117000000", pricing_file("20250117000000", ".parquet")),
+        ]
+
+        # a failed write never shows up as a dataset
+        with pytest.raises(ValueError):
+            with open_dataset_writer(pricing_file("20250118000000")) as writer:
+                writer.write(df)
+                raise ValueError("Failed part way through")
+        assert cataloged_file("coins_pricing_20250118000000.csv") is None
+        assert not dataset_exists(pricing_file("20250118000000"))
+
+    def test_files_changed_outside_the_catalog_are_synced(self, clean_test_directory):
+        df = pd.DataFrame({"Symbol": ["BTC"], "Price": [100.0]})
+        write_dataset(pricing_file(tc.TEST_TIMESTAMP), df)
+        assert dataset_exists(pricing_file(tc.TEST_TIMESTAMP))
+
+        os.remove(pricing_file(tc.TEST_TIMESTAMP))
+        df.to_csv(pricing_file("20250117000000"), index=False)
+
+        assert not dataset_exists(pricing_file(tc.TEST_TIMESTAMP))
+        assert find_dataset_files(
+            tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT, "20250117000000"
+        ) == [pricing_file("20250117000000")]
+        # found by the sync, so not yet described
+        assert cataloged_file("coins_pricing_20250117000000.csv") == (
+            "complete",
+            None,
+            None,
+        )
+
+    def test_writes_keep_the_catalog_in_sync(self, clean_test_directory):
+        df = pd.DataFrame({"Symbol": ["BTC"], "Price": [100.0]})
+        write_dataset(pricing_file(tc.TEST_TIMESTAMP), df)
+        list_dataset_files(tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT)
+
+        with patch.object(
+            catalog_module, "list_directory", wraps=catalog_module.list_directory
+        ) as mock_list:
+            for timestamp in ["20250117000000", "20250118000000"]:
+                write_dataset(pricing_file(timestamp), df)
+                assert dataset_exists(pricing_file(timestamp))
+
+        # the dataset directory is never re-read, only missing partitions are looked
+        # for
+        assert not [
+            call.args[0] for call in mock_list.call_args_list if exists(call.args[0])
+        ]
+        assert [
+            timestamp
+            for timestamp, _ in list_dataset_files(
+                tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT
+            )
+        ] == [tc.TEST_TIMESTAMP, "20250117000000", "20250118000000"]
+
+    def test_rebuild(self, clean_test_directory):
+        df = pd.DataFrame({"Symbol": ["BTC", "ETH", "SOL"], "Price": [1.0, 2.0, 3.0]})
+        df.to_csv(pricing_file(tc.TEST_TIMESTAMP), index=False)
+        df.to_parquet(pricing_file("20250117000000", ".parquet"), index=False)
+        df.to_csv(join(tc.TEMP_PRICING_DIRECTORY, "notes.csv"), index=False)
+
+        counts = get_catalog().rebuild(dirname(tc.TEMP_PRICING_DIRECTORY))
+
+        assert counts["pricing"] == 2
+        assert cataloged_file(f"coins_pricing_{tc.TEST_TIMESTAMP}.csv")[1] == 3
+        assert cataloged_file("coins_pricing_20250117000000.parquet")[1] == 3
+        assert cataloged_file("notes.csv") is None
+
+    def test_filesystem_is_read_when_disabled(self, clean_test_directory, monkeypatch):
+        monkeypatch.setattr(catalog_module, "DATA_LAKE_CATALOG", False)
+        df = pd.DataFrame({"Symbol": ["BTC"], "Price": [100.0]})
+        write_dataset(pricing_file(tc.TEST_TIMESTAMP), df)
+
+        assert get_catalog() is None
+        assert dataset_exists(pricing_file(tc.TEST_TIMESTAMP))
+        assert list_dataset_files(tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT) == [
+            (tc.TEST_TIMESTAMP, pricing_file(tc.TEST_TIMESTAMP))
+        ]
+
+    def test_catalog_is_kept_at_the_configured_location(self, temp_catalog):
+        assert list_dataset_files(
+            tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY, "bitcoin_comparison_{}"
+        )
+
+        assert get_catalog().db_file == temp_catalog
+        assert os.path.exists(temp_catalog)
+        # nothing is written into the lake that was read
+        assert not os.path.exists(
+            join(dirname(tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY), "catalog.sqlite3")
+        )
@@ -0,0 +1,148 @@
+import os
+from os.path import join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pandas as pd
+import pytest
+
+import src.util.catalog as catalog_module
+from src.util.catalog import dataset_exists, list_dataset_files
+from src.util.compaction import compact_dataset
+from src.util.config import DATASET_LOCATIONS, PRICING_DATASET, PRICING_FILE_FORMAT
+from src.util.dataframe_ops import read_dataset, write_dataset
+from src.util.partitions import compacted_file
+from src.util.storage import dataset_file
+
+EXECUTIONS = ["20250116000000", "20250116120000", "20250117000000"]
+
+
+@pytest.fixture
+def clean_test_directory(monkeypatch):
+    """Test writes out to Temp Pricing Directory. Need to clean up
+    before and after tests.
+    """
+    monkeypatch.setitem(
+        DATASET_LOCATIONS,
+        PRICING_DATASET,
+        (tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT),
+    )
+    delete_directory_contents(tc.TEMP_PRICING_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_PRICING_DIRECTORY)
+
+
+def pricing_file(timestamp: str) -> str:
+    return dataset_file(
+        tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT, timestamp, PRICING_DATASET
+    )
+
+
+def pricing_df(timestamp: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ID": [1, 1027],
+            "Name": ["Bitcoin", "Ethereum"],
+            "Symbol": ["BTC", "ETH"],
+            "PercentChange24h": [float(timestamp[-6:-4]), 2.5],
+        }
+    )
+
+
+def write_executions():
+    for timestamp in EXECUTIONS:
+        write_dataset(pricing_file(timestamp), pricing_df(timestamp))
+    # written before the lake was partitioned
+    flat_file = join(tc.TEMP_PRICING_DIRECTORY, "coins_pricing_20250115000000.csv")
+    pricing_df("20250115000000").to_csv(flat_file, index=False)
+
+
+class TestCompaction:
+
+    def test_files_are_written_into_partitions(self, clean_test_directory):
+        write_executions()
+
+        assert pricing_file(tc.TEST_TIMESTAMP) == join(
+            tc.TEMP_PRICING_DIRECTORY,
+            "date=2025-01-16",
+            f"coins_pricing_{tc.TEST_TIMESTAMP}.csv",
+        )
+        # files of the flat layout are still found where they are
+        assert pricing_file("20250115000000") == join(
+            tc.TEMP_PRICING_DIRECTORY, "coins_pricing_20250115000000.csv"
+        )
+        assert [
+            timestamp
+            for timestamp, _ in list_dataset_files(
+                tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT
+            )
+        ] == ["20250115000000"] + EXECUTIONS
+
+    def test_compacted_executions_are_read_by_timestamp(self, clean_test_directory):
+        write_executions()
+
+        merged = compact_dataset(PRICING_DATASET, before="2025-01-17")
+
+        assert merged == {"2025-01-15": 1, "2025-01-16": 2}
+        compacted = compacted_file(
+            tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT, "2025-01-16"
+        )
+        assert os.listdir(join(tc.TEMP_PRICING_DIRECTORY, "date=2025-01-16")) == [
+            os.path.basename(compacted)
+        ]
+        for timestamp in ["20250115000000"] + EXECUTIONS:
+            assert dataset_exists(pricing_file(timestamp))
+            pd.testing.assert_frame_equal(
+                read_dataset(pricing_file(timestamp)), pricing_df(timestamp)
+            )
+        assert list_dataset_files(tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT)[
+            1:3
+        ] == [(timestamp, compacted) for timestamp in EXECUTIONS[:2]]
+
+        # an execution re-run after compaction replaces its compacted rows
+        rerun_df = pricing_df(tc.TEST_TIMESTAMP).head(1)
+        write_dataset(pricing_file(tc.TEST_TIMESTAMP), rerun_df)
+        pd.testing.assert_frame_equal(
+            read_dataset(pricing_file(tc.TEST_TIMESTAMP)), rerun_df
+        )
+        assert compact_dataset(PRICING_DATASET, before="2025-01-17") == {
+            "2025-01-16": 1
+        }
+        pd.testing.assert_frame_equal(
+            read_dataset(pricing_file(tc.TEST_TIMESTAMP)), rerun_df
+        )
+        assert compact_dataset(PRICING_DATASET, before="2025-01-17") == {}
+
+    def test_compacted_executions_are_read_when_disabled(
+        self, clean_test_directory, monkeypatch
+    ):
+        monkeypatch.setattr(catalog_module, "DATA_LAKE_CATALOG", False)
+        write_executions()
+
+        compact_dataset(PRICING_DATASET, before="2025-01-17")
+
+        assert dataset_exists(pricing_file(tc.TEST_TIMESTAMP))
+        assert not dataset_exists(pricing_file("20250116060000"))
+        pd.testing.assert_frame_equal(
+            read_dataset(pricing_file("20250116120000")), pricing_df("20250116120000")
+        )
+        assert (
+            len(list_dataset_files(tc.TEMP_PRICING_DIRECTORY, PRICING_FILE_FORMAT)) == 4
+        )
+
+    def test_compaction_keeps_values_of_every_execution(self, clean_test_directory):
+        first, second = EXECUTIONS[:2]
+        # a column without values in the first execution, and a column added later
+        first_df = pricing_df(first).assign(PercentChange24h=None)
+        second_df = pricing_df(second).assign(MarketCap=[1.5e12, 4e11])
+        write_dataset(pricing_file(first), first_df)
+        write_dataset(pricing_file(second), second_df)
+
+        assert compact_dataset(PRICING_DATASET, before="2025-01-17") == {
+            "2025-01-16": 2
+        }
+
+        pd.testing.assert_frame_equal(
+            read_dataset(pricing_file(second)), second_df, check_dtype=False
+        )
+        assert read_dataset(pricing_file(first))["PercentChange24h"].isna().all()
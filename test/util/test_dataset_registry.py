@@ -0,0 +1,87 @@
+from os.path import join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.util.dataframe_ops import read_dataset
+from src.util.dataset_registry import DatasetRegistry
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Pricing Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_PRICING_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_PRICING_DIRECTORY)
+
+
+class TestDatasetRegistry:
+
+    def test_write_then_read_from_memory(self, clean_test_directory):
+        registry = DatasetRegistry()
+        file_path = join(tc.TEMP_PRICING_DIRECTORY, "coins_pricing_test.csv")
+        registry.write(file_path, pd.DataFrame({"Symbol": ["BTC", "ETH"]}))
+
+        with patch("src.util.dataset_registry.read_dataset") as mock_read_dataset:
+            df = registry.read(file_path)
+
+        mock_read_dataset.assert_not_called()
+        assert list(df["Symbol"]) == ["BTC", "ETH"]
+
+    def test_read_from_disk_once(self):
+        registry = DatasetRegistry()
+        file_path = join(
+            tc.MOCK_PRICING_DIRECTORY, f"coins_pricing_{tc.TEST_TIMESTAMP}.csv"
+        )
+
+        with patch(
+            "src.util.dataset_registry.read_dataset", wraps=read_dataset
+        ) as mock_read_dataset:
+            registry.read(file_path)
+            registry.read(file_path)
+
+        assert mock_read_dataset.call_count == 1
+
+    def test_read_is_isolated_from_new_columns(self):
+        registry = DatasetRegistry()
+        registry.put("pricing", pd.DataFrame({"Symbol": ["BTC"]}))
+
+        df = registry.read("pricing")
+        df["BitcoinPercentChange24h"] = 1.0
+
+        assert "BitcoinPercentChange24h" not in registry.read("pricing").columns
+
+    def test_projected_read_from_memory(self):
+        registry = DatasetRegistry()
+        registry.put(
+            "listings",
+            pd.DataFrame({"name": ["Bitcoin", "Ethereum"], "cmc_rank": [1, 2]}),
+        )
+
+        with patch("src.util.dataset_registry.read_dataset") as mock_read_dataset:
+            df = registry.read(
+                "listings", columns=["cmc_rank"], filters=[("name", "==", "Ethereum")]
+            )
+
+        mock_read_dataset.assert_not_called()
+        assert list(df.columns) == ["cmc_rank"]
+        assert list(df["cmc_rank"]) == [2]
+
+    def test_projected_read_from_disk_is_not_held(self):
+        registry = DatasetRegistry()
+        file_path = join(
+            tc.MOCK_PRICING_DIRECTORY, f"coins_pricing_{tc.TEST_TIMESTAMP}.csv"
+        )
+
+        df = registry.read(file_path, columns=["Symbol"])
+
+        assert list(df.columns) == ["Symbol"]
+        assert registry.get(file_path) is None
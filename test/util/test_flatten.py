@@ -0,0 +1,50 @@
+from test.helpers import example_listings_api_return, example_metadata_api_return
+
+import pandas as pd
+
+from src.util.flatten import LIST_FIELD, flatten_records
+from src.util.schemas import LISTINGS_FIELDS, UNIVERSE_FIELDS
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+class TestFlatten:
+
+    def test_flatten_nested_and_missing_fields(self):
+        records = [
+            {"id": 1, "tags": ["pow"], "quote": {"USD": {"price": 1.5}}},
+            {"id": 2, "tags": None, "quote": None, "not_declared": True},
+        ]
+        fields = {"id": "int64", "tags": LIST_FIELD, "quote.USD.price": "float64"}
+
+        df = flatten_records(records, fields)
+
+        assert list(df.columns) == ["id", "tags", "quote.USD.price"]
+        assert df["id"].dtype == "int64"
+        assert list(df["tags"]) == [["pow"], []]
+        assert df["quote.USD.price"][0] == 1.5
+        assert pd.isna(df["quote.USD.price"][1])
+
+    def test_flatten_keeps_type_that_fits(self):
+        df = flatten_records([{"id": 1}, {"id": None}], {"id": "int64"})
+        assert list(df["id"][:1]) == [1]
+        assert pd.isna(df["id"][1])
+
+    def test_flatten_listings_matches_json_normalize(self):
+        listings = example_listings_api_return()["data"]
+
+        df = flatten_records(listings, LISTINGS_FIELDS)
+        expected_df = pd.json_normalize(listings)
+
+        assert len(df) == len(expected_df)
+        for column in ["id", "symbol", "cmc_rank", "quote.USD.percent_change_24h"]:
+            assert list(df[column]) == list(expected_df[column])
+
+    def test_flatten_universe(self):
+        metadata = example_metadata_api_return()
+
+        df = flatten_records(metadata, UNIVERSE_FIELDS)
+
+        assert len(df) == len(metadata)
+        assert list(df["urls.website"][0]) == metadata[0]["urls"]["website"]
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from test.helpers import TestConstants as tc
+
+import pytest
+
+from src.util.dataframe_ops import read_dataset
+from src.util.metrics import RunReport, mark_skipped, propagate_context, record
+
+
+class TestMetrics:
+
+    def test_step_collects_metrics(self):
+        report = RunReport("20250116000000", "listings")
+        with report.step("listings"):
+            record(api_calls=2, credits_used=25)
+            record(api_calls=1, rate_limited=1)
+        record(api_calls=5)  # outside of a step, not counted
+
+        step = report.to_dict()["steps"][0]
+        assert step["status"] == "succeeded"
+        assert step["api_calls"] == 3
+        assert step["rate_limited"] == 1
+        assert step["credits_used"] == 25
+        assert step["duration_seconds"] >= 0
+
+    def test_worker_threads_record_to_step(self):
+        report = RunReport("20250116000000")
+        with report.step("universe"):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(
+                    executor.map(
+                        propagate_context(lambda _: record(retries=1)), range(8)
+                    )
+                )
+                # without the context of the step, worker threads record nothing
+                list(executor.map(lambda _: record(retries=1), range(8)))
+
+        assert report.to_dict()["steps"][0]["retries"] == 8
+
+    def test_dataset_reads_are_recorded(self):
+        report = RunReport("20250116000000")
+        file_path = join(tc.MOCK_QUOTES_DIRECTORY, "crypto_quotes_20250116000000.csv")
+        with report.step("pricing"):
+            df = read_dataset(file_path)
+
+        step = report.to_dict()["steps"][0]
+        assert step["rows_in"] == len(df)
+        assert step["bytes_read"] > 0
+
+    def test_skipped_and_failed_steps(self):
+        report = RunReport("20250116000000")
+        with report.step("listings"):
+            mark_skipped()
+        with pytest.raises(ValueError):
+            with report.step("pricing"):
+                raise ValueError("invalid coins to track")
+        report.finish(succeeded=False)
+
+        listings, pricing = report.to_dict()["steps"]
+        assert listings["skipped"] and listings["status"] == "succeeded"
+        assert pricing["status"] == "failed"
+        assert report.to_dict()["status"] == "failed"
+
+    def test_prometheus_textfile(self):
+        report = RunReport("20250116000000")
+        with report.step("listings"):
+            record(rows_out=10648)
+        report.finish(succeeded=True)
+
+        lines = report.to_prometheus().splitlines()
+        assert "# TYPE crypto_tracker_step_rows_out gauge" in lines
+        assert 'crypto_tracker_step_rows_out{step="listings"} 10648.0' in lines
+        assert "crypto_tracker_run_success 1.0" in lines
@@ -0,0 +1,68 @@
+import os
+import time
+from os.path import exists, join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pandas as pd
+import pytest
+
+from src.util.profiling import StepProfiler
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Profiles Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_PROFILES_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_PROFILES_DIRECTORY)
+
+
+def merge_frames() -> pd.DataFrame:
+    left = pd.DataFrame({"ID": range(20000), "Symbol": [f"C{i}" for i in range(20000)]})
+    right = pd.DataFrame(
+        {"ID": range(20000), "Price": [float(i) for i in range(20000)]}
+    )
+    # long enough for the stack sampler to take a few samples
+    time.sleep(0.05)
+    return left.merge(right, on="ID")
+
+
+class TestProfiling:
+
+    def test_profile_writes_every_output(self, clean_test_directory):
+        profiler = StepProfiler(tc.TEMP_PROFILES_DIRECTORY)
+        with profiler.profile("pricing"):
+            merge_frames()
+
+        with open(join(tc.TEMP_PROFILES_DIRECTORY, "pricing_cpu.txt")) as file:
+            assert "merge_frames" in file.read()
+        with open(join(tc.TEMP_PROFILES_DIRECTORY, "pricing_allocations.txt")) as file:
+            assert file.readline().startswith("Peak traced memory:")
+        assert exists(join(tc.TEMP_PROFILES_DIRECTORY, "pricing.prof"))
+
+        with open(join(tc.TEMP_PROFILES_DIRECTORY, "pricing.collapsed")) as file:
+            stacks = file.read().splitlines()
+        assert stacks
+        for line in stacks:
+            stack, count = line.rsplit(" ", 1)
+            assert stack.startswith("pricing;") and int(count) > 0
+        assert any("test.util.test_profiling:merge_frames" in line for line in stacks)
+
+    def test_profile_writes_on_failure(self, clean_test_directory):
+        profiler = StepProfiler(tc.TEMP_PROFILES_DIRECTORY)
+        with pytest.raises(ValueError):
+            with profiler.profile("pricing"):
+                raise ValueError("invalid coins to track")
+        assert exists(join(tc.TEMP_PROFILES_DIRECTORY, "pricing.prof"))
+
+    def test_only_selected_steps_are_profiled(self, clean_test_directory):
+        profiler = StepProfiler(tc.TEMP_PROFILES_DIRECTORY, ["universe"])
+        with profiler.profile("pricing"):
+            merge_frames()
+        assert os.listdir(tc.TEMP_PROFILES_DIRECTORY) == [".mark_keep"]
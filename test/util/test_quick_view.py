@@ -0,0 +1,143 @@
+import subprocess
+import sys
+from os.path import basename, dirname, join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pandas as pd
+import pytest
+
+from src.util.compaction import compact_dataset
+from src.util.config import (
+    AVG_BITCOIN_DIFF_DATASET,
+    AVG_BITCOIN_DIFF_FILE_FORMAT,
+    BITCOIN_COMPARISON_FILE_FORMAT,
+    DATASET_LOCATIONS,
+)
+from src.util.dataframe_ops import write_dataset
+from src.util.partitions import is_compacted_file, write_directory
+from src.util.quick_view import latest_dataset, read_table
+from src.util.schemas import AVG_BITCOIN_DIFF_DTYPES
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Avg Bitcoin Diff Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY)
+
+
+class TestQuickView:
+
+    def test_latest_dataset(self):
+        timestamp, file_path = latest_dataset(
+            tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY, BITCOIN_COMPARISON_FILE_FORMAT
+        )
+        assert timestamp == tc.TEST_TIMESTAMP
+        assert basename(file_path) == f"bitcoin_comparison_{tc.TEST_TIMESTAMP}.csv"
+
+        timestamp, file_path = latest_dataset(
+            tc.MOCK_BITCOIN_COMPARISONS_DIRECTORY,
+            BITCOIN_COMPARISON_FILE_FORMAT,
+            "20250115000000",
+        )
+        assert timestamp == "20250115000000"
+        assert basename(file_path) == "bitcoin_comparison_20250115000000.csv"
+        assert (
+            latest_dataset(
+                tc.MOCK_AVG_BITCOIN_DIFF_DIRECTORY,
+                AVG_BITCOIN_DIFF_FILE_FORMAT,
+                "20200101000000",
+            )
+            is None
+        )
+
+    def test_read_table_matches_pandas(self):
+        timestamp, file_path = latest_dataset(
+            tc.MOCK_AVG_BITCOIN_DIFF_DIRECTORY, AVG_BITCOIN_DIFF_FILE_FORMAT
+        )
+        headers, rows = read_table(file_path, timestamp, AVG_BITCOIN_DIFF_DTYPES)
+        df = pd.read_csv(file_path)
+
+        assert headers == list(df.columns)
+        assert rows == df.values.tolist()
+
+    def test_read_table_keeps_symbols_as_text(self, clean_test_directory):
+        file_path = join(
+            tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY,
+            f"avg_bitcoin_diff_{tc.TEST_TIMESTAMP}.csv",
+        )
+        with open(file_path, "w") as file:
+            file.write(
+                "Symbol,AvgBitcoinVsCurrency24hPercentChangeDiff\n00,-1.5\n1E2,3\n"
+            )
+
+        headers, rows = read_table(file_path, dtypes=AVG_BITCOIN_DIFF_DTYPES)
+
+        assert rows == [["00", -1.5], ["1E2", 3.0]]
+
+    def test_read_table_of_parquet_files(self, clean_test_directory, monkeypatch):
+        monkeypatch.setitem(
+            DATASET_LOCATIONS,
+            AVG_BITCOIN_DIFF_DATASET,
+            (tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY, AVG_BITCOIN_DIFF_FILE_FORMAT),
+        )
+        executions = {
+            "20250116000000": pd.DataFrame(
+                {
+                    "Symbol": ["ETH", "SOL"],
+                    "AvgBitcoinVsCurrency24hPercentChangeDiff": [-1.5, 3.0],
+                }
+            ),
+            "20250116120000": pd.DataFrame(
+                {
+                    "Symbol": ["ETH"],
+                    "AvgBitcoinVsCurrency24hPercentChangeDiff": [2.5],
+                }
+            ),
+        }
+        for timestamp, df in executions.items():
+            # written to the partition of the day, e.g. 'date=2025-01-16'
+            write_dataset(
+                join(
+                    write_directory(tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY, timestamp),
+                    f"{AVG_BITCOIN_DIFF_FILE_FORMAT.format(timestamp)}.parquet",
+                ),
+                df,
+            )
+
+        def assert_read(timestamp: str, compacted: bool):
+            found, file_path = latest_dataset(
+                tc.TEMP_AVG_BITCOIN_DIFF_DIRECTORY,
+                AVG_BITCOIN_DIFF_FILE_FORMAT,
+                timestamp,
+            )
+            assert is_compacted_file(file_path) == compacted
+            headers, rows = read_table(file_path, found, AVG_BITCOIN_DIFF_DTYPES)
+            assert headers == list(executions[timestamp].columns)
+            assert rows == executions[timestamp].values.tolist()
+
+        for timestamp in executions:
+            assert_read(timestamp, compacted=False)
+        assert compact_dataset(AVG_BITCOIN_DIFF_DATASET, before="2025-01-17") == {
+            "2025-01-16": 2
+        }
+        for timestamp in executions:
+            assert_read(timestamp, compacted=True)
+
+    def test_cli_commands_do_not_import_pandas(self):
+        # dashboards shell out to 'show' and 'status', which must start fast
+        res = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, crypto_tracker_workflow; print('pandas' in sys.modules)",
+            ],
+            cwd=dirname(dirname(dirname(__file__))),
+            capture_output=True,
+            text=True,
+        )
+        assert res.stdout.strip() == "False"
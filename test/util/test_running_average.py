@@ -0,0 +1,61 @@
+import json
+from os.path import join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pandas as pd
+import pytest
+
+from src.util.running_average import RunningAverageState
+
+STATE_FILE = join(
+    tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY, "avg_bitcoin_diff_state.json"
+)
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Avg Bitcoin Diff State Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_AVG_BITCOIN_DIFF_STATE_DIRECTORY)
+
+
+def comparison(value: float) -> pd.DataFrame:
+    return pd.DataFrame({"Symbol": ["ETH"], "Diff": [value]})
+
+
+class TestRunningAverageState:
+
+    def test_applied_timestamps_are_bounded(self, clean_test_directory):
+        state = RunningAverageState(STATE_FILE, reorder_window_hours=24)
+        for day in range(10, 20):
+            assert state.apply(f"202501{day}000000", comparison(day), "Symbol", "Diff")
+        state.save()
+
+        state = RunningAverageState(STATE_FILE, reorder_window_hours=24).load()
+        assert state.latest_timestamp == "20250119000000"
+        assert state.applied_timestamps == {"20250118000000", "20250119000000"}
+        assert state.averages() == {"ETH": 14.5}
+        # an execution within the window is applied once, older ones are not applied
+        assert state.apply("20250118120000", comparison(1), "Symbol", "Diff")
+        assert not state.apply("20250118120000", comparison(1), "Symbol", "Diff")
+        assert not state.apply("20250115000000", comparison(1), "Symbol", "Diff")
+        assert state.totals["ETH"]["count"] == 11
+
+    def test_state_without_latest_timestamp_is_loaded(self, clean_test_directory):
+        with open(STATE_FILE, "w") as file:
+            json.dump(
+                {
+                    "applied_timestamps": ["20250101000000", "20250116000000"],
+                    "totals": {"ETH": {"sum": 3.0, "count": 2}},
+                },
+                file,
+            )
+
+        state = RunningAverageState(STATE_FILE).load()
+        assert state.latest_timestamp == "20250116000000"
+        assert state.applied_timestamps == {"20250116000000"}
+        assert not state.apply("20250101000000", comparison(1), "Symbol", "Diff")
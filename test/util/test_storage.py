@@ -0,0 +1,168 @@
+from os.path import exists, join
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pandas as pd
+import pytest
+
+from src.util.config import LISTINGS_DATASET, PRICING_DATASET
+from src.util.exceptions import (
+    DatasetSchemaMismatchException,
+    InvalidStorageFormatException,
+)
+from src.util.storage import (
+    CsvStorageFormat,
+    ParquetStorageFormat,
+    dataset_file,
+    get_storage_format,
+    storage_format_for_path,
+)
+
+# NOTE: Test Constants and helpers live in test.helpers to
+#  avoid repeat work
+
+
+@pytest.fixture
+def clean_test_directory():
+    """Test writes out to Temp Listings Directory. Need to clean up
+    before and after tests.
+    """
+    delete_directory_contents(tc.TEMP_LISTINGS_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_LISTINGS_DIRECTORY)
+
+
+class TestStorage:
+
+    def test_dataset_file_uses_configured_format(self):
+        file_path = dataset_file(
+            tc.TEMP_LISTINGS_DIRECTORY,
+            "crypto_listings_{}",
+            tc.TEST_TIMESTAMP,
+            LISTINGS_DATASET,
+        )
+        assert file_path.endswith(f"crypto_listings_{tc.TEST_TIMESTAMP}.parquet")
+
+    def test_dataset_file_finds_existing_file(self):
+        # mock pricing dataset was written as .csv
+        file_path = dataset_file(
+            tc.MOCK_PRICING_DIRECTORY,
+            "coins_pricing_{}",
+            tc.TEST_TIMESTAMP,
+            PRICING_DATASET,
+        )
+        assert file_path == join(
+            tc.MOCK_PRICING_DIRECTORY, f"coins_pricing_{tc.TEST_TIMESTAMP}.csv"
+        )
+
+    def test_parquet_round_trip_keeps_types(self, clean_test_directory):
+        file_path = join(tc.TEMP_LISTINGS_DIRECTORY, "crypto_listings_test.parquet")
+        df = pd.DataFrame(
+            {
+                "id": [1, 1027],
+                "symbol": ["BTC", "ETH"],
+                "quote.USD.percent_change_24h": [1.5, -0.25],
+                "tags": [["mineable", "pow"], []],
+            }
+        )
+
+        storage_format_for_path(file_path).write(file_path, df)
+        read_df = ParquetStorageFormat().read(file_path)
+
+        assert read_df.dtypes.equals(df.dtypes)
+        assert list(read_df["tags"][0]) == ["mineable", "pow"]
+
+    @pytest.mark.parametrize(
+        "storage_format", [CsvStorageFormat(), ParquetStorageFormat()]
+    )
+    def test_read_pushes_down_columns_and_filters(
+        self, storage_format, clean_test_directory
+    ):
+        file_path = join(
+            tc.TEMP_LISTINGS_DIRECTORY,
+            f"crypto_listings_test{storage_format.extension}",
+        )
+        storage_format.write(
+            file_path,
+            pd.DataFrame(
+                {
+                    "id": [1, 1027, 825],
+                    "name": ["Bitcoin", "Ethereum", "Tether"],
+                    "symbol": ["BTC", "ETH", "USDT"],
+                    "quote.USD.percent_change_24h": [1.5, -0.25, 0.0],
+                }
+            ),
+        )
+
+        df = storage_format.read(
+            file_path,
+            columns=["id", "quote.USD.percent_change_24h"],
+            filters=[("symbol", "in", ["BTC", "USDT"])],
+            dtypes={"id": "int32", "quote.USD.percent_change_24h": "float64"},
+        )
+
+        assert list(df.columns) == ["id", "quote.USD.percent_change_24h"]
+        assert list(df["id"]) == [1, 825]
+        assert df["id"].dtype == "int32"
+
+    @pytest.mark.parametrize(
+        "storage_format", [CsvStorageFormat(), ParquetStorageFormat()]
+    )
+    def test_writer_appends_chunks(self, storage_format, clean_test_directory):
+        file_path = join(
+            tc.TEMP_LISTINGS_DIRECTORY,
+            f"crypto_listings_test{storage_format.extension}",
+        )
+
+        with storage_format.open_writer(file_path, {"tvl_ratio": "float64"}) as writer:
+            writer.write(
+                pd.DataFrame(
+                    {"id": [1, 1027], "symbol": ["BTC", "ETH"], "tvl_ratio": None}
+                )
+            )
+            # columns are fixed by the first chunk, missing columns are left empty
+            writer.write(pd.DataFrame({"id": [825], "tvl_ratio": [0.5]}))
+
+        df = storage_format.read(file_path)
+        assert list(df.columns) == ["id", "symbol", "tvl_ratio"]
+        assert list(df["id"]) == [1, 1027, 825]
+        assert df["tvl_ratio"].iloc[2] == 0.5
+
+    @pytest.mark.parametrize(
+        "storage_format", [CsvStorageFormat(), ParquetStorageFormat()]
+    )
+    def test_writer_rejects_chunks_that_do_not_fit(
+        self, storage_format, clean_test_directory
+    ):
+        file_path = join(
+            tc.TEMP_LISTINGS_DIRECTORY,
+            f"crypto_listings_test{storage_format.extension}",
+        )
+
+        with pytest.raises(DatasetSchemaMismatchException):
+            with storage_format.open_writer(file_path) as writer:
+                writer.write(pd.DataFrame({"id": [1], "symbol": ["BTC"]}))
+                writer.write(pd.DataFrame({"id": [825], "extra": [1]}))
+        assert not exists(file_path)
+
+        if isinstance(storage_format, ParquetStorageFormat):
+            with pytest.raises(DatasetSchemaMismatchException):
+                with storage_format.open_writer(file_path) as writer:
+                    writer.write(pd.DataFrame({"id": [1], "symbol": ["BTC"]}))
+                    writer.write(pd.DataFrame({"id": [1.5], "symbol": ["ETH"]}))
+            assert not exists(file_path)
+
+    def test_writer_discards_on_failure(self, clean_test_directory):
+        file_path = join(tc.TEMP_LISTINGS_DIRECTORY, "crypto_listings_test.parquet")
+
+        with pytest.raises(RuntimeError):
+            with ParquetStorageFormat().open_writer(file_path) as writer:
+                writer.write(pd.DataFrame({"id": [1]}))
+                raise RuntimeError("connection lost")
+
+        assert not exists(file_path)
+        assert not exists(writer.temp_file)
+
+    def test_invalid_storage_format(self):
+        with pytest.raises(InvalidStorageFormatException):
+            get_storage_format("xlsx")
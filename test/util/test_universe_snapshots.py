@@ -0,0 +1,171 @@
+from test.helpers import TestConstants as tc
+from test.helpers import delete_directory_contents
+
+import pandas as pd
+import pytest
+
+from src.util.compaction import compact_dataset
+from src.util.config import (
+    DATASET_LOCATIONS,
+    UNIVERSE_BASE_COLUMN,
+    UNIVERSE_CHANGE_COLUMN,
+    UNIVERSE_DATASET,
+    UNIVERSE_FILE_FORMAT,
+)
+from src.util.dataframe_ops import read_dataset, write_dataset
+from src.util.flatten import flatten_records
+from src.util.schemas import UNIVERSE_FIELDS
+from src.util.storage import dataset_file
+from src.util.universe_snapshots import UniverseSnapshots, row_signatures
+
+EXECUTIONS = ["20250116000000", "20250116120000", "20250117000000"]
+
+
+@pytest.fixture
+def clean_test_directory(monkeypatch):
+    """Test writes out to Temp Universe Directory. Need to clean up
+    before and after tests.
+    """
+    monkeypatch.setitem(
+        DATASET_LOCATIONS,
+        UNIVERSE_DATASET,
+        (tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT),
+    )
+    delete_directory_contents(tc.TEMP_UNIVERSE_DIRECTORY)
+    yield
+    delete_directory_contents(tc.TEMP_UNIVERSE_DIRECTORY)
+
+
+def universe_file(timestamp: str) -> str:
+    return dataset_file(
+        tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT, timestamp, UNIVERSE_DATASET
+    )
+
+
+def universes():
+    bitcoin = {"id": 1, "name": "Bitcoin", "symbol": "BTC", "tags": ["mineable"]}
+    ethereum = {
+        "id": 1027,
+        "name": "Ethereum",
+        "symbol": "ETH",
+        "tags": ["pos", "smart-contracts"],
+    }
+    tether = {
+        "id": 825,
+        "name": "Tether",
+        "symbol": "USDT",
+        "platform": {"id": 1027, "name": "Ethereum"},
+    }
+    solana = {"id": 5426, "name": "Solana", "symbol": "SOL"}
+    records = [
+        [bitcoin, ethereum, tether],
+        # Ethereum changed, Tether removed and Solana added
+        [bitcoin, dict(ethereum, notice="Network upgrade"), solana],
+        [bitcoin, dict(ethereum, notice="Network upgrade"), solana],
+    ]
+    return [flatten_records(universe, UNIVERSE_FIELDS) for universe in records]
+
+
+def write_universes(snapshots: UniverseSnapshots):
+    for timestamp, universe in zip(EXECUTIONS, universes()):
+        write_dataset(universe_file(timestamp), snapshots.encode(timestamp, universe))
+
+
+def assert_universe_equal(materialized: pd.DataFrame, expected: pd.DataFrame):
+    expected = expected.sort_values("id", ignore_index=True)
+    assert list(materialized.columns) == list(expected.columns)
+    assert list(row_signatures(materialized)) == list(row_signatures(expected))
+
+
+class TestUniverseSnapshots:
+
+    def test_only_changes_are_stored(self, clean_test_directory):
+        snapshots = UniverseSnapshots(tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT)
+        write_universes(snapshots)
+
+        stored = [read_dataset(universe_file(timestamp)) for timestamp in EXECUTIONS]
+        assert list(stored[0][UNIVERSE_CHANGE_COLUMN]) == ["snapshot"] * 3
+        assert list(zip(stored[1]["id"], stored[1][UNIVERSE_CHANGE_COLUMN])) == [
+            (1027, "upsert"),
+            (5426, "upsert"),
+            (825, "delete"),
+        ]
+        assert set(stored[1][UNIVERSE_BASE_COLUMN]) == {EXECUTIONS[0]}
+        # without any changes a single row is kept to record the base
+        assert list(stored[2]["id"]) == [1]
+        assert set(stored[2][UNIVERSE_BASE_COLUMN]) == {EXECUTIONS[1]}
+
+        for timestamp, universe in zip(EXECUTIONS, universes()):
+            assert_universe_equal(snapshots.materialize(timestamp), universe)
+        assert snapshots.materialize("20250116060000") is None
+
+    def test_snapshot_interval(self, clean_test_directory):
+        snapshots = UniverseSnapshots(
+            tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT, snapshot_interval=2
+        )
+        write_universes(snapshots)
+
+        stored = read_dataset(universe_file(EXECUTIONS[2]))
+        assert list(stored[UNIVERSE_CHANGE_COLUMN]) == ["snapshot"] * 3
+
+    def test_executions_stored_out_of_order(self, clean_test_directory):
+        snapshots = UniverseSnapshots(tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT)
+        first, changed, _ = universes()
+        # the latest execution is stored before an older one is re-run, e.g. with
+        # --timestamp or by a workflow running at the same time
+        for timestamp, universe in [
+            (EXECUTIONS[0], first),
+            (EXECUTIONS[2], first),
+            (EXECUTIONS[1], changed),
+        ]:
+            write_dataset(
+                universe_file(timestamp), snapshots.encode(timestamp, universe)
+            )
+
+        for timestamp, universe in zip(EXECUTIONS, [first, changed, first]):
+            assert_universe_equal(snapshots.materialize(timestamp), universe)
+
+        assert compact_dataset(UNIVERSE_DATASET, before="2025-01-18") == {
+            "2025-01-16": 2,
+            "2025-01-17": 1,
+        }
+        for timestamp, universe in zip(EXECUTIONS, [first, changed, first]):
+            assert_universe_equal(snapshots.materialize(timestamp), universe)
+
+    def test_universes_stored_in_full_are_compacted_with_changes(
+        self, clean_test_directory
+    ):
+        snapshots = UniverseSnapshots(tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT)
+        first, changed, _ = universes()
+        # Tether, Ethereum and Solana removed
+        latest = first[first["id"] == 1].reset_index(drop=True)
+        # universes stored in full without the change column, as before universes
+        # were stored as changes, around an execution stored as changes on one day
+        executions = [EXECUTIONS[0], EXECUTIONS[1], "20250116180000"]
+        write_dataset(universe_file(executions[0]), first)
+        write_dataset(
+            universe_file(executions[1]), snapshots.encode(executions[1], changed)
+        )
+        write_dataset(universe_file(executions[2]), latest)
+        expected = [first, changed, latest]
+
+        for timestamp, universe in zip(executions, expected):
+            assert_universe_equal(snapshots.materialize(timestamp), universe)
+
+        assert compact_dataset(UNIVERSE_DATASET, before="2025-01-18") == {
+            "2025-01-16": 3
+        }
+        for timestamp, universe in zip(executions, expected):
+            assert_universe_equal(snapshots.materialize(timestamp), universe)
+
+    def test_compacted_universes_are_materialized(self, clean_test_directory):
+        snapshots = UniverseSnapshots(tc.TEMP_UNIVERSE_DIRECTORY, UNIVERSE_FILE_FORMAT)
+        write_universes(snapshots)
+
+        assert compact_dataset(UNIVERSE_DATASET, before="2025-01-18") == {
+            "2025-01-16": 2,
+            "2025-01-17": 1,
+        }
+
+        for timestamp, universe in zip(EXECUTIONS, universes()):
+            assert_universe_equal(snapshots.materialize(timestamp), universe)
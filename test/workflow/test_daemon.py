@@ -0,0 +1,43 @@
+import threading
+
+from src.workflow.daemon import WorkflowDaemon
+
+
+class TestWorkflowDaemon:
+
+    def test_next_tick_is_on_the_interval(self):
+        daemon = WorkflowDaemon(lambda timestamp: None, interval_seconds=300)
+        assert daemon.next_tick(1737000000.0) == 1737000300.0
+        assert daemon.next_tick(1737000299.9) == 1737000300.0
+
+    def test_tick_skipped_while_previous_execution_runs(self):
+        release = threading.Event()
+        daemon = WorkflowDaemon(lambda timestamp: release.wait(5))
+
+        assert daemon.tick("20250116000000")
+        assert not daemon.tick("20250116000500")
+        release.set()
+        daemon.running.join()
+        assert daemon.tick("20250116001000")
+        daemon.running.join()
+
+        assert daemon.runs == 2 and daemon.skipped == 1
+
+    def test_serve_until_stopped(self):
+        timestamps = []
+
+        def run(timestamp):
+            timestamps.append(timestamp)
+            if len(timestamps) == 2:
+                raise ValueError("failed execution")
+            if len(timestamps) == 3:
+                daemon.stop()
+
+        daemon = WorkflowDaemon(run, interval_seconds=0.01)
+        serving = threading.Thread(target=daemon.serve)
+        serving.start()
+        serving.join(timeout=5)
+
+        assert not serving.is_alive()
+        # a failed execution does not stop the daemon
+        assert len(timestamps) >= 3
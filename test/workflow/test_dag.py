@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from src.util.exceptions import WorkflowDefinitionException
+from src.util.metrics import RunReport, record
+from src.util.profiling import StepProfiler
+from src.workflow import WorkflowDag
+
+
+class TestWorkflowDag:
+
+    def test_run_respects_dependencies(self):
+        order = []
+        dag = WorkflowDag(max_workers=4)
+        dag.add_task("gold", lambda: order.append("gold"), depends_on=["silver"])
+        dag.add_task("silver", lambda: order.append("silver"), depends_on=["bronze"])
+        dag.add_task("bronze", lambda: order.append("bronze") or "raw")
+
+        results = dag.run()
+
+        assert order == ["bronze", "silver", "gold"]
+        assert results["bronze"] == "raw"
+
+    def test_run_overlaps_independent_tasks(self):
+        # Both tasks wait on each other, which only completes if they run together
+        barrier = threading.Barrier(2, timeout=5)
+        dag = WorkflowDag(max_workers=2)
+        dag.add_task("listings", lambda: None)
+        dag.add_task("universe", barrier.wait, depends_on=["listings"])
+        dag.add_task("pricing", barrier.wait, depends_on=["listings"])
+
+        dag.run()
+
+    def test_failure_stops_dependents(self):
+        ran = []
+
+        def fail():
+            raise ValueError("upstream failure")
+
+        dag = WorkflowDag()
+        dag.add_task("listings", fail)
+        dag.add_task("pricing", lambda: ran.append("pricing"), depends_on=["listings"])
+
+        with pytest.raises(ValueError, match="upstream failure"):
+            dag.run()
+        assert ran == []
+
+    def test_cycle_detected(self):
+        dag = WorkflowDag()
+        dag.add_task("a", lambda: None, depends_on=["b"])
+        dag.add_task("b", lambda: None, depends_on=["a"])
+
+        with pytest.raises(WorkflowDefinitionException, match="circular"):
+            dag.run()
+
+    def test_unknown_dependency(self):
+        dag = WorkflowDag()
+        dag.add_task("a", lambda: None, depends_on=["missing"])
+
+        with pytest.raises(WorkflowDefinitionException, match="undeclared"):
+            dag.validate()
+
+    def test_run_reports_task_metrics(self):
+        report = RunReport("20250116000000")
+        dag = WorkflowDag(report=report)
+        dag.add_task("a", lambda: record(api_calls=1))
+        dag.add_task("b", lambda: record(rows_out=5), depends_on=["a"])
+        dag.run()
+
+        steps = {step["step"]: step for step in report.to_dict()["steps"]}
+        assert steps["a"]["api_calls"] == 1 and steps["a"]["rows_out"] == 0
+        assert steps["b"]["rows_out"] == 5
+        assert all(step["status"] == "succeeded" for step in steps.values())
+
+    def test_profiled_tasks_run_one_at_a_time(self):
+        dag = WorkflowDag(max_workers=4, profiler=StepProfiler("unused", ["c"]))
+        assert dag.max_workers == 1
+
+        dag.add_task("a", lambda: None)
+        with pytest.raises(WorkflowDefinitionException):
+            dag.run()